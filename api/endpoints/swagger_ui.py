@@ -3,10 +3,13 @@ from core.fastapi import FastAPI
 from fastapi import APIRouter, Request
 from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 
+from dependencies import skip_authentication
+
 swagger_ui_router = APIRouter()
 
 
 @swagger_ui_router.get('/docs', include_in_schema=False)
+@skip_authentication
 async def swagger_ui_html(request: Request):
     return get_swagger_ui_html(
         openapi_url=FastAPI().openapi_url,
@@ -16,6 +19,7 @@ async def swagger_ui_html(request: Request):
 
 
 @swagger_ui_router.get('/redoc', include_in_schema=False)
+@skip_authentication
 async def redoc_html(request: Request):
     return get_redoc_html(
         openapi_url=FastAPI().openapi_url,
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from api.endpoints.v1 import user, auth
+from api.endpoints.v1 import user, auth, internal
 
 api_v1_router = APIRouter()
 api_v1_router.include_router(
@@ -10,3 +10,7 @@ api_v1_router.include_router(
     auth.router,
     prefix='/auth',
     tags=['auth'])
+api_v1_router.include_router(
+    internal.router,
+    prefix='/internal',
+    tags=['internal'])
@@ -1,13 +1,23 @@
 from fastapi import APIRouter, Depends, Request
 
 from api.v1.auth import AuthAPI
-from api.schemas.auth import AuthRequestSchema
+from api.schemas.auth import AuthRequestSchema, RefreshRequestSchema
+from dependencies import skip_authentication
 
 router = APIRouter()
 
 
 @router.post('/login/')
+@skip_authentication
 async def login(request: Request, schema: AuthRequestSchema = Depends()):
     """ ログイン
     """
-    return AuthAPI.login(request, schema)
+    return await AuthAPI.login(request, schema)
+
+
+@router.post('/refresh/')
+@skip_authentication
+async def refresh(request: Request, schema: RefreshRequestSchema = Depends()):
+    """ アクセストークンの再発行
+    """
+    return await AuthAPI.refresh(request, schema)
@@ -0,0 +1,15 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from api.v1.internal import InternalAPI
+from dependencies import login_required
+
+router = APIRouter()
+
+
+@router.get('/stats/', dependencies=[Depends(login_required)])
+async def stats() -> Dict[str, Any]:
+    """ プロセス内のリソースの使用状況
+    """
+    return await InternalAPI.stats()
@@ -1,38 +1,95 @@
-from typing import List
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from api.schemas.user import CreateUser, UpdateUser, UserInDB
+from api.schemas.user import (
+    BulkDeleteResult,
+    BulkDeleteUsers,
+    BulkUpdateUser,
+    BulkUsersResult,
+    CreateUser,
+    UpdateUser,
+    UserInDB,
+)
 from api.v1.user import UserAPI
+from core.config import get_env
 from dependencies import login_required
 from migrations.models import User
+from utilities.response_cache import cache_response
 
 router = APIRouter()
 
 
 @router.get('/', response_model=List[UserInDB], dependencies=[Depends(login_required)])
-async def gets(request: Request) -> List[User]:
+@cache_response(ttl=30, tables=[User.__tablename__])
+async def gets(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    after: Optional[str] = None,
+    stream: bool = False,
+) -> Union[List[User], Response]:
     """ 一覧取得
+
+    「stream=true」またはAcceptヘッダに「application/x-ndjson」が指定された場合は、
+    ページネーションせずに全件をストリーミングで返す（NDJSONはAcceptヘッダで指定された場合のみ）
+    ページネーションする場合はETagを返し、If-None-Matchが一致する場合は304を返す
+    レスポンスは承認済みユーザー間で共有してキャッシュし、ユーザーの登録・更新・削除で無効化する
     """
-    return UserAPI.gets(request)
+    if 'application/x-ndjson' in request.headers.get('accept', ''):
+        return StreamingResponse(UserAPI.stream(request, ndjson=True), media_type='application/x-ndjson')
+    if stream:
+        return StreamingResponse(UserAPI.stream(request), media_type='application/json')
+
+    # If-None-Matchが一致する場合は、一覧を取得せずに304を返す
+    not_modified = await UserAPI.not_modified(request, limit, after)
+    if not_modified:
+        return not_modified
+    if get_env().fast_serialization:
+        return await UserAPI.gets_json(request, limit, after)
+    return await UserAPI.gets(request, response, limit, after)
 
 
 @router.post('/', response_model=UserInDB, dependencies=[Depends(login_required)])
-async def create(request: Request, schema: CreateUser) -> User:
+async def create(request: Request, response: Response, schema: CreateUser) -> User:
     """ 新規登録
     """
-    return UserAPI.create(request, schema)
+    return await UserAPI.create(request, response, schema)
+
+
+@router.post('/bulk/', response_model=BulkUsersResult, dependencies=[Depends(login_required)])
+async def bulk_create(request: Request, schemas: List[CreateUser]) -> BulkUsersResult:
+    """ 一括登録
+    """
+    return await UserAPI.bulk_create(request, schemas)
+
+
+@router.put('/bulk/', response_model=BulkUsersResult, dependencies=[Depends(login_required)])
+async def bulk_update(request: Request, schemas: List[BulkUpdateUser]) -> BulkUsersResult:
+    """ 一括更新
+    """
+    return await UserAPI.bulk_update(request, schemas)
+
+
+@router.delete('/bulk/', response_model=BulkDeleteResult, dependencies=[Depends(login_required)])
+async def bulk_delete(request: Request, schema: BulkDeleteUsers) -> BulkDeleteResult:
+    """ 一括削除
+    """
+    return await UserAPI.bulk_delete(request, schema)
 
 
 @router.put('/{id}/', response_model=UserInDB, dependencies=[Depends(login_required)])
-async def update(request: Request, id: int, schema: UpdateUser) -> User:
+async def update(request: Request, response: Response, id: int, schema: UpdateUser) -> User:
     """ 更新
+
+    If-Matchヘッダを指定した場合は、ETagが一致する場合のみ更新する（一致しない場合は412）
     """
-    return UserAPI.update(request, id, schema)
+    return await UserAPI.update(request, response, id, schema)
 
 
 @router.delete('/{id}/', dependencies=[Depends(login_required)])
 async def delete(request: Request, id: int) -> None:
     """ 削除
     """
-    return UserAPI.delete(request, id)
+    return await UserAPI.delete(request, id)
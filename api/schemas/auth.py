@@ -34,3 +34,20 @@ class AuthRequestSchema:
         """
         self.username = username
         self.password = password
+
+
+class RefreshRequestSchema:
+    """ アクセストークンの再発行に関するスキーマ
+    """
+    def __init__(
+        self,
+        refresh_token: str = Form(...)
+    ):
+        """ 初期処理
+
+        Args:
+            refresh_token (str):
+                ・リフレッシュトークン
+                ・必須パラメータ
+        """
+        self.refresh_token = refresh_token
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -19,6 +19,7 @@ class UpdateUser(BaseUser):
     last_name: Optional[str]
     first_name: Optional[str]
     is_admin: bool
+    is_active: Optional[bool]
 
 
 class UserInDB(BaseUser):
@@ -29,3 +30,27 @@ class UserInDB(BaseUser):
 
     class Config:
         orm_mode = True
+
+
+class BulkUpdateUser(UpdateUser):
+    id: int
+
+
+class BulkDeleteUsers(BaseModel):
+    ids: List[int]
+
+
+class BulkError(BaseModel):
+    index: int  # リクエストの何件目（0始まり）のエラーか
+    error_code: str
+    error_msg: str
+
+
+class BulkUsersResult(BaseModel):
+    users: List[UserInDB]
+    errors: List[BulkError]
+
+
+class BulkDeleteResult(BaseModel):
+    ids: List[int]
+    errors: List[BulkError]
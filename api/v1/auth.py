@@ -1,26 +1,36 @@
+import logging
+from datetime import timezone
 from typing import Dict
 
-from fastapi import Request
+from fastapi import Request, status
+from jose import jwt
 
-from api.schemas.auth import AuthRequestSchema
-from crud.crud_user import CRUDUser
+from api.schemas.auth import AuthRequestSchema, RefreshRequestSchema
+from core.config import get_env
+from crud.crud_refresh_token import AsyncCRUDRefreshToken
+from crud.crud_user import AsyncCRUDUser
 from exceptions import ApiException, create_error
 from exceptions.error_messages import ErrorMessage
 from migrations.models import User
-from utilities.hasher import check_password
+from utilities.hasher import acheck_password, amake_password, must_update_password
 from utilities.jwt_handler import (
     jwt_claims_handler,
+    jwt_decord_handler,
     jwt_encode_handler,
     jwt_response_handler,
     TYPE_ACCESS_TOKEN,
+    TYPE_REFRESH_TOKEN,
 )
+from utilities.throttle import get_login_throttle
+
+logger = logging.getLogger(__name__)
 
 
 class AuthAPI:
     """ 認証に関するAPI
     """
     @classmethod
-    def login(
+    async def login(
         cls,
         request: Request,
         schema: AuthRequestSchema
@@ -35,8 +45,14 @@ class AuthAPI:
             Dict[str, str]: ユーザー認証結果
 
         Raises:
-            ApiException: メールアドレス または パスワードが未入力の場合
+            ApiException:
+                ・メールアドレス または パスワードが未入力の場合
+                ・ログインの試行回数が上限を超えている場合
         """
+        # パスワードの検証（CPU負荷が高い）の前に試行回数を確認
+        # （プロキシ経由の場合はuvicornの「--forwarded-allow-ips」でプロキシを信頼し、X-Forwarded-Forの接続元を使う）
+        await get_login_throttle().check(request.client.host if request.client else None, schema.username)
+
         credentials = {
             'username': schema.username,
             'password': schema.password,
@@ -45,7 +61,7 @@ class AuthAPI:
         # メールアドレスとパスワードが入力されている場合、
         # ユーザー認証を実施してアクセストークンとリフレッシュトークンを生成
         if all(credentials.values()):
-            user = cls().__authenticate(request, **credentials)
+            user = await cls().__authenticate(request, **credentials)
             # アクセストークンのクレームセット取得
             access_token_claims = jwt_claims_handler(
                 user,
@@ -55,10 +71,102 @@ class AuthAPI:
         else:
             raise ApiException(create_error(ErrorMessage.INVALID_EMAIL_OR_PASSWORD))
 
-        # アクセストークンを返す
-        return jwt_response_handler(jwt_encode_handler(access_token_claims))
+        # リフレッシュトークンを登録（トークンファミリーの生成）
+        # ログインのたびに、同じユーザーの失効済み・期限切れのトークンファミリーを削除する
+        crud = AsyncCRUDRefreshToken(request.state.db_session)
+        await crud.purge(user.id)
+        refresh_token_claims = jwt_claims_handler(user, token_type=TYPE_REFRESH_TOKEN)
+        refresh_token = await crud.create({
+            'user_id': user.id,
+            'expires_at': refresh_token_claims['exp'].replace(tzinfo=timezone.utc),
+        })
+        refresh_token_claims.update({'family_id': refresh_token.id, 'generation': refresh_token.generation})
+
+        # アクセストークンとリフレッシュトークンを返す
+        return jwt_response_handler(
+            jwt_encode_handler(access_token_claims),
+            jwt_encode_handler(refresh_token_claims),
+        )
+
+    @classmethod
+    async def refresh(
+        cls,
+        request: Request,
+        schema: RefreshRequestSchema
+    ) -> Dict[str, str]:
+        """ アクセストークン再発行API
+
+        リフレッシュトークンは使い捨てで、再発行のたびに新しいリフレッシュトークン（次の世代）を返す
+        使用済みのリフレッシュトークンが再度使用された場合は漏洩とみなし、同じログインで発行したリフレッシュトークンをすべて失効させる
+
+        Args:
+            request (Request): リクエスト情報
+            schema (RefreshRequestSchema): リクエストボディ
+
+        Returns:
+            Dict[str, str]: 新しいアクセストークンとリフレッシュトークン
 
-    def __authenticate(
+        Raises:
+            ApiException:
+                ・リフレッシュトークンが有効期限切れの場合
+                ・リフレッシュトークンが不正・使用済み・失効済みの場合
+                ・ユーザーが存在しない もしくは 有効でない場合
+        """
+        # 使用済みのトークンを検出するため、キャッシュは使用せずに検証
+        try:
+            claims = jwt_decord_handler(schema.refresh_token, use_cache=False)
+        except jwt.ExpiredSignatureError:
+            raise ApiException(create_error(ErrorMessage.EXPIRED_TOKEN), status_code=status.HTTP_401_UNAUTHORIZED)
+        except Exception as e:
+            logger.info('リフレッシュトークンを検証できませんでした: %s', e)
+            raise ApiException(create_error(ErrorMessage.INVALID_TOKEN), status_code=status.HTTP_401_UNAUTHORIZED)
+
+        if claims.get('token_type') != TYPE_REFRESH_TOKEN or 'family_id' not in claims:
+            raise ApiException(create_error(ErrorMessage.INVALID_TOKEN), status_code=status.HTTP_401_UNAUTHORIZED)
+
+        crud = AsyncCRUDRefreshToken(request.state.db_session)
+
+        # ユーザーが存在しない もしくは 有効でない場合は、トークンファミリーを失効させてエラー
+        user = await AsyncCRUDUser(request.state.db_session).get_by_id(claims['user_id'])
+        if not user or not user.is_active:
+            await cls.__revoke_family(request, claims['family_id'])
+            raise ApiException(create_error(ErrorMessage.INVALID_TOKEN), status_code=status.HTTP_401_UNAUTHORIZED)
+
+        # 世代を進める（世代が一致しない、失効済み・期限切れの場合は更新されない）
+        refresh_token_claims = jwt_claims_handler(user, token_type=TYPE_REFRESH_TOKEN)
+        refresh_token = await crud.rotate(
+            claims['family_id'],
+            claims['generation'],
+            refresh_token_claims['exp'].replace(tzinfo=timezone.utc))
+
+        # 使用済みのトークンが再度使用された場合はトークンファミリーを失効させる
+        if not refresh_token:
+            await cls.__revoke_family(request, claims['family_id'])
+            logger.warning(
+                'リフレッシュトークンの再使用を検出したため失効させました',
+                extra={'user_id': claims['user_id'], 'family_id': claims['family_id']})
+            raise ApiException(create_error(ErrorMessage.INVALID_TOKEN), status_code=status.HTTP_401_UNAUTHORIZED)
+
+        refresh_token_claims.update({'family_id': refresh_token.id, 'generation': refresh_token.generation})
+        return jwt_response_handler(
+            jwt_encode_handler(jwt_claims_handler(user, token_type=TYPE_ACCESS_TOKEN)),
+            jwt_encode_handler(refresh_token_claims),
+        )
+
+    @classmethod
+    async def __revoke_family(cls, request: Request, family_id: int) -> None:
+        """ トークンファミリーを失効させてコミットする
+
+        失効させた後にエラーを返すため、エラーレスポンスでロールバックされても失効が確定するよう明示的にコミットする
+
+        Args:
+            request (Request): リクエスト情報
+            family_id (int): トークンファミリーのID（リフレッシュトークンのID）
+        """
+        await AsyncCRUDRefreshToken(request.state.db_session).revoke(family_id)
+        await request.scope['state'].commit()
+
+    async def __authenticate(
         self,
         request: Request,
         username: str = None,
@@ -66,6 +174,8 @@ class AuthAPI:
     ) -> User:
         """ ユーザー認証
 
+        パスワードのアルゴリズム・強度が現在の設定と異なる場合は、認証に成功した際にハッシュ化し直して保存する
+
         Args:
             request (Request): リクエスト情報
             username (str): ユーザー名
@@ -80,14 +190,19 @@ class AuthAPI:
                 ・入力されたパスワードとユーザーのパスワードが一致しなかった場合
                 ・入力されたメールアドレスで取得したユーザーが有効でない場合
         """
-        user = CRUDUser(request.state.db_session).get_query().filter_by(**{'username': username}).all()
+        user = await AsyncCRUDUser(request.state.db_session).get_by_username(username)
 
         # ユーザーを取得できなかった場合はエラー
         if not user:
             raise ApiException(create_error(ErrorMessage.FAILURE_LOGIN))
 
         # パスワードが一致しない もしくは ユーザーが有効でない場合はエラー
-        if not check_password(password, user[0].password) or not user[0].is_active:
+        if not await acheck_password(password, user.password) or not user.is_active:
             raise ApiException(create_error(ErrorMessage.FAILURE_LOGIN))
 
-        return user[0]
+        # パスワードのアルゴリズム・強度が現在の設定と異なる場合は、設定に合わせてハッシュ化し直す
+        if get_env().password_rehash_on_login and must_update_password(user.password):
+            user = await AsyncCRUDUser(request.state.db_session).update(
+                user, {'password': await amake_password(password)})
+
+        return user
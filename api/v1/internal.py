@@ -0,0 +1,37 @@
+from typing import Any, Dict
+
+from crud import async_connection, async_replica_connections, connection, replica_connections
+from utilities.authentication import get_authenticated_user_cache, get_token_revocation_list
+from utilities.executor import get_executor
+from utilities.hasher import get_hasher_executor
+from utilities.jwt_handler import get_jwt_claims_cache
+from utilities.logger import setup_logging
+from utilities.pool import get_pool_stats
+from utilities.response_cache import get_response_cache
+from utilities.throttle import get_login_throttle
+
+
+class InternalAPI:
+    """ 運用向けの内部API
+    """
+    @classmethod
+    async def stats(cls) -> Dict[str, Any]:
+        """ プロセス内のリソースの使用状況を返す
+
+        コネクションプール・スレッドプール・キャッシュのサイズを、ワーカー数や負荷に合わせて調整するために使用する
+        値はプロセス（ワーカー）ごとの値
+        """
+        return {
+            'db_pool': get_pool_stats(connection),
+            'async_db_pool': get_pool_stats(async_connection),
+            'replica_db_pools': [get_pool_stats(engine) for engine in replica_connections],
+            'async_replica_db_pools': [get_pool_stats(engine) for engine in async_replica_connections],
+            'executor': get_executor().stats(),
+            'hasher': get_hasher_executor().stats(),
+            'auth_user_cache': get_authenticated_user_cache().stats(),
+            'token_revocations': get_token_revocation_list().stats(),
+            'jwt_claims_cache': get_jwt_claims_cache().stats(),
+            'log_queue': setup_logging().stats(),
+            'login_throttle': get_login_throttle().store.stats(),
+            'response_cache': get_response_cache().stats(),
+        }
@@ -1,57 +1,450 @@
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple, Union
 
-from api.schemas.user import CreateUser, UpdateUser, UserInDB
-from crud.crud_user import CRUDUser
-from fastapi import Request
-from utilities.hasher import make_password
+from api.schemas.user import (
+    BulkDeleteResult,
+    BulkDeleteUsers,
+    BulkUpdateUser,
+    BulkUsersResult,
+    CreateUser,
+    UpdateUser,
+    UserInDB,
+)
+from core.config import get_env
+from crud.crud_user import AsyncCRUDUser
+from exceptions import ApiException, create_error, format_error
+from exceptions.error_messages import ErrorMessage
+from fastapi import Request, Response, status
+from migrations.models import User
+from utilities.authentication import get_authenticated_user_cache, revoke_tokens
+from utilities.etag import if_match, if_none_match, make_etag
+from utilities.hasher import acheck_passwords, amake_password, amake_passwords
+from utilities.serializer import RawJSONResponse, rows_to_json
+
+# 一覧取得の高速版で取得するカラム（レスポンスのスキーマと同じ）
+USER_IN_DB_COLUMNS = tuple(UserInDB.__fields__)
 
 
 class UserAPI:
     """ ユーザーに関するAPI
     """
     @classmethod
-    def gets(cls, request: Request) -> List[UserInDB]:
+    async def gets(
+        cls,
+        request: Request,
+        response: Response,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> List[UserInDB]:
         """ 一覧取得
+
+        主キーの昇順でlimit件（最大でpage_size_max件）取得する
+        次ページがある場合は、次ページのカーソルをレスポンスヘッダ「X-Next-Cursor」に設定する
+        取得したページのETagをレスポンスヘッダ「ETag」に設定する（not_modifiedで使用する）
+
+        Args:
+            request (Request): リクエスト情報
+            response (Response): レスポンス情報
+            limit (Optional[int]): 取得件数（未指定の場合はpage_size_default件）
+            after (Optional[str]): 前ページのカーソル
+
+        Returns:
+            List[UserInDB]: ユーザー一覧
+
+        Raises:
+            ApiException: 不正なカーソルが指定された場合
+        """
+        users, next_cursor = await cls.__paginate(request, limit, after)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['ETag'] = cls.get_page_etag(users, next_cursor)
+        return users  # jsonable_encoderは使わない
+
+    @classmethod
+    async def gets_json(
+        cls,
+        request: Request,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> RawJSONResponse:
+        """ 一覧取得（高速版）
+
+        UserInDBのカラムのみを行（タプル）のまま取得し、ORMのインスタンス生成とpydanticの検証を省略してJSONに変換する
+        レスポンスボディ・ヘッダはgetsと同じ
+
+        Args:
+            request (Request): リクエスト情報
+            limit (Optional[int]): 取得件数（未指定の場合はpage_size_default件）
+            after (Optional[str]): 前ページのカーソル
+
+        Returns:
+            RawJSONResponse: ユーザー一覧のJSON
+
+        Raises:
+            ApiException: 不正なカーソルが指定された場合
+        """
+        rows, next_cursor = await cls.__paginate(request, limit, after, USER_IN_DB_COLUMNS)
+        headers = {'ETag': cls.get_page_etag(rows, next_cursor)}
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        return RawJSONResponse(rows_to_json(rows, USER_IN_DB_COLUMNS), headers=headers)
+
+    @classmethod
+    async def not_modified(
+        cls,
+        request: Request,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Optional[Response]:
+        """ 一覧取得の条件付きリクエスト（If-None-Match）の判定
+
+        ページの主キー・最終更新日時のみを取得してETagを求め、If-None-Matchと一致する場合は304を返す
+        （ORMのインスタンス生成・JSONへの変換を行わない）
+
+        Args:
+            request (Request): リクエスト情報
+            limit (Optional[int]): 取得件数（未指定の場合はpage_size_default件）
+            after (Optional[str]): 前ページのカーソル
+
+        Returns:
+            Optional[Response]: 一致する場合は304のレスポンス、一致しない（If-None-Matchが無い）場合はNone
+
+        Raises:
+            ApiException: 不正なカーソルが指定された場合
+        """
+        header = request.headers.get('if-none-match')
+        if not header:
+            return None
+        rows, next_cursor = await cls.__paginate(request, limit, after, ('id', 'updated_at'))
+        etag = cls.get_page_etag(rows, next_cursor)
+        if not if_none_match(header, etag):
+            return None
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    @classmethod
+    def get_page_etag(cls, rows: Sequence[Union[User, tuple]], next_cursor: Optional[str]) -> str:
+        """ 一覧のページのETag（弱いETag）を返す
+
+        ページに含まれるユーザーの主キー・最終更新日時と次ページのカーソルから生成する
+        （登録・更新・削除のいずれでもページの内容が変わればETagも変わる）
+
+        Args:
+            rows (Sequence[Union[User, tuple]]): ページのユーザー（「id」「updated_at」を持つもの）
+            next_cursor (Optional[str]): 次ページのカーソル
+
+        Returns:
+            str: ETag
+        """
+        return make_etag(*(f'{row.id}:{row.updated_at}' for row in rows), next_cursor, weak=True)
+
+    @classmethod
+    def get_etag(cls, user: Optional[User]) -> Optional[str]:
+        """ ユーザーのETag（強いETag、If-Matchで使用する）を返す
+
+        レスポンスに含む項目（UserInDB）の値から生成する
+
+        Args:
+            user (Optional[User]): ユーザー
+
+        Returns:
+            Optional[str]: ETag、ユーザーが存在しない場合はNone
         """
-        return CRUDUser(request.state.db_session).gets()  # jsonable_encoderは使わない
+        return make_etag(*(getattr(user, column) for column in USER_IN_DB_COLUMNS)) if user else None
 
     @classmethod
-    def create(
+    async def __paginate(
         cls,
         request: Request,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Tuple[list, Optional[str]]:
+        """ 取得件数を上限内に収めてキーセットページネーションで取得
+        """
+        limit = min(limit or get_env().page_size_default, get_env().page_size_max)
+        try:
+            return await AsyncCRUDUser(request.state.db_session).paginate(limit, after, columns)
+        except ValueError:
+            raise ApiException(create_error(ErrorMessage.INVALID_CURSOR))
+
+    @classmethod
+    async def stream(cls, request: Request, ndjson: bool = False) -> AsyncIterator[str]:
+        """ 一覧をストリーミングで取得
+
+        サーバーサイドカーソルからstream_batch_size件ずつ読み込み、読み込んだ単位でJSONに変換して返す
+        全件をメモリに載せないため、件数に関わらずメモリ使用量は一定になる
+
+        Args:
+            request (Request): リクエスト情報
+            ndjson (bool): NDJSON（1行1ユーザー）で返すかどうか（Falseの場合はJSON配列）
+
+        Returns:
+            AsyncIterator[str]: レスポンスボディの断片
+        """
+        separator = '\n' if ndjson else ','
+        first = True
+        if not ndjson:
+            yield '['
+
+        crud = AsyncCRUDUser(request.state.db_session)
+        async for users in crud.stream(get_env().stream_batch_size):
+            chunk = separator.join(UserInDB.from_orm(user).json() for user in users)
+            if ndjson:
+                yield chunk + separator
+            else:
+                yield chunk if first else separator + chunk
+            first = False
+
+        if not ndjson:
+            yield ']'
+
+    @classmethod
+    async def create(
+        cls,
+        request: Request,
+        response: Response,
         schema: CreateUser
     ) -> UserInDB:
         """ 新規登録
+
+        登録したユーザーのETagをレスポンスヘッダ「ETag」に設定する
         """
         data = schema.dict()
 
         # パスワードハッシュ化
-        data['password'] = make_password(data['password'])
+        data['password'] = await amake_password(data['password'])
 
         # ユーザ登録実行
-        return CRUDUser(request.state.db_session).create(data)
+        user = await AsyncCRUDUser(request.state.db_session).create(data)
+        response.headers['ETag'] = cls.get_etag(user)
+        return user
 
     @classmethod
-    def update(
+    async def update(
         cls,
         request: Request,
+        response: Response,
         id: int,
         schema: UpdateUser
     ) -> UserInDB:
         """ 更新
+
+        If-Matchヘッダが指定された場合は、ユーザーのETagが一致する（取得した後に他で更新されていない）場合のみ更新する
+        更新したユーザーのETagをレスポンスヘッダ「ETag」に設定する
+
+        Raises:
+            ApiException: If-Matchヘッダが指定され、ユーザーのETagと一致しない場合
         """
-        crud = CRUDUser(request.state.db_session)
+        crud = AsyncCRUDUser(request.state.db_session)
 
-        obj = crud.get_by_id(id)
+        obj = await crud.get_by_id(id)
+        precondition = request.headers.get('if-match')
+        if precondition is not None and not if_match(precondition, cls.get_etag(obj)):
+            raise ApiException(
+                create_error(ErrorMessage.PRECONDITION_FAILED), status_code=status.HTTP_412_PRECONDITION_FAILED)
         data = schema.dict()
+        for key in ('password', 'is_active'):
+            if data[key] is None:
+                del data[key]
 
-        # パスワードハッシュ化
-        data['password'] = make_password(data['password'])
+        # パスワードハッシュ化（現在のパスワードと同じ場合は現在のハッシュ値を使う）
+        password_changed = await cls.__hash_passwords([(obj, data)])
 
-        return CRUDUser(request.state.db_session).update(obj, data)
+        # 更新するとobjが更新後の値になるため、無効にするかどうかは更新前に判定する
+        deactivated = cls.__is_deactivated(obj, data)
+
+        # 認証済みユーザーのキャッシュを破棄（ユーザー名・有効かどうかが変わる可能性があるため）
+        get_authenticated_user_cache().delete(id)
+
+        # If-Matchヘッダが指定された場合は、確認した後に他で更新されていない場合のみ更新
+        if precondition is None:
+            user = await crud.update(obj, data)
+        else:
+            user = await crud.update_if_unmodified(obj, data)
+            if not user:
+                raise ApiException(
+                    create_error(ErrorMessage.PRECONDITION_FAILED), status_code=status.HTTP_412_PRECONDITION_FAILED)
+
+        # パスワードを変更した・無効にした場合は、発行済みのアクセストークンを失効させる
+        if password_changed or deactivated:
+            await revoke_tokens(request.state.db_session, [id])
+
+        response.headers['ETag'] = cls.get_etag(user)
+        return user
 
     @classmethod
-    def delete(cls, request: Request, id: int) -> None:
+    async def delete(cls, request: Request, id: int) -> None:
         """ 削除
         """
-        return CRUDUser(request.state.db_session).delete_by_id(id)
+        # 認証済みユーザーのキャッシュを破棄し、発行済みのアクセストークンを失効させる
+        get_authenticated_user_cache().delete(id)
+        await revoke_tokens(request.state.db_session, [id])
+
+        return await AsyncCRUDUser(request.state.db_session).delete_by_id(id)
+
+    @classmethod
+    async def bulk_create(cls, request: Request, schemas: List[CreateUser]) -> BulkUsersResult:
+        """ 一括登録
+
+        ユーザー名が重複しているデータはエラーとして返し、それ以外のデータを登録する
+
+        Args:
+            request (Request): リクエスト情報
+            schemas (List[CreateUser]): 登録するユーザーのリスト
+
+        Returns:
+            BulkUsersResult: 登録したユーザーと、登録できなかったデータのエラー
+
+        Raises:
+            ApiException: 件数がbulk_max_items件を超える場合
+        """
+        cls.__check_bulk_size(schemas)
+        crud = AsyncCRUDUser(request.state.db_session)
+
+        # ユーザー名の重複チェック（登録済みのユーザー・リクエスト内の他のデータ）
+        usernames = {user.username for user in await crud.gets_by_usernames([schema.username for schema in schemas])}
+        errors: Dict[int, dict] = {}
+        for index, schema in enumerate(schemas):
+            if schema.username in usernames:
+                errors[index] = create_error(ErrorMessage.DUPLICATE_USERNAME)
+            usernames.add(schema.username)
+
+        # パスワードハッシュ化（並列実行）
+        data_list = [schema.dict() for index, schema in enumerate(schemas) if index not in errors]
+        passwords = await amake_passwords([data['password'] for data in data_list])
+        for data, password in zip(data_list, passwords):
+            data['password'] = password
+
+        users = await crud.bulk_create(data_list)
+        return BulkUsersResult(users=users, errors=cls.__format_errors(errors))
+
+    @classmethod
+    async def bulk_update(cls, request: Request, schemas: List[BulkUpdateUser]) -> BulkUsersResult:
+        """ 一括更新
+
+        存在しないユーザー・ユーザー名が重複しているデータはエラーとして返し、それ以外のデータを更新する
+        値が指定されていない（null）項目は更新しない
+
+        Args:
+            request (Request): リクエスト情報
+            schemas (List[BulkUpdateUser]): 更新するユーザーのリスト
+
+        Returns:
+            BulkUsersResult: 更新したユーザーと、更新できなかったデータのエラー
+
+        Raises:
+            ApiException: 件数がbulk_max_items件を超える場合
+        """
+        cls.__check_bulk_size(schemas)
+        crud = AsyncCRUDUser(request.state.db_session)
+
+        users = {user.id: user for user in await crud.gets_by_ids([schema.id for schema in schemas])}
+        owners = {
+            user.username: user.id
+            for user in await crud.gets_by_usernames([schema.username for schema in schemas])
+        }
+        errors: Dict[int, dict] = {}
+        seen_ids = set()
+        for index, schema in enumerate(schemas):
+            if schema.id not in users:
+                errors[index] = create_error(ErrorMessage.NOT_FOUND)
+            elif schema.id in seen_ids:
+                errors[index] = create_error(ErrorMessage.DUPLICATE_ID)
+            elif owners.setdefault(schema.username, schema.id) != schema.id:
+                errors[index] = create_error(ErrorMessage.DUPLICATE_USERNAME)
+            seen_ids.add(schema.id)
+
+        # パスワードハッシュ化（並列実行、現在のパスワードと同じ場合は現在のハッシュ値を使う）
+        data_list = [schema.dict(exclude_none=True) for index, schema in enumerate(schemas) if index not in errors]
+        password_changed = await cls.__hash_passwords([(users[data['id']], data) for data in data_list])
+
+        # 認証済みユーザーのキャッシュを破棄（ユーザー名・有効かどうかが変わる可能性があるため）
+        for data in data_list:
+            get_authenticated_user_cache().delete(data['id'])
+
+        # 更新するとユーザーが更新後の値になるため、無効にするかどうかは更新前に判定する
+        deactivated_ids = {data['id'] for data in data_list if cls.__is_deactivated(users[data['id']], data)}
+
+        updated_users = await crud.bulk_update(data_list)
+
+        # パスワードを変更した・無効にしたユーザーは、発行済みのアクセストークンを失効させる
+        revoked_ids = [data['id'] for data in data_list if data['id'] in password_changed | deactivated_ids]
+        if revoked_ids:
+            await revoke_tokens(request.state.db_session, revoked_ids)
+        return BulkUsersResult(users=updated_users, errors=cls.__format_errors(errors))
+
+    @classmethod
+    async def bulk_delete(cls, request: Request, schema: BulkDeleteUsers) -> BulkDeleteResult:
+        """ 一括削除
+
+        存在しないユーザーはエラーとして返し、それ以外のユーザーを削除する
+
+        Args:
+            request (Request): リクエスト情報
+            schema (BulkDeleteUsers): 削除するユーザーのIDのリスト
+
+        Returns:
+            BulkDeleteResult: 削除したユーザーのIDと、削除できなかったデータのエラー
+
+        Raises:
+            ApiException: 件数がbulk_max_items件を超える場合
+        """
+        cls.__check_bulk_size(schema.ids)
+
+        # 認証済みユーザーのキャッシュを破棄し、発行済みのアクセストークンを失効させる
+        for id in schema.ids:
+            get_authenticated_user_cache().delete(id)
+        await revoke_tokens(request.state.db_session, schema.ids)
+
+        deleted_ids = set(await AsyncCRUDUser(request.state.db_session).bulk_delete(schema.ids))
+        errors = {
+            index: create_error(ErrorMessage.NOT_FOUND)
+            for index, id in enumerate(schema.ids) if id not in deleted_ids
+        }
+        return BulkDeleteResult(ids=sorted(deleted_ids), errors=cls.__format_errors(errors))
+
+    @classmethod
+    async def __hash_passwords(cls, targets: Sequence[Tuple[User, dict]]) -> Set[int]:
+        """ 更新するデータのパスワードを並列にハッシュ化する
+
+        現在のパスワードと同じ場合はハッシュ化し直さずに現在のハッシュ値を使う
+        （再ハッシュ化すると値が変わり、パスワードを変更したかどうかを判定できないため）
+
+        Args:
+            targets (Sequence[Tuple[User, dict]]): 更新前のユーザーと更新するデータの組のリスト（dataは書き換える）
+
+        Returns:
+            Set[int]: パスワードを変更したユーザーのID
+        """
+        targets = [(user, data) for user, data in targets if 'password' in data]
+        unchanged = await acheck_passwords([(data['password'], user.password) for user, data in targets])
+
+        changed = []
+        for (user, data), is_same in zip(targets, unchanged):
+            if is_same:
+                data['password'] = user.password
+            else:
+                changed.append((user, data))
+
+        passwords = await amake_passwords([data['password'] for _, data in changed])
+        for (_, data), password in zip(changed, passwords):
+            data['password'] = password
+        return {user.id for user, _ in changed}
+
+    @classmethod
+    def __is_deactivated(cls, user: User, data: dict) -> bool:
+        """ 更新によってユーザーが無効になるかどうか（更新前のユーザーで判定すること）
+        """
+        return user.is_active and data.get('is_active', user.is_active) is False
+
+    @classmethod
+    def __check_bulk_size(cls, items: Sequence) -> None:
+        """ 一括処理の件数がbulk_max_items件以下であることをチェックする
+        """
+        if len(items) > get_env().bulk_max_items:
+            raise ApiException(create_error(ErrorMessage.TOO_MANY_ITEMS, get_env().bulk_max_items))
+
+    @classmethod
+    def __format_errors(cls, errors: Dict[int, dict]) -> List[dict]:
+        """ 一括処理のエラーをレスポンス用の形式に変換する
+        """
+        return [dict(format_error(error), index=index) for index, error in sorted(errors.items())]
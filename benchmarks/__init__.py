@@ -0,0 +1,266 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このパッケージはASGIアプリケーションをプロセス内で直接呼び出すベンチマークを提供する
+
+計測結果はJSONで保存し、保存済みの結果（ベースライン）と比較して性能の劣化を検出できる
+
+実行例
+    python -m benchmarks.middleware
+    python -m benchmarks.load --output baseline.json
+    python -m benchmarks.load --baseline baseline.json
+"""
+import asyncio
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from starlette.types import ASGIApp
+
+from crud import get_db_session
+from crud.crud_user import CRUDUser
+from utilities.hasher import make_password
+
+BENCHMARK_USERNAME = 'benchmark@example.com'
+BENCHMARK_PASSWORD = 'password'
+
+
+async def call_asgi(
+    app: ASGIApp,
+    method: str,
+    path: str,
+    headers: Dict[str, str] = {},
+    body: bytes = b'',
+) -> Tuple[int, bytes]:
+    """ ASGIアプリケーションにリクエストを1件送信する
+
+    Args:
+        app (ASGIApp): ASGIアプリケーション
+        method (str): HTTPメソッド
+        path (str): パス
+        headers (Dict[str, str]): リクエストヘッダ
+        body (bytes): リクエストボディ
+
+    Returns:
+        Tuple[int, bytes]: ステータスコードとレスポンスボディ
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    request_complete = False
+    status_code = None
+    chunks = []
+
+    async def receive() -> dict:
+        nonlocal request_complete
+        if request_complete:
+            await asyncio.sleep(3600)
+        request_complete = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message: dict) -> None:
+        nonlocal status_code
+        if message['type'] == 'http.response.start':
+            status_code = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status_code, b''.join(chunks)
+
+
+async def run_load(
+    app: ASGIApp,
+    method: str,
+    path: str,
+    headers: Dict[str, str] = {},
+    body: bytes = b'',
+    requests: int = 1000,
+    concurrency: int = 10,
+) -> Dict[str, float]:
+    """ 同時実行数を指定してリクエストを送信し、スループットを計測する
+
+    Args:
+        app (ASGIApp): ASGIアプリケーション
+        method (str): HTTPメソッド
+        path (str): パス
+        headers (Dict[str, str]): リクエストヘッダ
+        body (bytes): リクエストボディ
+        requests (int): 総リクエスト数
+        concurrency (int): 同時実行数
+
+    Returns:
+        Dict[str, float]: 計測結果（リクエスト数、秒間リクエスト数、レイテンシのパーセンタイル（ミリ秒））
+    """
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            status_code, _ = await call_asgi(app, method, path, headers, body)
+            latencies.append(time.perf_counter() - started)
+            statuses[status_code] = statuses.get(status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'statuses': statuses,
+        'req_per_sec': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """ ソート済みの値からパーセンタイル値を返す
+
+    Args:
+        sorted_values (List[float]): ソート済みの値
+        p (float): パーセンタイル（0〜100）
+
+    Returns:
+        float: パーセンタイル値
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def get_environment_info() -> Dict[str, Any]:
+    """ 計測した環境の情報（計測結果を比較する際の参考情報）を返す
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+    }
+
+
+def save_results(path: str, results: Dict[str, Dict[str, Any]], **meta: Any) -> None:
+    """ 計測結果をJSONで保存する
+
+    Args:
+        path (str): 保存先のパス
+        results (Dict[str, Dict[str, Any]]): 計測対象ごとの計測結果
+        meta (Any): 計測条件など、計測結果と一緒に保存する情報
+    """
+    with open(path, 'w') as f:
+        json.dump({'meta': {**get_environment_info(), **meta}, 'results': results}, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """ 保存した計測結果を読み込む
+
+    Args:
+        path (str): 保存先のパス
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 計測対象ごとの計測結果
+    """
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare_results(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    metrics: Dict[str, bool],
+    threshold: float,
+) -> List[str]:
+    """ 計測結果をベースラインと比較し、しきい値を超えて劣化した項目を返す
+
+    ベースラインに無い計測対象・項目は比較しない
+
+    Args:
+        results (Dict[str, Dict[str, Any]]): 計測対象ごとの計測結果
+        baseline (Dict[str, Dict[str, Any]]): 計測対象ごとのベースライン
+        metrics (Dict[str, bool]): 比較する項目と、値が大きいほど良いかどうか（例: req/sはTrue、レイテンシはFalse）
+        threshold (float): 劣化とみなす変化率（0.1の場合は10%）
+
+    Returns:
+        List[str]: 劣化した項目の説明
+    """
+    regressions = []
+    for name, result in results.items():
+        for metric, higher_is_better in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            after = result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f'{name} {metric}: {before:.4g} -> {after:.4g} ({change:+.1%})')
+    return regressions
+
+
+def setup_user() -> None:
+    """ 計測用のユーザーを登録する
+    """
+    db_session = get_db_session()
+    crud = CRUDUser(db_session)
+    if not crud.get_by_username(BENCHMARK_USERNAME):
+        crud.create({
+            'username': BENCHMARK_USERNAME,
+            'password': make_password(BENCHMARK_PASSWORD),
+            'last_name': 'benchmark',
+            'first_name': 'benchmark',
+        })
+        db_session.commit()
+    db_session.remove()
+
+
+def teardown_user() -> None:
+    """ 計測用のユーザーを削除する
+    """
+    db_session = get_db_session()
+    crud = CRUDUser(db_session)
+    user = crud.get_by_username(BENCHMARK_USERNAME)
+    if user:
+        crud.delete_by_id(user.id)
+        db_session.commit()
+    db_session.remove()
+
+
+async def login(app: ASGIApp) -> str:
+    """ 計測用のユーザーでログインしてアクセストークンを返す
+    """
+    _, body = await call_asgi(
+        app,
+        'POST',
+        '/api/v1/auth/login/',
+        headers={'Content-Type': 'application/x-www-form-urlencoded'},
+        body=f'username={BENCHMARK_USERNAME}&password={BENCHMARK_PASSWORD}'.encode(),
+    )
+    return json.loads(body)['access_token']
@@ -0,0 +1,56 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+パスワードハッシュの強度を実行環境に合わせて求めるコマンド
+
+実行するサーバーで1回のハッシュ化にかかる時間を計測し、--target秒以下で最大になる強度（PBKDF2のストレッチングの回数、scryptのn）を求める
+求めた値は環境変数の形式で出力するため、.envに追記して使用する
+変更後はログイン時に既存のパスワードが新しい強度でハッシュ化し直される（PASSWORD_REHASH_ON_LOGIN）
+
+ログイン1回あたりのCPU時間はおおよそ--target秒になるため、ワーカーあたりのログインの処理能力は HASHER_MAX_WORKERS / --target 件/秒 が上限となる
+
+実行例
+    python -m benchmarks.calibrate_hasher --target 0.1
+    python -m benchmarks.calibrate_hasher --algorithm scrypt --target 0.05
+"""
+import argparse
+import hashlib
+import sys
+
+from core.config import get_env
+from utilities.hasher import calibrate_hasher, get_hasher, measure_hasher, PASSWORD_HASHERS
+
+# 強度（encodeの引数名）と環境変数名の対応
+ENVIRONMENT_NAMES = {
+    'iterations': 'PASSWORD_HASH_ITERATIONS',
+    'n': 'PASSWORD_HASH_SCRYPT_N',
+    'r': 'PASSWORD_HASH_SCRYPT_R',
+    'p': 'PASSWORD_HASH_SCRYPT_P',
+}
+
+def main(args: argparse.Namespace) -> int:
+    if args.algorithm == 'scrypt' and not hasattr(hashlib, 'scrypt'):
+        print('このPythonではhashlib.scryptを使用できません（OpenSSL 1.1以上が必要です）', file=sys.stderr)
+        return 1
+
+    params = calibrate_hasher(args.algorithm, args.target, args.repeat)
+
+    # 求めた強度で計測し直す
+    elapsed = measure_hasher(get_hasher(args.algorithm), args.repeat, **params)
+    workers = get_env().hasher_max_workers
+    print(f'# 1回のハッシュ化: {elapsed * 1000:.1f} ms（目標 {args.target * 1000:.1f} ms）', file=sys.stderr)
+    print(f'# ログインの処理能力の上限: {workers / elapsed:.1f} 件/秒（HASHER_MAX_WORKERS={workers}）', file=sys.stderr)
+
+    print(f'PASSWORD_HASHER={args.algorithm}')
+    for key, value in params.items():
+        print(f'{ENVIRONMENT_NAMES[key]}={value}')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--algorithm', choices=list(PASSWORD_HASHERS), default=get_env().password_hasher,
+                        help='パスワードハッシュのアルゴリズム')
+    parser.add_argument('--target', type=float, default=0.1, help='1回のハッシュ化の目標時間（秒）')
+    parser.add_argument('--repeat', type=int, default=5, help='計測の繰り返し回数（最小値を使用する）')
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ログインの同時実行時のレイテンシを比較するベンチマーク
+
+・inline: パスワード検証（PBKDF2）をイベントループ上で直接実行する（変更前）
+・pool: パスワード検証をパスワードハッシュ専用のスレッドプールで実行する
+
+ログインと並行して「GET /api/v1/users/」も送信し、ログインが他のリクエストを待たせていないかも計測する
+
+実行例
+    python -m benchmarks.hasher --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import contextlib
+from unittest import mock
+
+from benchmarks import BENCHMARK_PASSWORD, BENCHMARK_USERNAME, login, run_load, setup_user, teardown_user
+from core.config import get_env
+from main import app
+from utilities.hasher import check_password
+
+
+async def inline_check_password(plain_password: str, hashed_password: str) -> bool:
+    """ 変更前と同じくイベントループ上でパスワードを検証する
+    """
+    return check_password(plain_password, hashed_password)
+
+
+async def main(requests: int, concurrency: int) -> None:
+    # 同じユーザーでログインし続けるため、ログインの試行回数の制限は無効にする
+    get_env().login_throttle_ip_burst = 0
+    get_env().login_throttle_username_burst = 0
+
+    token = await login(app)
+    login_body = f'username={BENCHMARK_USERNAME}&password={BENCHMARK_PASSWORD}'.encode()
+    login_headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    for name in ('inline', 'pool'):
+        patch = mock.patch('api.v1.auth.acheck_password', inline_check_password) if name == 'inline' \
+            else contextlib.nullcontext()
+        with patch:
+            login_result, users_result = await asyncio.gather(
+                run_load(app, 'POST', '/api/v1/auth/login/', login_headers, login_body,
+                         requests=requests, concurrency=concurrency),
+                run_load(app, 'GET', '/api/v1/users/', {'Authorization': f'Bearer {token}'},
+                         requests=requests, concurrency=concurrency),
+            )
+        for scenario, result in (('POST /api/v1/auth/login/', login_result), ('GET /api/v1/users/', users_result)):
+            print(f'{scenario:28s} {name:6s} '
+                  f'{result["req_per_sec"]:8.1f} req/s  '
+                  f'p50={result["p50_ms"]:.2f}ms p99={result["p99_ms"]:.2f}ms  '
+                  f'statuses={result["statuses"]}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_user()
+    try:
+        asyncio.get_event_loop().run_until_complete(main(args.requests, args.concurrency))
+    finally:
+        teardown_user()
@@ -0,0 +1,443 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+APIのエンドツーエンドの負荷試験
+
+同時実行数分の仮想ユーザーがシナリオのリクエストを繰り返し送信し、
+秒間リクエスト数・レイテンシのパーセンタイル・1リクエストあたりのSQLの実行回数を出力する
+
+シナリオ
+・login: ログイン（POST /api/v1/auth/login/）
+・list: 認証付きのユーザー一覧取得（GET /api/v1/users/）
+・write: ユーザーの登録・更新・削除の繰り返し
+・mixed: 一覧取得80%・登録/更新/削除20%
+
+リクエストの送信先
+・デフォルト: main.appをプロセス内で直接呼び出す（ネットワーク・HTTPの解析を含まない）
+・--uvicorn: uvicornをローカルで起動し、HTTP（keep-alive）で送信する
+
+SQLの実行回数は「/metrics」のdb_statements_total（BEGIN・COMMIT・ROLLBACKを除く）の増分から求める
+DATABASE_URLのDBに計測用のユーザーを登録して計測し、終了時に削除する
+
+実行例
+    python -m benchmarks.load --requests 2000 --concurrency 20 --output baseline.json
+    python -m benchmarks.load --requests 2000 --concurrency 20 --baseline baseline.json
+    python -m benchmarks.load --uvicorn --workers 4 --scenario list
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import count
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import h11
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks import (
+    BENCHMARK_PASSWORD,
+    BENCHMARK_USERNAME,
+    call_asgi,
+    compare_results,
+    load_results,
+    percentile,
+    save_results,
+    setup_user,
+    teardown_user,
+)
+from crud import get_db_session
+from migrations.models import User
+
+USERNAME_PREFIX = 'benchmark-load-'
+
+# ベースラインと比較する項目（値が大きいほど良いかどうか）
+COMPARED_METRICS = {'req_per_sec': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False, 'db_statements_per_req': False}
+
+# SQLの実行回数に含めない（トランザクション制御の）SQL
+TRANSACTION_OPERATIONS = ('BEGIN', 'COMMIT', 'ROLLBACK')
+
+Response = Tuple[int, bytes]
+
+
+class AsgiClient:
+    """ ASGIアプリケーションをプロセス内で直接呼び出すクライアント
+    """
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def request(self, method: str, path: str, headers: Dict[str, str] = {}, body: bytes = b'') -> Response:
+        return await call_asgi(self.app, method, path, headers, body)
+
+    async def close(self) -> None:
+        pass
+
+
+class HttpClient:
+    """ 1本のコネクションを使い回してHTTP/1.1でリクエストを送信するクライアント（仮想ユーザーごとに生成する）
+    """
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._connection: Optional[h11.Connection] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, headers: Dict[str, str] = {}, body: bytes = b'') -> Response:
+        if self._connection is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            self._connection = h11.Connection(h11.CLIENT)
+
+        connection = self._connection
+        data = connection.send(h11.Request(
+            method=method,
+            target=path,
+            headers=[('Host', self.host), ('Content-Length', str(len(body))), *headers.items()],
+        ))
+        if body:
+            data += connection.send(h11.Data(data=body))
+        data += connection.send(h11.EndOfMessage())
+        self._writer.write(data)
+        await self._writer.drain()
+
+        status_code = None
+        chunks = []
+        while True:
+            event = connection.next_event()
+            if event is h11.NEED_DATA:
+                connection.receive_data(await self._reader.read(65536))
+            elif isinstance(event, h11.Response):
+                status_code = event.status_code
+            elif isinstance(event, h11.Data):
+                chunks.append(event.data)
+            elif isinstance(event, (h11.EndOfMessage, h11.ConnectionClosed)):
+                break
+
+        # サーバーがコネクションを閉じた場合は次のリクエストで接続し直す
+        if connection.our_state is h11.DONE and connection.their_state is h11.DONE:
+            connection.start_next_cycle()
+        else:
+            await self.close()
+        return status_code, b''.join(chunks)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._connection = self._reader = self._writer = None
+
+
+class VirtualUser:
+    """ 仮想ユーザー（シナリオの状態を保持する）
+
+    Attributes:
+        client: リクエストを送信するクライアント
+        headers (Dict[str, str]): 認証ヘッダ
+        random (random.Random): シナリオの分岐に使用する乱数（再現性のため仮想ユーザーごとにシードを固定）
+        user_id (Optional[int]): 登録したユーザーのID（未登録・削除済みの場合はNone）
+        next_write (str): 次に実行する書き込み（create・update・delete）
+    """
+    usernames = count()
+
+    def __init__(self, client, token: str, seed: int) -> None:
+        self.client = client
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.random = random.Random(seed)
+        self.user_id: Optional[int] = None
+        self.next_write = 'create'
+
+
+async def login_scenario(user: VirtualUser) -> int:
+    status_code, _ = await user.client.request(
+        'POST',
+        '/api/v1/auth/login/',
+        {'Content-Type': 'application/x-www-form-urlencoded'},
+        f'username={BENCHMARK_USERNAME}&password={BENCHMARK_PASSWORD}'.encode(),
+    )
+    return status_code
+
+
+async def list_scenario(user: VirtualUser) -> int:
+    status_code, _ = await user.client.request('GET', '/api/v1/users/', user.headers)
+    return status_code
+
+
+async def write_scenario(user: VirtualUser) -> int:
+    """ 登録・更新・削除を順に繰り返す
+    """
+    headers = {**user.headers, 'Content-Type': 'application/json'}
+    body = {
+        'username': f'{USERNAME_PREFIX}{os.getpid()}-{next(VirtualUser.usernames)}@example.com',
+        'password': 'password',
+        'last_name': 'benchmark',
+        'first_name': 'benchmark',
+        'is_admin': False,
+    }
+    if user.next_write == 'create':
+        status_code, content = await user.client.request('POST', '/api/v1/users/', headers, json.dumps(body).encode())
+        if status_code == 200:
+            user.user_id = json.loads(content)['id']
+            user.next_write = 'update'
+    elif user.next_write == 'update':
+        status_code, _ = await user.client.request(
+            'PUT', f'/api/v1/users/{user.user_id}/', headers, json.dumps(body).encode())
+        user.next_write = 'delete'
+    else:
+        status_code, _ = await user.client.request('DELETE', f'/api/v1/users/{user.user_id}/', user.headers)
+        user.user_id = None
+        user.next_write = 'create'
+    return status_code
+
+
+async def mixed_scenario(user: VirtualUser) -> int:
+    """ 一覧取得80%・登録/更新/削除20%
+    """
+    if user.random.random() < 0.8:
+        return await list_scenario(user)
+    return await write_scenario(user)
+
+
+SCENARIOS: Dict[str, Callable[[VirtualUser], Awaitable[int]]] = {
+    'login': login_scenario,
+    'list': list_scenario,
+    'write': write_scenario,
+    'mixed': mixed_scenario,
+}
+
+
+async def count_db_statements(client) -> int:
+    """ 「/metrics」からSQLの実行回数（トランザクション制御を除く）を取得する
+    """
+    _, content = await client.request('GET', '/metrics')
+    total = 0
+    for family in text_string_to_metric_families(content.decode()):
+        for sample in family.samples:
+            if sample.name == 'db_statements_total' and sample.labels['operation'] not in TRANSACTION_OPERATIONS:
+                total += sample.value
+    return int(total)
+
+
+async def run_scenario(
+    scenario: Callable[[VirtualUser], Awaitable[int]],
+    users: List[VirtualUser],
+    requests: int,
+) -> Dict[str, Any]:
+    """ 仮想ユーザーごとに並行してシナリオを実行し、計測結果を返す
+
+    Args:
+        scenario (Callable[[VirtualUser], Awaitable[int]]): シナリオ（リクエストを1件送信してステータスコードを返す）
+        users (List[VirtualUser]): 仮想ユーザー（同時実行数分）
+        requests (int): 総リクエスト数
+
+    Returns:
+        Dict[str, Any]: 計測結果（リクエスト数、ステータスコードごとの件数、秒間リクエスト数、レイテンシのパーセンタイル（ミリ秒））
+    """
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = requests
+
+    async def worker(user: VirtualUser) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            status_code = await scenario(user)
+            latencies.append(time.perf_counter() - started)
+            statuses[status_code] = statuses.get(status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(user) for user in users))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'statuses': statuses,
+        'req_per_sec': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+async def cleanup(users: List[VirtualUser]) -> None:
+    """ 仮想ユーザーが登録したまま残っているユーザーを削除し、コネクションを閉じる（計測には含めない）
+    """
+    for user in users:
+        if user.user_id is not None:
+            await user.client.request('DELETE', f'/api/v1/users/{user.user_id}/', user.headers)
+        await user.client.close()
+
+
+async def run(
+    client_factory: Callable[[], Any],
+    scenarios: List[str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Dict[str, Dict[str, Any]]:
+    """ シナリオを順に実行し、シナリオごとの計測結果を返す
+    """
+    client = client_factory()
+    try:
+        _, content = await client.request(
+            'POST',
+            '/api/v1/auth/login/',
+            {'Content-Type': 'application/x-www-form-urlencoded'},
+            f'username={BENCHMARK_USERNAME}&password={BENCHMARK_PASSWORD}'.encode(),
+        )
+        token = json.loads(content)['access_token']
+
+        results = {}
+        for name in scenarios:
+            users = [VirtualUser(client_factory(), token, seed) for seed in range(concurrency)]
+            try:
+                await run_scenario(SCENARIOS[name], users, warmup)
+                statements_before = await count_db_statements(client)
+                result = await run_scenario(SCENARIOS[name], users, requests)
+                statements = await count_db_statements(client) - statements_before
+            finally:
+                await cleanup(users)
+            result['db_statements_per_req'] = statements / result['requests']
+            results[name] = result
+            print(f'{name:6s} {result["req_per_sec"]:9.1f} req/s  '
+                  f'p50={result["p50_ms"]:.2f}ms p95={result["p95_ms"]:.2f}ms p99={result["p99_ms"]:.2f}ms  '
+                  f'db={result["db_statements_per_req"]:.2f}/req  '
+                  f'statuses={result["statuses"]}')
+        return results
+    finally:
+        await client.close()
+
+
+def start_uvicorn(port: int, workers: int, multiproc_dir: str, settings: Dict[str, Any]) -> subprocess.Popen:
+    """ uvicornをローカルで起動し、接続できるようになるまで待つ
+
+    settingsは環境変数として渡し、.envの設定より優先する
+    """
+    try:
+        socket.create_connection(('127.0.0.1', port), timeout=1).close()
+    except OSError:
+        pass
+    else:
+        raise RuntimeError(f'ポート{port}は既に使用されています')
+
+    env = {
+        **os.environ,
+        **{name.upper(): str(value) for name, value in settings.items()},
+        'PROMETHEUS_MULTIPROC_DIR': multiproc_dir,
+    }
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app',
+         '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+         '--no-access-log', '--log-level', 'warning'],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        start_new_session=True,  # ワーカーごと停止できるようにする
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('uvicornの起動に失敗しました')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_uvicorn(process)
+    raise RuntimeError('uvicornの起動がタイムアウトしました')
+
+
+def stop_uvicorn(process: subprocess.Popen) -> None:
+    """ uvicornを停止する（一定時間内に停止しない場合はワーカーごと強制終了する）
+    """
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def teardown_users() -> None:
+    """ 計測用に登録したユーザーを削除する
+    """
+    db_session = get_db_session()
+    db_session.query(User).filter(User.username.startswith(USERNAME_PREFIX)) \
+        .delete(synchronize_session=False)
+    db_session.commit()
+    db_session.remove()
+
+
+def main(args: argparse.Namespace) -> int:
+    scenarios = list(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+    loop = asyncio.get_event_loop()
+
+    # 計測の妨げになる設定を上書きする（ログインの試行回数の制限は、同じユーザー・IPアドレスでログインし続けるため無効にする）
+    settings = {'access_log': args.access_log}
+    if not args.login_throttle:
+        settings.update(login_throttle_ip_burst=0, login_throttle_username_burst=0)
+
+    if args.uvicorn:
+        with tempfile.TemporaryDirectory() as multiproc_dir:
+            process = start_uvicorn(args.port, args.workers, multiproc_dir, settings)
+            try:
+                results = loop.run_until_complete(run(
+                    lambda: HttpClient('127.0.0.1', args.port),
+                    scenarios, args.requests, args.concurrency, args.warmup))
+            finally:
+                stop_uvicorn(process)
+    else:
+        from core.config import get_env
+        from main import app
+
+        for name, value in settings.items():
+            setattr(get_env(), name, value)
+        client = AsgiClient(app)
+        results = loop.run_until_complete(run(
+            lambda: client, scenarios, args.requests, args.concurrency, args.warmup))
+
+    if args.output:
+        save_results(
+            args.output, results,
+            mode='uvicorn' if args.uvicorn else 'in-process',
+            workers=args.workers if args.uvicorn else None,
+            requests=args.requests,
+            concurrency=args.concurrency,
+        )
+    if args.baseline:
+        regressions = compare_results(results, load_results(args.baseline), COMPARED_METRICS, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenario', choices=['all', *SCENARIOS], default='all')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=200, help='計測前に送信するリクエスト数')
+    parser.add_argument('--uvicorn', action='store_true', help='uvicornを起動してHTTPで送信する')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--workers', type=int, default=1, help='uvicornのワーカー数')
+    parser.add_argument('--access-log', action='store_true', help='アクセスログを出力する')
+    parser.add_argument('--login-throttle', action='store_true', help='ログインの試行回数の制限を有効にする')
+    parser.add_argument('--output', help='計測結果を保存するJSONのパス')
+    parser.add_argument('--baseline', help='比較するベースライン（--outputで保存したJSON）のパス')
+    parser.add_argument('--threshold', type=float, default=0.1, help='劣化とみなす変化率')
+    args = parser.parse_args()
+
+    setup_user()
+    try:
+        exit_code = main(args)
+    finally:
+        teardown_users()
+        teardown_user()
+    sys.exit(exit_code)
@@ -0,0 +1,220 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+リクエストごとに実行されるユーティリティ・例外生成のマイクロベンチマーク
+
+計測対象
+・PasswordHasher.encode / verify
+・jwt_encode_handler / jwt_decord_handler（キャッシュあり・なし）
+・StringUtils.get_random_string
+・create_error / ApiException / SystemException
+・AuthenticationBackend.authenticate（DBアクセスはスタブに置き換え、キャッシュあり・なしの両方）
+
+計測方法
+・ウォームアップとして--warmup回実行した後、1回の計測が--min-time秒以上になる実行回数を求める
+・その実行回数での計測を--repeat回繰り返し、1回あたりの処理時間の中央値・最小値・標準偏差を求める
+・計測中はGCを無効にする（timeitと同じ）
+
+DBへの接続は不要
+計測結果は--outputでJSONに保存し、--baselineで保存済みの結果と比較できる（中央値が--threshold以上遅くなった場合は終了コード1）
+
+実行例
+    python -m benchmarks.micro --output baseline.json
+    python -m benchmarks.micro --baseline baseline.json
+    python -m benchmarks.micro --filter jwt
+"""
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict
+from unittest import mock
+
+from fastapi import status
+from starlette.requests import Request
+
+from benchmarks import compare_results, load_results, save_results
+from exceptions import ApiException, create_error, SystemException
+from exceptions.error_messages import ErrorMessage
+from middlewares import AuthenticationBackend
+from migrations.models import User
+from utilities.authentication import get_authenticated_user_cache
+from utilities.hasher import PasswordHasher
+from utilities.jwt_handler import (
+    get_jwt_claims_cache,
+    jwt_claims_handler,
+    jwt_decord_handler,
+    jwt_encode_handler,
+    TYPE_ACCESS_TOKEN,
+)
+from utilities.string import StringUtils
+
+# ベースラインと比較する項目（値が大きいほど良いかどうか）
+COMPARED_METRICS = {'median_ns': False}
+
+BENCHMARK_USER = User(id=1, username='benchmark@example.com', is_active=True)
+
+
+class StubAsyncCRUDUser:
+    """ DBにアクセスせずに計測用のユーザーを返すAsyncCRUDUser
+    """
+    def __init__(self, db_session: Any) -> None:
+        pass
+
+    async def get_by_id(self, id: int) -> User:
+        return BENCHMARK_USER
+
+
+def create_request(access_token: str) -> Request:
+    """ 認証ヘッダを含むリクエストを生成する
+    """
+    return Request({
+        'type': 'http',
+        'method': 'GET',
+        'path': '/api/v1/users/',
+        'headers': [(b'authorization', f'Bearer {access_token}'.encode())],
+        'state': {'db_session': None},
+    })
+
+
+def raise_system_exception() -> SystemException:
+    """ 予期せぬ例外を捕捉してSystemExceptionを生成する（スタックトレースの整形を含む）
+    """
+    try:
+        raise RuntimeError()
+    except RuntimeError as e:
+        return SystemException(e)
+
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    """ 計測対象（引数なしで呼び出す関数、コルーチン関数の場合はイベントループで実行する）を返す
+    """
+    hasher = PasswordHasher()
+    hashed_password = hasher.encode('password', 'benchmarksalt')
+    claims = jwt_claims_handler(BENCHMARK_USER, token_type=TYPE_ACCESS_TOKEN)
+    access_token = jwt_encode_handler(claims)
+    backend = AuthenticationBackend()
+    request = create_request(access_token)
+
+    async def authenticate_cached() -> None:
+        await backend.authenticate(request)
+
+    async def authenticate_uncached() -> None:
+        get_jwt_claims_cache().clear()
+        get_authenticated_user_cache().clear()
+        await backend.authenticate(request)
+
+    return {
+        'hasher.encode': lambda: hasher.encode('password', 'benchmarksalt'),
+        'hasher.verify': lambda: hasher.verify('password', hashed_password),
+        'jwt.encode': lambda: jwt_encode_handler(claims),
+        'jwt.decode': lambda: jwt_decord_handler(access_token),
+        'jwt.decode (no cache)': lambda: jwt_decord_handler(access_token, use_cache=False),
+        'string.get_random_string': lambda: StringUtils.get_random_string(),
+        'exceptions.create_error': lambda: create_error(ErrorMessage.INVALID_TOKEN),
+        'exceptions.ApiException': lambda: ApiException(
+            create_error(ErrorMessage.INVALID_TOKEN), status_code=status.HTTP_401_UNAUTHORIZED),
+        'exceptions.SystemException': raise_system_exception,
+        'auth.authenticate (cached)': authenticate_cached,
+        'auth.authenticate (uncached)': authenticate_uncached,
+    }
+
+
+def make_timer(func: Callable[[], Any]) -> Callable[[int], float]:
+    """ 指定回数実行した処理時間（秒）を返す関数を生成する
+    """
+    if asyncio.iscoroutinefunction(func):
+        loop = asyncio.get_event_loop()
+
+        async def run_async(number: int) -> float:
+            started = time.perf_counter()
+            for _ in range(number):
+                await func()
+            return time.perf_counter() - started
+
+        return lambda number: loop.run_until_complete(run_async(number))
+
+    def run(number: int) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - started
+
+    return run
+
+
+def measure(func: Callable[[], Any], warmup: int, repeat: int, min_time: float) -> Dict[str, float]:
+    """ 1回あたりの処理時間を計測する
+
+    Args:
+        func (Callable[[], Any]): 計測対象
+        warmup (int): ウォームアップの実行回数
+        repeat (int): 計測の繰り返し回数
+        min_time (float): 1回の計測の最小時間（秒）
+
+    Returns:
+        Dict[str, float]: 1回あたりの処理時間（ナノ秒）の中央値・平均値・最小値・標準偏差、1回の計測の実行回数
+    """
+    timer = make_timer(func)
+    timer(warmup)
+
+    # 1回の計測がmin_time秒以上になる実行回数を求める（timeit.Timer.autorangeと同じ）
+    number = 1
+    while timer(number) < min_time:
+        number *= 2
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        times = [timer(number) / number * 1e9 for _ in range(repeat)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return {
+        'median_ns': statistics.median(times),
+        'mean_ns': statistics.mean(times),
+        'min_ns': min(times),
+        'stdev_ns': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def main(args: argparse.Namespace) -> int:
+    random.seed(0)
+    results = {}
+    with mock.patch('middlewares.AsyncCRUDUser', StubAsyncCRUDUser):
+        for name, func in build_cases().items():
+            if args.filter and args.filter not in name:
+                continue
+            result = measure(func, args.warmup, args.repeat, args.min_time)
+            results[name] = result
+            print(f'{name:30s} {result["median_ns"]:14,.0f} ns/op  '
+                  f'min={result["min_ns"]:,.0f}  stdev={result["stdev_ns"] / result["median_ns"]:6.1%}  '
+                  f'({result["repeat"]} x {result["number"]:,})')
+
+    if args.output:
+        save_results(args.output, results, warmup=args.warmup, repeat=args.repeat, min_time=args.min_time)
+    if args.baseline:
+        regressions = compare_results(results, load_results(args.baseline), COMPARED_METRICS, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filter', help='名前にこの文字列を含む計測対象のみ計測する')
+    parser.add_argument('--warmup', type=int, default=10, help='ウォームアップの実行回数')
+    parser.add_argument('--repeat', type=int, default=7, help='計測の繰り返し回数')
+    parser.add_argument('--min-time', type=float, default=0.2, help='1回の計測の最小時間（秒）')
+    parser.add_argument('--output', help='計測結果を保存するJSONのパス')
+    parser.add_argument('--baseline', help='比較するベースライン（--outputで保存したJSON）のパス')
+    parser.add_argument('--threshold', type=float, default=0.1, help='劣化とみなす変化率')
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,112 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ミドルウェア構成ごとの「/api/v1/users/」のスループットを比較するベンチマーク
+
+・before: BaseHTTPMiddlewareを継承したミドルウェア（リクエストごとにDBセッションを生成）
+・after: 現在のASGIミドルウェア（DBセッションは初回アクセス時に生成）
+・async: afterのDBセッションを非同期DBセッション（asyncpg）にしたもの
+
+DATABASE_URLのDBに計測用のユーザーを登録して計測し、終了時に削除する
+
+実行例
+    python -m benchmarks.middleware --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from api.endpoints.v1 import api_v1_router
+from benchmarks import login, run_load, setup_user, teardown_user
+from crud import get_db_session
+from exceptions import ApiException, SystemException
+from middlewares import (
+    AsyncDBSessionMiddleware,
+    AuthenticationBackend,
+    CORSMiddleware,
+    DBSessionMiddleware,
+    HttpRequestMiddleware,
+    LazyAuthenticationMiddleware,
+)
+
+
+class LegacyDBSessionMiddleware(BaseHTTPMiddleware):
+    """ 変更前のDBセッションミドルウェア
+    """
+    async def dispatch(self, request: Request, call_next) -> Response:
+        request.state.db_session = get_db_session()
+        return await call_next(request)
+
+
+class LegacyHttpRequestMiddleware(BaseHTTPMiddleware):
+    """ 変更前のリクエストミドルウェア
+    """
+    async def dispatch(self, request: Request, call_next) -> Response:
+        try:
+            response = await call_next(request)
+        except ApiException as ae:
+            request.state.db_session.rollback()
+            return JSONResponse(ae.detail, status_code=ae.status_code)
+        except Exception as e:
+            request.state.db_session.rollback()
+            se = SystemException(e)
+            return JSONResponse(se.detail, status_code=se.status_code)
+        else:
+            request.state.db_session.commit()
+            return response
+        finally:
+            request.state.db_session.remove()
+
+
+def build_app(db_session_middleware, http_request_middleware) -> FastAPI:
+    """ main.pyと同じ構成のアプリケーションを生成する
+    """
+    app = FastAPI(docs_url=None, redoc_url=None)
+    app.include_router(api_v1_router, prefix='/api/v1')
+    app.add_middleware(LazyAuthenticationMiddleware, backend=AuthenticationBackend())
+    app.add_middleware(http_request_middleware)
+    app.add_middleware(db_session_middleware)
+    app.add_middleware(CORSMiddleware)
+    return app
+
+
+async def main(requests: int, concurrency: int) -> None:
+    apps = {
+        'before': build_app(LegacyDBSessionMiddleware, LegacyHttpRequestMiddleware),
+        'after': build_app(DBSessionMiddleware, HttpRequestMiddleware),
+        'async': build_app(AsyncDBSessionMiddleware, HttpRequestMiddleware),
+    }
+    token = await login(apps['after'])
+    scenarios = {
+        'GET /api/v1/users/': ('GET', {'Authorization': f'Bearer {token}'}),
+        'OPTIONS /api/v1/users/ (preflight)': ('OPTIONS', {
+            'Origin': 'http://example.com',
+            'Access-Control-Request-Method': 'GET',
+        }),
+    }
+    for scenario, (method, headers) in scenarios.items():
+        for name, app in apps.items():
+            # ウォームアップ
+            await run_load(app, method, '/api/v1/users/', headers, requests=100, concurrency=concurrency)
+            result = await run_load(
+                app, method, '/api/v1/users/', headers, requests=requests, concurrency=concurrency)
+            print(f'{scenario:40s} {name:6s} '
+                  f'{result["req_per_sec"]:9.1f} req/s  '
+                  f'p50={result["p50_ms"]:.2f}ms p99={result["p99_ms"]:.2f}ms  '
+                  f'statuses={result["statuses"]}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_user()
+    try:
+        asyncio.get_event_loop().run_until_complete(main(args.requests, args.concurrency))
+    finally:
+        teardown_user()
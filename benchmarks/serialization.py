@@ -0,0 +1,133 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+一覧取得のシリアライズ方式ごとの処理性能を比較するベンチマーク
+
+・orm: モデルのインスタンスを取得し、response_model（List[UserInDB]）で検証してJSONに変換する（UserAPI.gets）
+・fast: UserInDBのカラムのみを行（タプル）で取得し、orjsonで直接JSONに変換する（UserAPI.gets_json）
+
+DATABASE_URLのDBに計測用のユーザーを登録し、1ページ分（--limit件）の取得からJSONへの変換までを計測する
+秒間の処理行数と、1回あたりの確保メモリ量のピーク（tracemalloc）を出力し、終了時に計測用のユーザーを削除する
+
+実行例
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Awaitable, Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.schemas.user import UserInDB
+from api.v1.user import USER_IN_DB_COLUMNS
+from crud import get_async_db_session, get_db_session
+from crud.crud_user import AsyncCRUDUser
+from migrations.models import User
+from utilities.serializer import rows_to_json
+
+USERNAME_PREFIX = 'benchmark-serialization-'
+
+response_field = create_response_field('response', List[UserInDB])
+
+
+async def orm_path(limit: int) -> bytes:
+    """ 変更前の一覧取得と同じ処理（ORM + pydantic + jsonable_encoder + json.dumps）
+    """
+    db_session = get_async_db_session()
+    try:
+        users, _ = await AsyncCRUDUser(db_session).paginate(limit)
+        content = await serialize_response(field=response_field, response_content=users)
+        return JSONResponse(content).body
+    finally:
+        await db_session.close()
+
+
+async def fast_path(limit: int) -> bytes:
+    """ 高速版の一覧取得と同じ処理（行のタプル + orjson）
+    """
+    db_session = get_async_db_session()
+    try:
+        rows, _ = await AsyncCRUDUser(db_session).paginate(limit, columns=USER_IN_DB_COLUMNS)
+        return rows_to_json(rows, USER_IN_DB_COLUMNS)
+    finally:
+        await db_session.close()
+
+
+async def measure(path: Callable[[int], Awaitable[bytes]], limit: int, repeat: int) -> dict:
+    """ 処理時間と確保メモリ量のピークを計測する
+
+    tracemalloc自体が処理を遅くするため、処理時間とメモリ量は別々に計測する
+    """
+    body = await path(limit)  # ウォームアップ
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await path(limit)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    await path(limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'rows_per_sec': limit * repeat / elapsed,
+        'ms_per_page': elapsed / repeat * 1000,
+        'peak_bytes': peak,
+        'body_bytes': len(body),
+    }
+
+
+def setup_users(rows: int) -> None:
+    """ 計測用のユーザーを登録する
+    """
+    db_session = get_db_session()
+    db_session.execute(User.__table__.insert(), [
+        {
+            'username': f'{USERNAME_PREFIX}{i}@example.com',
+            'password': 'password',
+            'last_name': 'benchmark',
+            'first_name': 'benchmark',
+            'is_admin': False,
+            'is_active': True,
+        }
+        for i in range(rows)
+    ])
+    db_session.commit()
+    db_session.remove()
+
+
+def teardown_users() -> None:
+    """ 計測用のユーザーを削除する
+    """
+    db_session = get_db_session()
+    db_session.query(User).filter(User.username.startswith(USERNAME_PREFIX)) \
+        .delete(synchronize_session=False)
+    db_session.commit()
+    db_session.remove()
+
+
+async def main(limit: int, repeat: int) -> None:
+    for name, path in (('orm', orm_path), ('fast', fast_path)):
+        result = await measure(path, limit, repeat)
+        print(f'{name:5s} {result["rows_per_sec"]:10.0f} rows/s  '
+              f'{result["ms_per_page"]:7.2f} ms/page  '
+              f'peak={result["peak_bytes"] / 1024:8.1f} KiB  '
+              f'body={result["body_bytes"]} bytes')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_users(args.rows)
+    try:
+        asyncio.get_event_loop().run_until_complete(main(args.rows, args.repeat))
+    finally:
+        teardown_users()
@@ -13,10 +13,53 @@ class Environment(BaseSettings):
     debug: bool
     database_url: str
     test_database_url: str
+    replica_database_urls: list = []
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
     jwt_algorithm: str
     jwt_secret_key: str
     jwt_access_token_expire: int
     jwt_refresh_token_expire: int
+    page_size_default: int = 100
+    page_size_max: int = 1000
+    stream_batch_size: int = 1000
+    fast_serialization: bool = False
+    bulk_max_items: int = 1000
+    bulk_chunk_size: int = 500
+    db_profiler_allow_header: bool = False
+    db_profiler_n_plus_one_threshold: int = 5
+    log_level: str = 'INFO'
+    log_queue_size: int = 10000
+    log_traceback_interval: float = 60
+    access_log: bool = True
+    login_throttle_ip_burst: int = 20
+    login_throttle_ip_per_minute: float = 20
+    login_throttle_username_burst: int = 5
+    login_throttle_username_per_minute: float = 5
+    login_throttle_max_keys: int = 100000
+    login_throttle_store: str = ''
+    executor_max_workers: int = 10
+    hasher_max_workers: int = os.cpu_count() or 1
+    hasher_max_queue: int = 64
+    password_hasher: str = 'pbkdf2_sha256'
+    password_hash_iterations: int = 36000
+    password_hash_scrypt_n: int = 2 ** 14
+    password_hash_scrypt_r: int = 8
+    password_hash_scrypt_p: int = 1
+    password_rehash_on_login: bool = True
+    auth_user_cache_size: int = 10000
+    auth_user_cache_ttl: int = 60
+    auth_stateless: bool = False
+    auth_revocation_refresh_interval: float = 10
+    jwt_claims_cache_size: int = 10000
+    response_cache_enabled: bool = False
+    response_cache_store: str = ''
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_max_entry_bytes: int = 1024 * 1024
+    response_cache_memcached_address: str = 'localhost:11211'
 
     class Config:
         env_file = os.path.join(PROJECT_ROOT, '.env')
@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, func, or_, select, update
+
+from crud import AsyncBaseCRUD, BaseCRUD
+from migrations.models import RefreshToken
+
+
+class CRUDRefreshToken(BaseCRUD):
+    """ リフレッシュトークンのデータアクセスクラス
+    """
+    model = RefreshToken
+
+    def rotate(self, id: int, generation: int, expires_at: datetime) -> Optional[RefreshToken]:
+        """ 世代を1つ進めて有効期限を延長する
+
+        世代が一致し、失効・期限切れでない場合のみ更新する（条件の確認と更新を1つのSQLで行うため、同じトークンで同時にリフレッシュしても成功するのは1件のみ）
+
+        Returns:
+            Optional[RefreshToken]: 更新後のリフレッシュトークン、条件に一致しない場合はNone
+        """
+        stmt = update(RefreshToken).where(
+            RefreshToken.id == id,
+            RefreshToken.generation == generation,
+            RefreshToken.revoked.is_(False),
+            RefreshToken.expires_at > func.now(),
+        ).values(generation=RefreshToken.generation + 1, expires_at=expires_at).returning(RefreshToken)
+        return self.db_session.execute(
+            select(RefreshToken).from_statement(stmt).execution_options(populate_existing=True),
+        ).scalars().first()
+
+    def revoke(self, id: int) -> None:
+        """ 失効させる
+        """
+        self.db_session.execute(update(RefreshToken).where(RefreshToken.id == id).values(revoked=True))
+
+    def purge(self, user_id: int) -> int:
+        """ ユーザーの失効済み・期限切れのリフレッシュトークンを削除する
+
+        削除したトークンファミリーのトークンは、使用済みのトークンと同様にリフレッシュに失敗する
+        ユーザーIDのインデックスで対象を絞り込むため、ログインのたびに実行できる
+
+        Returns:
+            int: 削除した件数
+        """
+        stmt = delete(RefreshToken).where(
+            RefreshToken.user_id == user_id,
+            or_(RefreshToken.revoked.is_(True), RefreshToken.expires_at <= func.now()),
+        ).execution_options(synchronize_session=False)
+        return self.db_session.execute(stmt).rowcount
+
+
+class AsyncCRUDRefreshToken(AsyncBaseCRUD):
+    """ リフレッシュトークンの非同期データアクセスクラス
+    """
+    crud_class = CRUDRefreshToken
+
+    async def rotate(self, id: int, generation: int, expires_at: datetime) -> Optional[RefreshToken]:
+        """ 世代を1つ進めて有効期限を延長する
+        """
+        return await self.run_sync(lambda crud: crud.rotate(id, generation, expires_at))
+
+    async def revoke(self, id: int) -> None:
+        """ 失効させる
+        """
+        return await self.run_sync(lambda crud: crud.revoke(id))
+
+    async def purge(self, user_id: int) -> int:
+        """ ユーザーの失効済み・期限切れのリフレッシュトークンを削除する
+        """
+        return await self.run_sync(lambda crud: crud.purge(user_id))
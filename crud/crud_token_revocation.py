@@ -0,0 +1,57 @@
+from datetime import timedelta
+from typing import Dict
+
+from sqlalchemy import delete, func, insert, select
+
+from crud import AsyncBaseCRUD, BaseCRUD
+from migrations.models import TokenRevocation
+
+
+class CRUDTokenRevocation(BaseCRUD):
+    """ アクセストークンの失効の記録のデータアクセスクラス
+    """
+    model = TokenRevocation
+
+    def get_versions(self, period: int) -> Dict[int, int]:
+        """ 直近period秒以内の記録から、ユーザーごとに失効させるバージョンを取得
+
+        Returns:
+            Dict[int, int]: ユーザーIDと有効なアクセストークンの最小のバージョン
+        """
+        stmt = select(TokenRevocation.user_id, func.max(TokenRevocation.token_version)) \
+            .where(TokenRevocation.created_at > func.now() - timedelta(seconds=period)) \
+            .group_by(TokenRevocation.user_id)
+        return dict(self.db_session.execute(stmt).all())
+
+    def revoke(self, versions: Dict[int, int], period: int) -> None:
+        """ 失効を記録し、period秒より前の記録（失効させたアクセストークンが有効期限切れになっているもの）を削除
+
+        Args:
+            versions (Dict[int, int]): ユーザーIDと有効なアクセストークンの最小のバージョン
+            period (int): 記録を保持する期間（秒）
+        """
+        if not versions:
+            return
+        self.db_session.execute(
+            delete(TokenRevocation)
+            .where(TokenRevocation.created_at < func.now() - timedelta(seconds=period))
+            .execution_options(synchronize_session=False))
+        self.db_session.execute(insert(TokenRevocation).values([
+            {'user_id': user_id, 'token_version': token_version} for user_id, token_version in versions.items()
+        ]))
+
+
+class AsyncCRUDTokenRevocation(AsyncBaseCRUD):
+    """ アクセストークンの失効の記録の非同期データアクセスクラス
+    """
+    crud_class = CRUDTokenRevocation
+
+    async def get_versions(self, period: int) -> Dict[int, int]:
+        """ 直近period秒以内の記録から、ユーザーごとに失効させるバージョンを取得
+        """
+        return await self.run_sync(lambda crud: crud.get_versions(period))
+
+    async def revoke(self, versions: Dict[int, int], period: int) -> None:
+        """ 失効を記録し、期間より前の記録を削除
+        """
+        return await self.run_sync(lambda crud: crud.revoke(versions, period))
@@ -1,4 +1,8 @@
-from crud import BaseCRUD
+from typing import Dict, List, Sequence
+
+from sqlalchemy import update
+
+from crud import AsyncBaseCRUD, BaseCRUD
 from migrations.models import User
 
 
@@ -6,3 +10,52 @@ class CRUDUser(BaseCRUD):
     """ ユーザーデータアクセスクラスのベース
     """
     model = User
+
+    def get_by_username(self, username: str) -> User:
+        """ ユーザー名で取得
+        """
+        return self.get_query().filter_by(username=username).first()
+
+    def gets_by_usernames(self, usernames: Sequence[str]) -> List[User]:
+        """ ユーザー名のリストで取得
+        """
+        if not usernames:
+            return []
+        return self.get_query().filter(User.username.in_(usernames)).all()
+
+    def increment_token_versions(self, ids: Sequence[int]) -> Dict[int, int]:
+        """ トークンのバージョンを1つ進める
+
+        トークンのバージョンはレスポンスに含まないため、最終更新日時（ETagの元）は更新しない
+
+        Returns:
+            Dict[int, int]: ユーザーIDと更新後のトークンのバージョン（存在しないユーザーは含まない）
+        """
+        if not ids:
+            return {}
+        stmt = update(User).where(User.id.in_(ids)) \
+            .values(token_version=User.token_version + 1, updated_at=User.updated_at) \
+            .returning(User.id, User.token_version) \
+            .execution_options(synchronize_session=False)
+        return dict(self.db_session.execute(stmt).all())
+
+
+class AsyncCRUDUser(AsyncBaseCRUD):
+    """ ユーザーの非同期データアクセスクラス
+    """
+    crud_class = CRUDUser
+
+    async def get_by_username(self, username: str) -> User:
+        """ ユーザー名で取得
+        """
+        return await self.run_sync(lambda crud: crud.get_by_username(username))
+
+    async def gets_by_usernames(self, usernames: Sequence[str]) -> List[User]:
+        """ ユーザー名のリストで取得
+        """
+        return await self.run_sync(lambda crud: crud.gets_by_usernames(usernames))
+
+    async def increment_token_versions(self, ids: Sequence[int]) -> Dict[int, int]:
+        """ トークンのバージョンを1つ進める
+        """
+        return await self.run_sync(lambda crud: crud.increment_token_versions(ids))
@@ -1,24 +1,69 @@
+from typing import Callable
+
 from fastapi import Depends, Request, status
+from starlette.authentication import AuthCredentials, BaseUser
 
 from exceptions import ApiException, create_error
 from exceptions.error_messages import ErrorMessage
-from utilities.authentication import OAuth2PasswordBearer
+from utilities.authentication import OAuth2PasswordBearer, UnauthenticatedUser
 
 OAUTH2_SCHEMA = OAuth2PasswordBearer(tokenUrl='/api/v1/auth/login')
 
 
+def skip_authentication(endpoint: Callable) -> Callable:
+    """ エンドポイントで認証を行わないようにするデコレーター
+
+    LazyAuthenticationMiddlewareは指定したルートでは認証せず、「request.user」を未承認ユーザーにする
+    ルーターへの登録より前に適用すること（@router.postの下に指定する）
+
+    Args:
+        endpoint (Callable): エンドポイント
+
+    Returns:
+        Callable: 認証を行わない設定を付与したエンドポイント
+    """
+    endpoint.skip_authentication = True
+    return endpoint
+
+
+async def authenticate(request: Request) -> BaseUser:
+    """ リクエストを認証してユーザーを返す
+
+    LazyAuthenticationMiddlewareで設定された認証バックエンドで認証し、結果を「request.user」「request.auth」に設定する
+    同じリクエストで2回目以降に呼び出された場合（認証済みの場合）は、認証せずに設定済みのユーザーを返す
+
+    Args:
+        request (Request): リクエスト情報
+
+    Returns:
+        BaseUser: 承認済みユーザー または 未承認ユーザー
+
+    Raises:
+        ApiException: アクセストークンが有効期限切れ、またはユーザーが有効でない場合
+    """
+    if 'user' not in request.scope:
+        assert 'auth_backend' in request.scope, 'LazyAuthenticationMiddlewareを追加してください'
+        auth_result = await request.scope['auth_backend'].authenticate(request)
+        if auth_result is None:
+            auth_result = AuthCredentials(), UnauthenticatedUser()
+        request.scope['auth'], request.scope['user'] = auth_result
+    return request.scope['user']
+
+
 async def login_required(
-    request: Request,
-    token: str = Depends(OAUTH2_SCHEMA)
+    token: str = Depends(OAUTH2_SCHEMA),
+    user: BaseUser = Depends(authenticate),
 ) -> None:
     """ ユーザがログインしているかどうか
 
+    認証ヘッダが無い場合は認証（authenticate）を行わずにエラーにする
+
     Args:
-        request (Request): リクエスト情報
         token (str): アクセストークン
+        user (BaseUser): 認証したユーザー
 
     Raises:
         ApiException: ログインに失敗している場合
     """
-    if not request.user.is_authenticated:
+    if not user.is_authenticated:
         raise ApiException((create_error(ErrorMessage.INVALID_TOKEN)), status_code=status.HTTP_401_UNAUTHORIZED)
@@ -2,8 +2,13 @@ pip3 install -r requirements.txt
 
 alembic upgrade head
 
+# nginx経由のリクエストは接続元がnginxになるため、X-Forwarded-For（nginxが付与した末尾の値）を接続元IPアドレスとして使う
+# （ログインの試行回数の制限は接続元IPアドレスごとに行うため、信頼するプロキシは環境変数「FORWARDED_ALLOW_IPS」で指定する）
 uvicorn main:app\
     --reload\
+    --proxy-headers\
+    --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-127.0.0.1}"\
     --port 8000\
     --host 0.0.0.0\
-    --log-level debug
+    --log-level debug\
+    --no-access-log
@@ -1,4 +1,6 @@
 import traceback
+from typing import Dict, Optional
+
 from fastapi import status, HTTPException
 from exceptions.error_messages import ErrorMessage
 
@@ -11,16 +13,12 @@ class ApiException(HTTPException):
     def __init__(
         self,
         *errors,
-        status_code: int = default_status_code
+        status_code: int = default_status_code,
+        headers: Optional[Dict[str, str]] = None,
     ) -> None:
         self.status_code = status_code
-        self.detail = [
-            {
-                'error_code': str(error['error_code']),
-                'error_msg': error['error_code'].text.format(*error['msg_params']),
-            } for error in list(errors)
-        ]
-        super().__init__(self.status_code, self.detail)
+        self.detail = [format_error(error) for error in list(errors)]
+        super().__init__(self.status_code, self.detail, headers=headers)
 
 
 class SystemException(HTTPException):
@@ -54,3 +52,17 @@ def create_error(error_code: ErrorMessage, *msg_params) -> dict:
         'error_code': error_code(),
         'msg_params': msg_params,
     }
+
+
+def format_error(error: dict) -> dict:
+    """ create_errorで生成したエラーをレスポンス用の形式に変換する
+
+    Examples
+    --------
+    >>> format_error(create_error(messages.INVALID_TOKEN))
+    {'error_code': 'INVALID_TOKEN', 'error_msg': '不正なトークンです'}
+    """
+    return {
+        'error_code': str(error['error_code']),
+        'error_msg': error['error_code'].text.format(*error['msg_params']),
+    }
@@ -13,15 +13,39 @@ class ErrorMessage:
     class INTERNAL_SERVER_ERROR(BaseMessage):
         text = 'システムエラーが発生しました、管理者に問い合わせてください'
 
+    class SERVER_BUSY(BaseMessage):
+        text = 'サーバーが混み合っています、しばらくしてから再度お試しください'
+
     class FAILURE_LOGIN(BaseMessage):
         text = 'ログイン失敗'
 
+    class TOO_MANY_LOGIN_ATTEMPTS(BaseMessage):
+        text = 'ログインの試行回数が多すぎます、しばらくしてから再度お試しください'
+
     class INVALID_EMAIL_OR_PASSWORD(BaseMessage):
         text = 'メールアドレス または パスワードが不正です'
     
     class INVALID_TOKEN(BaseMessage):
         text = '不正なトークンです'
 
+    class INVALID_CURSOR(BaseMessage):
+        text = '不正なカーソルです'
+
+    class NOT_FOUND(BaseMessage):
+        text = 'データが存在しません'
+
+    class DUPLICATE_USERNAME(BaseMessage):
+        text = '既に使用されているユーザー名です'
+
+    class DUPLICATE_ID(BaseMessage):
+        text = '同じIDが複数指定されています'
+
+    class TOO_MANY_ITEMS(BaseMessage):
+        text = '一度に指定できるのは{}件までです'
+
+    class PRECONDITION_FAILED(BaseMessage):
+        text = 'データが他で更新されています、最新のデータを取得して再度お試しください'
+
     class EXPIRED_TOKEN(BaseMessage):
         """ あえてINVALID_TOKENと同じエラーメッセージにしている
         """
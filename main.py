@@ -1,15 +1,14 @@
 from fastapi import FastAPI
-from starlette.middleware.authentication import AuthenticationMiddleware
 
 from api.endpoints.swagger_ui import swagger_ui_router
 from api.endpoints.v1 import api_v1_router
 from core.config import get_env
-from middlewares import (
-    AuthenticationBackend,
-    DBSessionMiddleware,
-    CORSMiddleware,
-    HttpRequestMiddleware
-)
+from dependencies import skip_authentication
+from middlewares import setup_middlewares
+from utilities.logger import setup_logging
+from utilities.metrics import metrics_endpoint
+
+setup_logging()
 
 app = FastAPI(
     docs_url=None,  # Noneを設定しないとswagger-uiのルーターで定義したものに変わらない
@@ -17,12 +16,10 @@ app = FastAPI(
 )
 
 app.include_router(api_v1_router, prefix='/api/v1')
+app.add_route('/metrics', skip_authentication(metrics_endpoint), include_in_schema=False)
 
 # ミドルウェアの設定
-app.add_middleware(AuthenticationMiddleware, backend=AuthenticationBackend())  # 追加（HttpRequestMiddlewareより前に追加）
-app.add_middleware(HttpRequestMiddleware)
-app.add_middleware(DBSessionMiddleware)
-app.add_middleware(CORSMiddleware)
+setup_middlewares(app)
 
 # @app.get("/")
 # async def root():
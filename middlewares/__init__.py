@@ -1,22 +1,62 @@
-from fastapi import Request, Response, status
-from fastapi.responses import JSONResponse
+import json
+import logging
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Type
+
+from fastapi import FastAPI, Request, status
+from fastapi.dependencies.models import Dependant
+from fastapi.responses import JSONResponse, Response
 from fastapi.security.utils import get_authorization_scheme_param  # 追加
 from jose import jwt  # 追加
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import scoped_session
+from starlette.datastructures import MutableHeaders
 from starlette.middleware import authentication, cors  # authentication追加
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.requests import HTTPConnection
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from core.config import get_env
-from crud import get_db_session
-from crud.crud_user import CRUDUser  # 追加
+from crud import get_async_db_session, get_db_session
+from crud.crud_user import AsyncCRUDUser
+from dependencies import authenticate
 from exceptions import (
     ApiException,
     create_error,
     SystemException,
 )
 from exceptions.error_messages import ErrorMessage  # 追加
-from utilities.authentication import AuthenticatedUser, UnauthenticatedUser  # 追加
-from utilities.jwt_handler import jwt_decord_handler  # 追加
+from utilities.authentication import (
+    apply_revoked_tokens,
+    AuthenticatedUser,
+    get_authenticated_user_cache,
+    get_token_revocation_list,
+    pop_revoked_tokens,
+    UnauthenticatedUser,
+)
+from utilities.etag import if_none_match
+from utilities.jwt_handler import jwt_decord_handler, TYPE_ACCESS_TOKEN  # 追加
+from utilities.logger import reset_request_id, set_request_id
+from utilities.metrics import get_route_template, HTTP_REQUESTS_IN_PROGRESS, observe_request
+from utilities.profiler import end_profile, get_current_profile, start_profile
+from utilities.response_cache import (
+    decode_entry,
+    encode_entry,
+    get_cache_policy,
+    get_response_cache,
+    invalidate_changed_tables,
+    pop_changed_tables,
+    SCOPE_PUBLIC,
+    SCOPE_USER,
+)
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('access')
+
+# クライアントから受け取るリクエストIDの形式（ログを汚染されないよう、これ以外の値は使わずに新しく生成する）
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
 
 
 class CORSMiddleware(cors.CORSMiddleware):
@@ -27,60 +67,549 @@ class CORSMiddleware(cors.CORSMiddleware):
             allow_methods=cors.ALL_METHODS,
             allow_headers=get_env().allow_headers,
             allow_credentials=True,
+            expose_headers=[
+                'X-Request-ID', 'X-Next-Cursor', 'X-Cache', 'X-DB-Query-Count', 'X-DB-Time-ms', 'X-DB-Profile-Summary',
+            ],
         )
 
 
-class DBSessionMiddleware(BaseHTTPMiddleware):
+class DBSessionState(dict):
+    """ DBセッションを初回アクセス時に生成するリクエストステート
+
+    「request.state」の実体（scope['state']）として使用する
+    「request.state.db_session」が参照されるまでDBセッションを生成しないため、
+    CORSのプリフライトリクエストや「/docs」などDBを使用しないリクエストではDBセッションが生成されない
+    """
+    def __init__(self, session_factory: Callable[[], scoped_session], *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.session_factory = session_factory
+
+    def __missing__(self, key: str) -> Any:
+        """ 存在しないキーへのアクセス時の処理
+
+        Args:
+            key (str): キー
+
+        Returns:
+            Any: キーが「db_session」の場合は新しく生成したDBセッション
+
+        Raises:
+            KeyError: キーが「db_session」以外の場合
+        """
+        if key != 'db_session':
+            raise KeyError(key)
+        db_session = self['db_session'] = self.session_factory()
+        return db_session
+
+    @property
+    def has_db_session(self) -> bool:
+        """ DBセッションが生成済みかどうか
+        """
+        return 'db_session' in self
+
+    async def commit(self) -> None:
+        """ DBセッションが生成済みの場合はコミットし、失効させたトークンを失効リストに追加して、
+        登録・更新・削除したテーブルのレスポンスのキャッシュを無効化する
+        """
+        if self.has_db_session:
+            self['db_session'].commit()
+            apply_revoked_tokens(self['db_session'])
+            await invalidate_changed_tables(self['db_session'])
+
+    async def rollback(self) -> None:
+        """ DBセッションが生成済みの場合はロールバックする
+        """
+        if self.has_db_session:
+            self['db_session'].rollback()
+            pop_revoked_tokens(self['db_session'])
+            pop_changed_tables(self['db_session'])
+
+    async def remove(self) -> None:
+        """ DBセッションが生成済みの場合は破棄する
+        """
+        if self.has_db_session:
+            self['db_session'].remove()
+
+
+class DBSessionMiddleware:
     """ リクエスト情報にDBセッションを設定するミドルウェア
+
+    DBセッションは「request.state.db_session」への初回アクセス時に生成される
     """
-    async def dispatch(self, request: Request, call_next) -> Response:
+    state_class = DBSessionState
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    def get_db_session(self) -> scoped_session:
+        """ リクエストで使用するDBセッションを返す
+
+        Returns:
+            scoped_session: DBセッション
+        """
+        return get_db_session()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """ ミドルウェアの処理
 
         Args:
-            request (Request): リクエスト情報
-            call_next (method): 次の処理
+            scope (Scope): リクエストのスコープ
+            receive (Receive): 受信処理
+            send (Send): 送信処理
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        scope['state'] = self.state_class(self.get_db_session, scope.get('state', {}))
+        await self.app(scope, receive, send)
+
+
+class AsyncDBSessionState(DBSessionState):
+    """ 非同期DBセッションを初回アクセス時に生成するリクエストステート
+    """
+    async def commit(self) -> None:
+        """ DBセッションが生成済みの場合はコミットし、失効させたトークンを失効リストに追加して、
+        登録・更新・削除したテーブルのレスポンスのキャッシュを無効化する
+        """
+        if self.has_db_session:
+            await self['db_session'].commit()
+            apply_revoked_tokens(self['db_session'])
+            await invalidate_changed_tables(self['db_session'])
+
+    async def rollback(self) -> None:
+        """ DBセッションが生成済みの場合はロールバックする
+        """
+        if self.has_db_session:
+            await self['db_session'].rollback()
+            pop_revoked_tokens(self['db_session'])
+            pop_changed_tables(self['db_session'])
+
+    async def remove(self) -> None:
+        """ DBセッションが生成済みの場合は破棄する
+        """
+        if self.has_db_session:
+            await self['db_session'].close()
+
+
+class AsyncDBSessionMiddleware(DBSessionMiddleware):
+    """ リクエスト情報に非同期DBセッション（AsyncSession）を設定するミドルウェア
+
+    DBセッションは「request.state.db_session」への初回アクセス時に生成される
+    """
+    state_class = AsyncDBSessionState
+
+    def get_db_session(self) -> AsyncSession:
+        """ リクエストで使用するDBセッションを返す
 
         Returns:
-            Response: レスポンス
+            AsyncSession: 非同期DBセッション
         """
-        request.state.db_session = get_db_session()
-        return await call_next(request)
+        return get_async_db_session()
 
 
-class HttpRequestMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
+class HttpRequestMiddleware:
+    """ リクエストの結果に応じてDBセッションのコミット・ロールバックを行うミドルウェア
+
+    ・レスポンスの送信開始前にコミットする（コミットに失敗した場合はシステムエラーを返す）
+    ・例外が発生した場合はロールバックしてエラーレスポンスを返す
+    ・DBセッションの破棄はレスポンスの送信完了後に必ず行う
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """ ミドルウェアの処理
+
+        Args:
+            scope (Scope): リクエストのスコープ
+            receive (Receive): 受信処理
+            send (Send): 送信処理
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        state: DBSessionState = scope['state']
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            # 正常終了時（レスポンスの送信開始前にコミット）
+            if message['type'] == 'http.response.start':
+                await state.commit()
+                response_started = True
+            await send(message)
+
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
 
         except ApiException as ae:
-            request.state.db_session.rollback()
-            return JSONResponse(
+            await state.rollback()
+            if response_started:
+                raise
+            await JSONResponse(
                 ae.detail,
-                status_code=ae.status_code)
+                status_code=ae.status_code,
+                headers=ae.headers)(scope, receive, send)
 
         # 予期せぬ例外
         except Exception as e:
-            request.state.db_session.rollback()
+            await state.rollback()
+            if response_started:
+                raise
             se = SystemException(e)
-            print(se.stack_trace)
-            return JSONResponse(
+            logger.error('予期せぬエラーが発生しました: %s %s', scope['method'], scope['path'], exc_info=e)
+            await JSONResponse(
                 se.detail,
-                status_code=se.status_code)
-
-        # 正常終了時
-        else:
-            request.state.db_session.commit()
-            return response
+                status_code=se.status_code)(scope, receive, send)
 
         # DBセッションの破棄は必ず行う
         finally:
-            request.state.db_session.remove()
+            await state.remove()
+
+
+class MetricsMiddleware:
+    """ HTTPリクエストのメトリクス（件数・処理時間・処理中の件数）を記録するミドルウェア
+
+    ラベルには生のパスではなくルートのテンプレート（例: /api/v1/users/{id}/）を使用する
+    処理時間はレスポンスの送信完了（ストリーミングの場合は最後のボディの送信）までの時間
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """ ミドルウェアの処理
+
+        Args:
+            scope (Scope): リクエストのスコープ
+            receive (Receive): 受信処理
+            send (Send): 送信処理
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            observe_request(method, get_route_template(scope), status_code, time.perf_counter() - started)
+
+
+class AccessLogMiddleware:
+    """ リクエストIDの設定とアクセスログの出力を行うミドルウェア
+
+    ・リクエストヘッダ「X-Request-ID」の値（無い場合・形式が不正な場合は生成した値）をリクエストIDとし、
+      処理中に出力したログに付与して、レスポンスヘッダ「X-Request-ID」にも設定する
+    ・レスポンスの送信完了（ストリーミングの場合は最後のボディの送信）後にアクセスログを出力する
+
+    全てのログにリクエストIDを付与するため、最後に（最も外側に）追加すること
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """ ミドルウェアの処理
+
+        Args:
+            scope (Scope): リクエストのスコープ
+            receive (Receive): 受信処理
+            send (Send): 送信処理
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope['headers']).get(b'x-request-id', b'').decode('latin-1')
+        if not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        token = set_request_id(request_id)
+
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        response_bytes = 0
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                MutableHeaders(scope=message)['X-Request-ID'] = request_id
+            elif message['type'] == 'http.response.body':
+                response_bytes += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if get_env().access_log:
+                client = scope.get('client')
+                access_logger.info(
+                    '%s %s %d', scope['method'], scope['path'], status_code,
+                    extra={
+                        'method': scope['method'],
+                        'path': scope['path'],
+                        'status': status_code,
+                        'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+                        'response_bytes': response_bytes,
+                        'client': client[0] if client else None,
+                    },
+                )
+            reset_request_id(token)
+
+
+class QueryProfilerMiddleware:
+    """ リクエストで実行したSQLの回数・実行時間をレスポンスヘッダに設定するミドルウェア
+
+    以下の場合に有効になる
+    ・環境変数「DEBUG」がTrueの場合
+    ・環境変数「DB_PROFILER_ALLOW_HEADER」がTrueで、リクエストヘッダ「X-DB-Profile」が指定された場合
+
+    レスポンスヘッダ
+    ・X-DB-Query-Count: SQLの実行回数
+    ・X-DB-Time-ms: SQLの実行時間の合計（ミリ秒）
+    ・X-DB-Profile-Summary: リクエストヘッダ「X-DB-Profile: summary」の場合のみ、SQLの形ごとの内訳（JSON）
+
+    認証（AuthenticationBackend）のSQLも含めるため、DBセッションのミドルウェアより外側に追加すること
+    レスポンスの送信開始後に実行したSQL（ストリーミングなど）はヘッダに含まれない
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """ ミドルウェアの処理
+
+        Args:
+            scope (Scope): リクエストのスコープ
+            receive (Receive): 受信処理
+            send (Send): 送信処理
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        profile_header = dict(scope['headers']).get(b'x-db-profile', b'').decode('latin-1').lower()
+        if not get_env().debug and not (get_env().db_profiler_allow_header and profile_header):
+            await self.app(scope, receive, send)
+            return
+
+        threshold = get_env().db_profiler_n_plus_one_threshold
+        token = start_profile()
+        profile = get_current_profile()
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                headers['X-DB-Query-Count'] = str(profile.count)
+                headers['X-DB-Time-ms'] = f'{profile.total_time * 1000:.2f}'
+                if profile_header == 'summary':
+                    headers['X-DB-Profile-Summary'] = json.dumps(profile.summary(threshold), separators=(',', ':'))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_profile(token)
+            for statement, count in profile.n_plus_one(threshold).items():
+                logger.warning('N+1の可能性があります（%s %s、%d回）: %s', scope['method'], scope['path'], count, statement)
+
+
+class LazyAuthenticationMiddleware:
+    """ 認証を必要になるまで遅延させるミドルウェア
+
+    StarletteのAuthenticationMiddlewareは全てのリクエストで認証（JWTの検証・ユーザーの取得）を行うが、
+    このミドルウェアはリクエストに一致したルートに応じて、認証を行う時点を決める
+    ・認証の依存関係（dependencies.authenticate・login_required）を指定したルート
+      認証バックエンドをスコープに設定するだけにし、依存関係で必要になった時に1回だけ認証する
+    ・dependencies.skip_authenticationを指定したルート、一致するルートが無いリクエスト
+      認証せずに「request.user」を未承認ユーザーにする
+    ・それ以外のルート
+      「request.user」は同期的なプロパティで、参照した時点では認証（非同期のDBへの問い合わせ）を行えないため、
+      エンドポイントの実行前に1回だけ認証する
+    """
+    def __init__(self, app: ASGIApp, backend: authentication.AuthenticationBackend) -> None:
+        self.app = app
+        self.backend = backend
+        self.lazy_routes: Dict[int, bool] = {}  # ルートのIDごとの遅延できるかどうか
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """ ミドルウェアの処理
+
+        Args:
+            scope (Scope): リクエストのスコープ
+            receive (Receive): 受信処理
+            send (Send): 送信処理
+        """
+        if scope['type'] in ('http', 'websocket'):
+            route = self.__match_route(scope)
+            if route is None or getattr(getattr(route, 'endpoint', None), 'skip_authentication', False):
+                scope['auth'], scope['user'] = authentication.AuthCredentials(['unauthenticated']), UnauthenticatedUser()
+            else:
+                scope['auth_backend'] = self.backend
+                if not self.__is_lazy(route):
+                    await authenticate(HTTPConnection(scope, receive))
+        await self.app(scope, receive, send)
+
+    def __match_route(self, scope: Scope) -> Optional[BaseRoute]:
+        """ リクエストに一致したルートを返す
+
+        Args:
+            scope (Scope): リクエストのスコープ
+
+        Returns:
+            Optional[BaseRoute]: 一致したルート（無い場合はNone）
+        """
+        for route in getattr(scope.get('app'), 'routes', []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    def __is_lazy(self, route: BaseRoute) -> bool:
+        """ ルートの依存関係で認証する（認証を遅延できる）かどうか
+
+        Args:
+            route (BaseRoute): ルート
+
+        Returns:
+            bool: 依存関係にdependencies.authenticateを含む場合はTrue
+        """
+        if id(route) not in self.lazy_routes:
+            dependant = getattr(route, 'dependant', None)
+            self.lazy_routes[id(route)] = dependant is not None and self.__depends_on_authenticate(dependant)
+        return self.lazy_routes[id(route)]
+
+    def __depends_on_authenticate(self, dependant: Dependant) -> bool:
+        """ 依存関係（サブ依存関係を含む）にdependencies.authenticateを含むかどうか
+
+        Args:
+            dependant (Dependant): 依存関係
+
+        Returns:
+            bool: 含む場合はTrue
+        """
+        return dependant.call is authenticate or any(
+            self.__depends_on_authenticate(sub_dependant) for sub_dependant in dependant.dependencies
+        )
+
+
+class ResponseCacheMiddleware:
+    """ GETのレスポンスをキャッシュするミドルウェア
+
+    エンドポイントにcache_responseを指定したルートのみキャッシュする（utilities.response_cache）
+    ・認証が必要な範囲の場合は先に認証し（dependencies.authenticate）、承認済みユーザーでない場合はキャッシュしない
+    ・ヒットした場合はアプリケーション（DBへの問い合わせ・シリアライズ）を実行せずに保存済みのバイト列を返す
+      If-None-MatchがキャッシュのETagと一致する場合は304を返す
+    ・ステータスが200でContent-Lengthが上限以下のレスポンスのみ保存する（ストリーミングのレスポンスは保存しない）
+    ・レスポンスヘッダ「X-Cache」にヒット（HIT）・ミス（MISS）を設定する
+    認証の結果を使用するため、LazyAuthenticationMiddlewareより前に追加すること（ルーターの直前で実行する）
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """ ミドルウェアの処理
+
+        Args:
+            scope (Scope): リクエストのスコープ
+            receive (Receive): 受信処理
+            send (Send): 送信処理
+        """
+        if scope['type'] != 'http' or scope['method'] != 'GET' or not get_env().response_cache_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        route_path, policy = get_cache_policy(scope)
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        auth_scope = SCOPE_PUBLIC
+        if policy.scope != SCOPE_PUBLIC:
+            # 認証に失敗した場合のエラーはルートの依存関係で返す
+            try:
+                user = await authenticate(request)
+            except ApiException:
+                await self.app(scope, receive, send)
+                return
+            if not user.is_authenticated:
+                await self.app(scope, receive, send)
+                return
+            auth_scope = f'user:{user.id}' if policy.scope == SCOPE_USER else policy.scope
+
+        # キャッシュの保存先に接続できない場合はキャッシュしない
+        cache = get_response_cache()
+        versions = await cache.get_versions(policy.tables)
+        if versions is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = '|'.join([
+            route_path,
+            ','.join(f'{table}={version}' for table, version in zip(policy.tables, versions)),
+            auth_scope,
+            scope['path'],
+            scope['query_string'].decode('latin-1'),
+            request.headers.get('accept', ''),
+        ])
+        entry = await cache.get(key)
+        if entry is not None:
+            status_code, raw_headers, body = decode_entry(entry)
+            headers = MutableHeaders(raw=raw_headers)
+            if 'etag' in headers and if_none_match(request.headers.get('if-none-match'), headers['etag']):
+                await Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={
+                    'ETag': headers['etag'],
+                    'X-Cache': 'HIT',
+                })(scope, receive, send)
+                return
+            headers['X-Cache'] = 'HIT'
+            await send({'type': 'http.response.start', 'status': status_code, 'headers': headers.raw})
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        # 保存するレスポンスのステータス・ヘッダ（保存しない場合はNone）
+        cached_start: Optional[Message] = None
+        chunks = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal cached_start
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                content_length = headers.get('content-length')
+                if message['status'] == status.HTTP_200_OK and content_length is not None \
+                        and int(content_length) <= get_env().response_cache_max_entry_bytes:
+                    # 保存するヘッダにはX-Cacheを含めない
+                    cached_start = {'status': message['status'], 'headers': list(message['headers'])}
+                headers['X-Cache'] = 'MISS'
+            elif message['type'] == 'http.response.body' and cached_start is not None:
+                chunks.append(message.get('body', b''))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        if cached_start is not None:
+            entry = encode_entry(cached_start['status'], cached_start['headers'], b''.join(chunks))
+            await cache.set(key, entry, policy.ttl)
 
 
 class AuthenticationBackend(authentication.AuthenticationBackend):
     """ 認証ミドルウェアのバックエンド
 
     このミドルウェアを認証バックエンドとして使用することで、リクエストのユーザー情報に「request.user」でアクセス可能になる
+    （LazyAuthenticationMiddlewareの場合は、ルートに応じて認証を行う時点を遅延させる）
     """
     async def authenticate(self, request: Request) -> None:
         """ 認証処理
@@ -105,15 +634,60 @@ class AuthenticationBackend(authentication.AuthenticationBackend):
 
         # その他エラーの場合は「未承認ユーザー」を返す
         except Exception as e:
-            print(e)
+            logger.info('アクセストークンを検証できませんでした: %s', e)
+            return authentication.AuthCredentials(['unauthenticated']), UnauthenticatedUser()
+
+        # アクセストークン以外（リフレッシュトークンなど）の場合は「未承認ユーザー」を返す
+        if claims.get('token_type') != TYPE_ACCESS_TOKEN:
             return authentication.AuthCredentials(['unauthenticated']), UnauthenticatedUser()
 
-        # クレームセットのユーザーIDでユーザーを取得
-        user = CRUDUser(request.state.db_session).get_by_id(claims['user_id'])
+        # ステートレス認証の場合は、失効リストを確認してクレームセットのユーザー情報を使用する
+        # （失効リストを読み込めない状態が続いている場合は、DBからユーザーを取得して確認する）
+        user_id = claims['user_id']
+        if get_env().auth_stateless and 'token_version' in claims:
+            revocations = get_token_revocation_list()
+            await revocations.refresh_if_stale()
+            if revocations.is_fresh():
+                if not claims['is_active'] or revocations.is_revoked(user_id, claims['token_version']):
+                    raise ApiException(create_error(ErrorMessage.INVALID_TOKEN))
+                return authentication.AuthCredentials(['authenticated']), AuthenticatedUser(user_id, claims['username'])
+
+        # クレームセットのユーザーIDでユーザーを取得（キャッシュに無い場合のみDBから取得）
+        cache = get_authenticated_user_cache()
+        cached_user = cache.get(user_id)
+        if cached_user is None:
+            user = await AsyncCRUDUser(request.state.db_session).get_by_id(user_id)
+
+            # ユーザーを取得できなかった場合はエラー
+            if not user:
+                raise ApiException(create_error(ErrorMessage.INVALID_TOKEN))
+            cached_user = (user.username, user.is_active)
+            cache.set(user_id, cached_user)
+        username, is_active = cached_user
 
-        # 下記いずれかの場合はエラー
-        # ・ユーザーを取得できなかった場合
-        # ・ユーザーを取得できたが、非アクティブ
-        if not user or not user.is_active:
+        # ユーザーを取得できたが、非アクティブの場合はエラー
+        if not is_active:
             raise ApiException(create_error(ErrorMessage.INVALID_TOKEN))
-        return authentication.AuthCredentials(['authenticated']), AuthenticatedUser(user)
+        return authentication.AuthCredentials(['authenticated']), AuthenticatedUser(user_id, username)
+
+
+def setup_middlewares(app: FastAPI, db_session_middleware: Type[DBSessionMiddleware] = AsyncDBSessionMiddleware) -> None:
+    """ アプリケーションにミドルウェアを追加する
+
+    後に追加したミドルウェアほど先に実行される
+    テストでは、本番と同じ構成でDBセッションのミドルウェアのみをテスト用に差し替えて使用する
+
+    Args:
+        app (FastAPI): アプリケーション
+        db_session_middleware (Type[DBSessionMiddleware]): DBセッションを設定するミドルウェア
+    """
+    # レスポンスのキャッシュは認証の結果を使用するため最初に追加（ルーターの直前で実行する）
+    app.add_middleware(ResponseCacheMiddleware)
+    # 認証は必要なルートの依存関係で行う（HttpRequestMiddlewareより前に追加）
+    app.add_middleware(LazyAuthenticationMiddleware, backend=AuthenticationBackend())
+    app.add_middleware(HttpRequestMiddleware)
+    app.add_middleware(db_session_middleware)
+    app.add_middleware(QueryProfilerMiddleware)
+    app.add_middleware(CORSMiddleware)
+    app.add_middleware(MetricsMiddleware)  # CORSのプリフライトリクエストも計測するため最後に追加
+    app.add_middleware(AccessLogMiddleware)  # 全てのログにリクエストIDを付与するため最後に追加
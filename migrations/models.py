@@ -1,12 +1,13 @@
 from sqlalchemy import (
     BOOLEAN,
     Column,
+    ForeignKey,
     INTEGER,
     TEXT,
     TIMESTAMP,
     VARCHAR,
 )
-from sqlalchemy.ext.declarative import declarative_base, declared_attr
+from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql.functions import current_timestamp
 
 Base = declarative_base()
@@ -39,15 +40,16 @@ class BaseModel(Base):
         comment='最終更新日時',
     )
 
-    @declared_attr
-    def __mapper_args__(cls):
+    @classmethod
+    def default_order_by(cls) -> tuple:
         """ デフォルトのオーダリングは主キーの昇順
 
+        SQLAlchemy 1.4でmapperのorder_byが廃止されたため、データアクセスクラス（crud.BaseCRUD）で使用する
+
         降順にしたい場合
-        from sqlalchemy import desc
-        # return {'order_by': desc('id')}
+        # return (cls.id.desc(),)
         """
-        return {'order_by': 'id'}
+        return (cls.id,)
 
 
 class User(BaseModel):
@@ -59,3 +61,37 @@ class User(BaseModel):
     first_name = Column(VARCHAR(100), nullable=False)
     is_admin = Column(BOOLEAN, nullable=False, default=False)
     is_active = Column(BOOLEAN, nullable=False, default=True)
+    token_version = Column(
+        INTEGER,
+        nullable=False,
+        default=0,
+        server_default='0',
+        comment='トークンのバージョン（ステートレス認証で、これより古いバージョンのアクセストークンは失効している）',
+    )
+
+
+class RefreshToken(BaseModel):
+    """ リフレッシュトークン
+
+    ログインごとに1件登録し、リフレッシュのたびに世代（generation）を進めて新しいリフレッシュトークンを発行する
+    トークンには登録したIDと世代を含め、世代が一致しないトークン（使用済みのトークン）が使用された場合は漏洩とみなして失効させる
+    """
+    __tablename__ = 'refresh_tokens'
+
+    user_id = Column(INTEGER, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    generation = Column(INTEGER, nullable=False, default=0, comment='世代（リフレッシュした回数）')
+    revoked = Column(BOOLEAN, nullable=False, default=False, comment='失効したかどうか')
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, comment='有効期限')
+
+
+class TokenRevocation(BaseModel):
+    """ アクセストークンの失効の記録
+
+    ステートレス認証（AUTH_STATELESS）で、ユーザーの更新・削除時に1件登録する
+    各ワーカーはアクセストークンの有効期間内の記録を定期的に読み込み、ユーザーごとに失効させるバージョンを保持する
+    ユーザーを削除した後も参照するため、ユーザーへの外部キーは設定しない
+    """
+    __tablename__ = 'token_revocations'
+
+    user_id = Column(INTEGER, nullable=False, index=True)
+    token_version = Column(INTEGER, nullable=False, comment='有効なアクセストークンの最小のバージョン')
@@ -0,0 +1,243 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from fastapi import status
+
+from core.config import get_env
+from sqlalchemy import select
+
+from crud.crud_refresh_token import AsyncCRUDRefreshToken
+from crud.crud_token_revocation import AsyncCRUDTokenRevocation
+from crud.crud_user import AsyncCRUDUser
+from middlewares import AsyncDBSessionState
+from migrations.models import RefreshToken
+from tests.base import BaseTestCase
+from tests.helpers import run
+from utilities.authentication import get_token_revocation_list
+from utilities.hasher import make_password
+from utilities.throttle import get_login_throttle
+
+
+class TestAuthAPI(BaseTestCase):
+    """ 認証APIのテストクラス
+    """
+    LOGIN_URL = '/api/v1/auth/login/'
+    REFRESH_URL = '/api/v1/auth/refresh/'
+
+    def setup_method(self, method) -> None:
+        get_login_throttle.cache_clear()
+
+    def setup_data(self) -> None:
+        run(AsyncCRUDUser(self.db_session).create({
+            'username': 'auth@example.com',
+            'password': make_password('password'),
+            'last_name': 'last_name',
+            'first_name': 'first_name',
+        }))
+        run(self.db_session.commit())
+
+    def login(self, password: str = 'password') -> dict:
+        response = self.client.post(self.LOGIN_URL, data={'username': 'auth@example.com', 'password': password})
+        assert response.status_code == status.HTTP_200_OK
+        return json.loads(response._content)
+
+    def refresh(self, refresh_token: str):
+        return self.client.post(self.REFRESH_URL, data={'refresh_token': refresh_token})
+
+    def test_login_returns_refresh_token(self):
+        """ ログインでアクセストークンとリフレッシュトークンが返されること
+        """
+        response_data = self.login()
+        assert response_data['token_type'] == 'bearer'
+        assert response_data['access_token']
+        assert response_data['refresh_token']
+
+    def test_login_rehashes_password(self):
+        """ ストレッチングの回数を変更した場合、ログイン時に新しい回数でハッシュ化し直されること
+        """
+        iterations = get_env().password_hash_iterations
+        get_env().password_hash_iterations = 1000
+        try:
+            self.login()
+        finally:
+            get_env().password_hash_iterations = iterations
+
+        user = run(AsyncCRUDUser(self.db_session).get_by_username('auth@example.com'))
+        assert user.password.startswith('pbkdf2_sha256$1000$')
+        self.login()
+
+    def test_refresh_rotates_token(self):
+        """ リフレッシュのたびに新しいリフレッシュトークンが返されること
+        """
+        first = self.login()
+        response = self.refresh(first['refresh_token'])
+        assert response.status_code == status.HTTP_200_OK
+        second = json.loads(response._content)
+        assert second['access_token']
+        assert second['refresh_token'] != first['refresh_token']
+
+        # 新しいリフレッシュトークンで再度リフレッシュできること
+        response = self.refresh(second['refresh_token'])
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_refresh_reuse_revokes_family(self):
+        """ 使用済みのリフレッシュトークンを再使用すると、同じログインのリフレッシュトークンがすべて失効すること
+        """
+        first = self.login()
+        second = json.loads(self.refresh(first['refresh_token'])._content)
+
+        response = self.refresh(first['refresh_token'])
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = self.refresh(second['refresh_token'])
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_refresh_reuse_commits_revocation(self):
+        """ 再使用を検出した場合は、エラーを返す前に失効をコミットすること
+        """
+        first = self.login()
+        self.refresh(first['refresh_token'])
+
+        commit = AsyncDBSessionState.commit
+        with mock.patch.object(AsyncDBSessionState, 'commit', autospec=True, side_effect=commit) as mocked:
+            response = self.refresh(first['refresh_token'])
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert mocked.call_count == 2  # 失効時とレスポンスの送信開始時
+
+    def test_refresh_inactive_user(self):
+        """ ユーザーが有効でない場合はリフレッシュできず、トークンファミリーが失効すること
+        """
+        refresh_token = self.login()['refresh_token']
+        crud = AsyncCRUDUser(self.db_session)
+        user = run(crud.update(run(crud.get_by_username('auth@example.com')), {'is_active': False}))
+        user_id = user.id
+
+        response = self.refresh(refresh_token)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert all(token.revoked for token in self.get_refresh_tokens(user_id))
+
+    def test_login_purges_refresh_tokens(self):
+        """ ログイン時に、失効済み・期限切れのリフレッシュトークンが削除されること
+        """
+        user_id = run(AsyncCRUDUser(self.db_session).get_by_username('auth@example.com')).id
+        now = datetime.now(timezone.utc)
+        crud = AsyncCRUDRefreshToken(self.db_session)
+        run(crud.create({'user_id': user_id, 'expires_at': now - timedelta(seconds=1)}))
+        run(crud.create({'user_id': user_id, 'expires_at': now + timedelta(days=1), 'revoked': True}))
+        valid_id = run(crud.create({'user_id': user_id, 'expires_at': now + timedelta(days=1)})).id
+
+        refresh_token = self.login()['refresh_token']
+        tokens = self.get_refresh_tokens(user_id)
+        assert len(tokens) == 2
+        assert valid_id in {token.id for token in tokens}
+        assert self.refresh(refresh_token).status_code == status.HTTP_200_OK
+
+    def get_refresh_tokens(self, user_id: int) -> list:
+        statement = select(RefreshToken).filter_by(user_id=user_id).execution_options(populate_existing=True)
+        return run(self.db_session.execute(statement)).scalars().all()
+
+    def test_refresh_rejects_access_token(self):
+        """ アクセストークンではリフレッシュできないこと
+        """
+        response = self.refresh(self.login()['access_token'])
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_refresh_token_is_not_accepted_as_access_token(self):
+        """ リフレッシュトークンを認証ヘッダに指定しても認証されないこと
+        """
+        refresh_token = self.login()['refresh_token']
+        response = self.client.get('/api/v1/users/', headers={'Authorization': f'Bearer {refresh_token}'})
+        assert response.status_code != status.HTTP_200_OK
+
+
+class TestStatelessAuthentication(TestAuthAPI):
+    """ ステートレス認証のテストクラス
+    """
+    USER_URL = '/api/v1/users/'
+
+    def setup_method(self, method) -> None:
+        get_env().auth_stateless = True
+        super().setup_method(method)
+        get_token_revocation_list.cache_clear()
+        get_token_revocation_list().loader = lambda: AsyncCRUDTokenRevocation(self.db_session).get_versions(
+            get_env().jwt_access_token_expire)
+
+    def teardown_method(self, method) -> None:
+        get_env().auth_stateless = False
+        get_token_revocation_list.cache_clear()
+
+    def update_user(self, headers: dict, password: str, last_name: str = 'last_name', is_active: bool = None):
+        user = run(AsyncCRUDUser(self.db_session).get_by_username('auth@example.com'))
+        return self.client.put(f'{self.USER_URL}{user.id}/', headers=headers, json={
+            'username': 'auth@example.com',
+            'password': password,
+            'last_name': last_name,
+            'first_name': 'first_name',
+            'is_admin': False,
+            'is_active': is_active,
+        })
+
+    def test_update_keeps_access_token(self):
+        """ パスワードを変更しない更新では、発行済みのアクセストークンを失効させないこと
+        """
+        headers = {'Authorization': f'Bearer {self.login()["access_token"]}'}
+        hashed_password = run(AsyncCRUDUser(self.db_session).get_by_username('auth@example.com')).password
+
+        response = self.update_user(headers, 'password', last_name='updated')
+        assert response.status_code == status.HTTP_200_OK
+        assert self.client.get(self.USER_URL, headers=headers).status_code == status.HTTP_200_OK
+        assert run(AsyncCRUDUser(self.db_session).get_by_username('auth@example.com')).password == hashed_password
+
+    def test_update_revokes_access_token(self):
+        """ パスワードを変更すると、発行済みのアクセストークンが失効すること
+        """
+        access_token = self.login()['access_token']
+        headers = {'Authorization': f'Bearer {access_token}'}
+        assert self.client.get(self.USER_URL, headers=headers).status_code == status.HTTP_200_OK
+
+        response = self.update_user(headers, 'new-password')
+        assert response.status_code == status.HTTP_200_OK
+        assert self.client.get(self.USER_URL, headers=headers).status_code != status.HTTP_200_OK
+
+        # DBから読み込み直しても失効したままであること
+        get_token_revocation_list().versions = {}
+        run(get_token_revocation_list().refresh())
+        assert self.client.get(self.USER_URL, headers=headers).status_code != status.HTTP_200_OK
+
+        # 再ログインしたアクセストークンは使用できること
+        access_token = self.login('new-password')['access_token']
+        response = self.client.get(self.USER_URL, headers={'Authorization': f'Bearer {access_token}'})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_update_deactivation_revokes_access_token(self):
+        """ ユーザーを無効にすると、発行済みのアクセストークンが失効すること
+        """
+        access_token = self.login()['access_token']
+        headers = {'Authorization': f'Bearer {access_token}'}
+
+        response = self.update_user(headers, 'password', is_active=True)
+        assert response.status_code == status.HTTP_200_OK
+        assert self.client.get(self.USER_URL, headers=headers).status_code == status.HTTP_200_OK
+
+        response = self.update_user(headers, 'password', is_active=False)
+        assert response.status_code == status.HTTP_200_OK
+        assert run(AsyncCRUDUser(self.db_session).get_by_username('auth@example.com')).is_active is False
+        assert self.client.get(self.USER_URL, headers=headers).status_code != status.HTTP_200_OK
+        assert get_token_revocation_list().is_revoked(response.json()['id'], 0)
+
+    def test_bulk_update_revokes_changed_password_only(self):
+        """ 一括更新では、パスワードを変更したユーザーのアクセストークンのみ失効すること
+        """
+        headers = {'Authorization': f'Bearer {self.login()["access_token"]}'}
+        user = run(AsyncCRUDUser(self.db_session).get_by_username('auth@example.com'))
+        data = {'id': user.id, 'username': 'auth@example.com', 'last_name': 'updated', 'first_name': 'first_name',
+                'is_admin': False}
+
+        response = self.client.put(f'{self.USER_URL}bulk/', headers=headers, json=[{**data, 'password': 'password'}])
+        assert response.status_code == status.HTTP_200_OK
+        assert self.client.get(self.USER_URL, headers=headers).status_code == status.HTTP_200_OK
+
+        response = self.client.put(f'{self.USER_URL}bulk/', headers=headers, json=[{**data, 'password': 'changed'}])
+        assert response.status_code == status.HTTP_200_OK
+        assert self.client.get(self.USER_URL, headers=headers).status_code != status.HTTP_200_OK
@@ -1,7 +1,11 @@
 import json
-from crud.crud_user import CRUDUser
+from api.v1.user import UserAPI
+from crud.crud_user import AsyncCRUDUser
 from fastapi import status
 from tests.base import BaseTestCase
+from tests.helpers import run
+from utilities.hasher import make_password
+from utilities.throttle import get_login_throttle
 
 
 class TestUserAPI(BaseTestCase):
@@ -37,8 +41,8 @@ class TestUserAPI(BaseTestCase):
             },
         ]
         for data in test_data:
-            CRUDUser(self.db_session).create(data)
-            self.db_session.commit()
+            run(AsyncCRUDUser(self.db_session).create(data))
+            run(self.db_session.commit())
 
         response = self.client.get(self.TEST_URL)
 
@@ -86,8 +90,8 @@ class TestUserAPI(BaseTestCase):
             },
         ]
         for data in test_data:
-            CRUDUser(self.db_session).create(data)
-            self.db_session.commit()
+            run(AsyncCRUDUser(self.db_session).create(data))
+            run(self.db_session.commit())
 
         response = self.client.get(self.TEST_URL)
 
@@ -106,3 +110,76 @@ class TestUserAPI(BaseTestCase):
             'is_admin': item['is_admin'],
         } for i, item in enumerate(test_data, 1)]
         assert response_data == expected_data
+
+
+class TestUserConditionalRequests(BaseTestCase):
+    """ ユーザーAPIの条件付きリクエスト（ETag）のテストクラス
+    """
+    TEST_URL = '/api/v1/users/'
+
+    def setup_method(self, method) -> None:
+        get_login_throttle.cache_clear()
+
+    def setup_data(self) -> None:
+        self.user_id = run(AsyncCRUDUser(self.db_session).create({
+            'username': 'etag@example.com',
+            'password': make_password('password'),
+            'last_name': 'last_name',
+            'first_name': 'first_name',
+            'is_admin': False,
+        })).id
+        run(self.db_session.commit())
+        response = self.client.post('/api/v1/auth/login/', data={'username': 'etag@example.com', 'password': 'password'})
+        self.headers = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+    def update(self, headers: dict = {}):
+        return self.client.put(f'{self.TEST_URL}{self.user_id}/', headers={**self.headers, **headers}, json={
+            'username': 'etag@example.com',
+            'password': 'password',
+            'last_name': 'updated',
+            'first_name': 'first_name',
+            'is_admin': False,
+        })
+
+    def test_if_none_match(self):
+        """ 一覧が変わっていない場合は304を返し、更新後は200を返すこと
+        """
+        response = self.client.get(self.TEST_URL, headers=self.headers)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers['ETag']
+        assert etag.startswith('W/"')
+
+        response = self.client.get(self.TEST_URL, headers={**self.headers, 'If-None-Match': etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers['ETag'] == etag
+        assert response.content == b''
+
+        # 登録するとETagが変わること
+        # （テストでは全てのリクエストが1つのトランザクションで実行され、最終更新日時が変わらないため登録で確認する）
+        run(AsyncCRUDUser(self.db_session).create({
+            'username': 'etag2@example.com',
+            'password': 'password',
+            'last_name': 'last_name',
+            'first_name': 'first_name',
+        }))
+        run(self.db_session.commit())
+        response = self.client.get(self.TEST_URL, headers={**self.headers, 'If-None-Match': etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers['ETag'] != etag
+
+    def test_if_match(self):
+        """ If-MatchのETagが一致する場合のみ更新すること
+        """
+        etag = UserAPI.get_etag(run(AsyncCRUDUser(self.db_session).get_by_id(self.user_id)))
+
+        response = self.update({'If-Match': '"stale"'})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+        response = self.update({'If-Match': etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['last_name'] == 'updated'
+        assert response.headers['ETag'] != etag
+
+        # 更新前のETagでは更新できないこと
+        response = self.update({'If-Match': etag})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
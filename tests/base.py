@@ -1,7 +1,8 @@
+import pytest
 from fastapi.testclient import TestClient
 
 from tests.conftest import test_app
-from tests.db_session import get_test_db_session, set_current_test_db_session
+from tests.db_session import TestingAsyncDBSession
 
 
 class BaseTestCase:
@@ -9,16 +10,17 @@ class BaseTestCase:
 
     Attributes:
         client (FastAPI): APIクライアント
+        db_session (TestingAsyncDBSession): テスト用の非同期DBセッション（リクエストと共有する）
     """
     client = TestClient(test_app)
 
-    def setup_method(self, method) -> None:
-        """ テストケースごとの前処理
+    @pytest.fixture(autouse=True)
+    def setup_db_session(self, async_db_session: TestingAsyncDBSession) -> None:
+        """ テストケースごとにDBセッションを設定し、初期データを登録する
         """
-        self.db_session = get_test_db_session()
-        set_current_test_db_session(self.db_session)
+        self.db_session = async_db_session
+        self.setup_data()
 
-    def teardown_method(self, method) -> None:
-        """ 後処理
+    def setup_data(self) -> None:
+        """ テストケースごとの初期データの登録（DBセッションの設定後に実行する）
         """
-        self.db_session.test_db_session_remove()  # ロールバック
@@ -1,22 +1,28 @@
+from typing import Iterator
+
 import psycopg2
+import pytest
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 # from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy_utils import database_exists, drop_database
-from starlette.middleware.authentication import AuthenticationMiddleware
 
 from api.endpoints.v1 import api_v1_router
 from core.config import get_env
 from core.fastapi import FastAPI
 from migrations.models import Base
-from middlewares import HttpRequestMiddleware, AuthenticationBackend
-from tests.db_session import test_db_connection
-from tests.middleware import TestDBSessionMiddleware
+from middlewares import setup_middlewares
+from tests.db_session import (
+    get_test_async_db_session,
+    set_current_test_db_session,
+    test_db_connection,
+    TestingAsyncDBSession,
+)
+from tests.helpers import run
+from tests.middleware import TestAsyncDBSessionMiddleware
 
-# テスト用のエントリポイント
+# テスト用のエントリポイント（本番と同じミドルウェアの構成で、DBセッションのみテスト用に差し替える）
 test_app = FastAPI()
-test_app.add_middleware(AuthenticationMiddleware, backend=AuthenticationBackend())
-test_app.add_middleware(HttpRequestMiddleware)
-test_app.add_middleware(TestDBSessionMiddleware)
+setup_middlewares(test_app, db_session_middleware=TestAsyncDBSessionMiddleware)
 test_app.include_router(api_v1_router, prefix='/api/v1')
 
 # conftestで初期データを登録する場合はこのSessionを使用する
@@ -27,6 +33,18 @@ test_app.include_router(api_v1_router, prefix='/api/v1')
 # )
 
 
+@pytest.fixture
+def async_db_session() -> Iterator[TestingAsyncDBSession]:
+    """ テスト用の非同期DBセッション
+
+    テストクライアントのリクエストでも同じDBセッションを使用し、テストケースの終了時にロールバックする
+    """
+    db_session = get_test_async_db_session()
+    set_current_test_db_session(db_session)
+    yield db_session
+    run(db_session.test_db_session_remove())
+
+
 def create_test_database():
     # テストDBが削除されずに残ってしまっている場合は削除
     if database_exists(get_env().test_database_url):
@@ -0,0 +1,174 @@
+import asyncio
+import contextlib
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import event
+
+from crud.crud_user import AsyncCRUDUser
+from tests.db_session import get_test_async_db_session, test_async_db_connection
+
+
+@contextlib.contextmanager
+def capture_statements() -> Iterator[List[str]]:
+    """ テストDBで実行されたSQLを記録する
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_async_db_connection.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(test_async_db_connection.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class TestAsyncCRUDUser:
+    """ ユーザーの非同期データアクセスクラスのテストクラス
+    """
+    test_data = {
+        'username': 'test1@example.com',
+        'password': 'password',
+        'last_name': 'last_name',
+        'first_name': 'first_name',
+        'is_admin': False,
+    }
+
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        self.loop = asyncio.get_event_loop()
+        self.db_session = get_test_async_db_session()
+
+    def teardown_method(self, method) -> None:
+        """ 後処理
+        """
+        self.loop.run_until_complete(self.db_session.close())  # ロールバック
+
+    def test_crud(self):
+        """ AsyncSession上で登録・取得・更新・削除ができること
+        """
+        async def run():
+            crud = AsyncCRUDUser(self.db_session)
+
+            user = await crud.create(self.test_data)
+            assert user.id is not None
+            assert user.created_at is not None
+
+            assert await crud.get_by_id(user.id) is user
+            assert await crud.get_by_username(self.test_data['username']) is user
+            assert [obj.id for obj in await crud.gets()] == [user.id]
+
+            user = await crud.update(user, {'last_name': 'updated'})
+            assert user.last_name == 'updated'
+
+            await crud.delete_by_id(user.id)
+            assert await crud.gets() == []
+
+        self.loop.run_until_complete(run())
+
+    def test_paginate(self):
+        """ カーソルを辿って主キーの昇順で全件取得できること
+        """
+        async def run():
+            crud = AsyncCRUDUser(self.db_session)
+            ids = []
+            for i in range(5):
+                user = await crud.create(dict(self.test_data, username=f'test{i}@example.com'))
+                ids.append(user.id)
+
+            users, cursor = await crud.paginate(2)
+            assert [obj.id for obj in users] == ids[:2]
+            users, cursor = await crud.paginate(2, cursor)
+            assert [obj.id for obj in users] == ids[2:4]
+            users, cursor = await crud.paginate(2, cursor)
+            assert [obj.id for obj in users] == ids[4:]
+            assert cursor is None
+
+        self.loop.run_until_complete(run())
+
+    def test_paginate_invalid_cursor(self):
+        """ 不正なカーソルの場合はValueErrorが発生すること
+        """
+        with pytest.raises(ValueError):
+            self.loop.run_until_complete(AsyncCRUDUser(self.db_session).paginate(2, 'invalid'))
+
+    def test_stream(self):
+        """ batch_size件ずつ主キーの昇順で全件取得できること
+        """
+        async def run():
+            crud = AsyncCRUDUser(self.db_session)
+            ids = []
+            for i in range(5):
+                user = await crud.create(dict(self.test_data, username=f'test{i}@example.com'))
+                ids.append(user.id)
+
+            batches = [[obj.id for obj in objs] async for objs in crud.stream(2)]
+            assert batches == [ids[:2], ids[2:4], ids[4:]]
+
+        self.loop.run_until_complete(run())
+
+    def test_paginate_columns(self):
+        """ カラムを指定した場合は行（タプル）で取得できること
+        """
+        async def run():
+            crud = AsyncCRUDUser(self.db_session)
+            user = await crud.create(self.test_data)
+
+            rows, cursor = await crud.paginate(2, columns=('id', 'username'))
+            assert [tuple(row) for row in rows] == [(user.id, user.username)]
+            assert cursor is None
+
+        self.loop.run_until_complete(run())
+
+    def test_bulk(self):
+        """ 一括登録・更新・削除ができること
+        """
+        async def run():
+            crud = AsyncCRUDUser(self.db_session)
+
+            users = await crud.bulk_create([
+                dict(self.test_data, username=f'test{i}@example.com') for i in range(3)
+            ])
+            assert [user.username for user in users] == [f'test{i}@example.com' for i in range(3)]
+            assert all(user.id is not None and user.is_active for user in users)
+
+            users = await crud.bulk_update([
+                {'id': users[0].id, 'last_name': 'updated0'},
+                {'id': users[1].id, 'last_name': 'updated1', 'is_admin': True},
+                {'id': 0, 'last_name': 'not found'},
+            ])
+            assert sorted((user.last_name, user.is_admin) for user in users) == [
+                ('updated0', False), ('updated1', True)]
+
+            ids = [user.id for user in await crud.gets()]
+            assert sorted(await crud.bulk_delete(ids + [0])) == sorted(ids)
+            assert await crud.gets() == []
+
+        self.loop.run_until_complete(run())
+
+    def test_single_statement_writes(self):
+        """ 登録・更新・削除はそれぞれSQL1回で実行されること
+        """
+        async def run():
+            crud = AsyncCRUDUser(self.db_session)
+            await crud.gets()  # トランザクション開始（BEGIN）を計測対象から除く
+
+            with capture_statements() as statements:
+                user = await crud.create(self.test_data)
+            assert len(statements) == 1
+            assert user.id is not None and user.created_at is not None and user.updated_at is not None
+
+            with capture_statements() as statements:
+                updated = await crud.update(user, {'last_name': 'updated'})
+            assert len(statements) == 1
+            assert updated is user and user.last_name == 'updated'
+
+            with capture_statements() as statements:
+                await crud.delete_by_id(user.id)
+            assert len(statements) == 1
+            assert await crud.get_by_id(user.id) is None
+
+        self.loop.run_until_complete(run())
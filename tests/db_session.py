@@ -1,27 +1,29 @@
 from threading import local as thread_local
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
 
 from core.config import get_env
+from crud import get_async_database_url
 
 _thread_local = thread_local()
 
 
-def set_current_test_db_session(db_session: scoped_session) -> None:
+def set_current_test_db_session(db_session: AsyncSession) -> None:
     """ スレッドローカルにテスト用のDBセッションをセット
 
     Args:
-        db_session (scoped_session): テスト用のDBセッション
+        db_session (AsyncSession): テスト用のDBセッション
     """
     setattr(_thread_local, 'db_session', db_session)
 
 
-def get_current_test_db_session() -> scoped_session:
+def get_current_test_db_session() -> AsyncSession:
     """ スレッドローカルからテスト用のDBセッションを取得
 
     Returns:
-        scoped_session: テスト用のDBセッション
+        AsyncSession: テスト用のDBセッション
     """
     return getattr(_thread_local, 'db_session')
 
@@ -36,18 +38,16 @@ class TestingDBSession(Session):
         self.expire_all()
 
 
-class test_scoped_session(scoped_session):
-    """ リクエストミドルウェアのremove()で何も実行されないように、scoped_sessionクラスをオーバーライド
+class TestingAsyncDBSession(AsyncSession):
+    """ リクエストミドルウェアのclose()で何も実行されないように、AsyncSessionクラスをオーバーライド
     """
-    def remove(self):
+    async def close(self) -> None:
         pass
 
-    def test_db_session_remove(self):
-        """ テストDB用のremove()
+    async def test_db_session_remove(self) -> None:
+        """ テストDB用のclose()（ロールバック）
         """
-        if self.registry.has():
-            self.registry().close()
-        self.registry.clear()
+        await super().close()
 
 
 test_db_connection = create_engine(
@@ -57,13 +57,19 @@ test_db_connection = create_engine(
 )
 
 
-def get_test_db_session():
-    """ テストDBセッションを返す
+test_async_db_connection = create_async_engine(
+    get_async_database_url(get_env().test_database_url),
+    pool_pre_ping=True,
+)
+
+
+def get_test_async_db_session() -> TestingAsyncDBSession:
+    """ テストDBの非同期DBセッションを返す
+
+    commit()はTestingDBSessionと同じく実際にはコミットしないため、test_db_session_remove()でロールバックされる
     """
-    return test_scoped_session(
-        sessionmaker(
-            bind=test_db_connection,
-            class_=TestingDBSession,
-            expire_on_commit=False,
-        )
+    return TestingAsyncDBSession(
+        bind=test_async_db_connection,
+        sync_session_class=TestingDBSession,
+        expire_on_commit=False,
     )
@@ -0,0 +1,16 @@
+import asyncio
+from typing import Awaitable, TypeVar
+
+ResultType = TypeVar('ResultType')
+
+
+def run(coroutine: Awaitable[ResultType]) -> ResultType:
+    """ コルーチンをテストクライアントと同じイベントループで実行する
+
+    Args:
+        coroutine (Awaitable[ResultType]): コルーチン
+
+    Returns:
+        ResultType: コルーチンの戻り値
+    """
+    return asyncio.get_event_loop().run_until_complete(coroutine)
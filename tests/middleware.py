@@ -1,21 +1,16 @@
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from middlewares import AsyncDBSessionMiddleware
 from tests.db_session import get_current_test_db_session
 
 
-class TestDBSessionMiddleware(BaseHTTPMiddleware):
-    """ リクエスト情報にDBセッションを設定するミドルウェア
+class TestAsyncDBSessionMiddleware(AsyncDBSessionMiddleware):
+    """ リクエスト情報にテスト用の非同期DBセッションを設定するミドルウェア
     """
-    async def dispatch(self, request: Request, call_next) -> Response:
-        """ ミドルウェアの処理
-
-        Args:
-            request (Request): リクエスト情報
-            call_next (method): 次の処理
+    def get_db_session(self) -> AsyncSession:
+        """ リクエストで使用するDBセッションを返す
 
         Returns:
-            Response: レスポンス
+            AsyncSession: テスト用のDBセッション
         """
-        request.state.db_session = get_current_test_db_session()
-        return await call_next(request)
+        return get_current_test_db_session()
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, FastAPI, Request, status
+from fastapi.testclient import TestClient
+
+from middlewares import DBSessionMiddleware, HttpRequestMiddleware
+
+
+class RecordingDBSession:
+    """ 呼び出されたメソッドを記録するDBセッション
+    """
+    def __init__(self) -> None:
+        self.calls = []
+
+    def commit(self) -> None:
+        self.calls.append('commit')
+
+    def rollback(self) -> None:
+        self.calls.append('rollback')
+
+    def remove(self) -> None:
+        self.calls.append('remove')
+
+
+class RecordingDBSessionMiddleware(DBSessionMiddleware):
+    """ 生成したDBセッションを記録するミドルウェア
+    """
+    db_sessions = []
+
+    def get_db_session(self) -> RecordingDBSession:
+        db_session = RecordingDBSession()
+        self.db_sessions.append(db_session)
+        return db_session
+
+
+router = APIRouter()
+
+
+@router.get('/no-db/')
+async def no_db() -> dict:
+    return {}
+
+
+@router.get('/db/')
+async def db(request: Request) -> dict:
+    request.state.db_session
+    request.state.db_session
+    return {}
+
+
+@router.get('/error/')
+async def error(request: Request) -> dict:
+    request.state.db_session
+    raise RuntimeError()
+
+
+app = FastAPI()
+app.include_router(router)
+app.add_middleware(HttpRequestMiddleware)
+app.add_middleware(RecordingDBSessionMiddleware)
+
+
+class TestDBSessionMiddleware:
+    """ DBセッションミドルウェアのテストクラス
+    """
+    client = TestClient(app)
+
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        RecordingDBSessionMiddleware.db_sessions.clear()
+
+    def test_no_db_access(self):
+        """ DBセッションを参照しない場合はDBセッションを生成しないこと
+        """
+        response = self.client.get('/no-db/')
+        assert response.status_code == status.HTTP_200_OK
+        assert RecordingDBSessionMiddleware.db_sessions == []
+
+    def test_commit(self):
+        """ 正常終了時はDBセッションを一度だけ生成してコミット・破棄すること
+        """
+        response = self.client.get('/db/')
+        assert response.status_code == status.HTTP_200_OK
+        assert len(RecordingDBSessionMiddleware.db_sessions) == 1
+        assert RecordingDBSessionMiddleware.db_sessions[0].calls == ['commit', 'remove']
+
+    def test_rollback(self):
+        """ 予期せぬ例外の場合はロールバック・破棄してシステムエラーを返すこと
+        """
+        response = self.client.get('/error/')
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert response.json()[0]['error_code'] == 'INTERNAL_SERVER_ERROR'
+        assert RecordingDBSessionMiddleware.db_sessions[0].calls == ['rollback', 'remove']
@@ -0,0 +1,108 @@
+from fastapi import Depends, FastAPI, Request, status
+from fastapi.testclient import TestClient
+from starlette.authentication import AuthCredentials, BaseUser
+
+from dependencies import authenticate, login_required, skip_authentication
+from middlewares import LazyAuthenticationMiddleware
+from utilities.authentication import AuthenticatedUser, UnauthenticatedUser
+
+
+class CountingBackend:
+    """ 認証した回数を記録する認証バックエンド（トークンが「valid」の場合のみ認証する）
+    """
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def authenticate(self, request: Request):
+        self.calls += 1
+        if request.headers.get('Authorization') == 'Bearer valid':
+            return AuthCredentials(['authenticated']), AuthenticatedUser(1, 'test@example.com')
+        return AuthCredentials(['unauthenticated']), UnauthenticatedUser()
+
+
+backend = CountingBackend()
+app = FastAPI()
+app.add_middleware(LazyAuthenticationMiddleware, backend=backend)
+
+
+@app.get('/public/')
+@skip_authentication
+async def public(request: Request) -> dict:
+    return {'is_authenticated': request.user.is_authenticated}
+
+
+@app.get('/plain/')
+async def plain(request: Request) -> dict:
+    return {'username': request.user.username}
+
+
+@app.get('/optional/')
+async def optional(user: BaseUser = Depends(authenticate)) -> dict:
+    return {'is_authenticated': user.is_authenticated}
+
+
+@app.get('/private/', dependencies=[Depends(login_required)])
+async def private(request: Request, user: BaseUser = Depends(authenticate)) -> dict:
+    return {'username': request.user.username, 'same_user': request.user is user}
+
+
+class TestLazyAuthenticationMiddleware:
+    """ 認証を遅延させるミドルウェアのテストクラス
+    """
+    client = TestClient(app)
+
+    def setup_method(self, method) -> None:
+        backend.calls = 0
+
+    def test_public_route_does_not_authenticate(self):
+        """ 認証を行わない設定のルートでは、認証ヘッダがあっても認証せずに未承認ユーザーにすること
+        """
+        response = self.client.get('/public/', headers={'Authorization': 'Bearer valid'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'is_authenticated': False}
+        assert backend.calls == 0
+
+    def test_not_found_does_not_authenticate(self):
+        """ 一致するルートが無い場合は認証しないこと
+        """
+        response = self.client.get('/unknown/', headers={'Authorization': 'Bearer valid'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert backend.calls == 0
+
+    def test_request_user_without_dependency(self):
+        """ 認証の依存関係が無いルートでも、「request.user」で認証したユーザーを参照できること
+        """
+        response = self.client.get('/plain/', headers={'Authorization': 'Bearer valid'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'username': 'test@example.com'}
+        assert backend.calls == 1
+
+    def test_authenticate_once(self):
+        """ 複数の依存関係で必要になっても、認証は1回だけ行うこと
+        """
+        response = self.client.get('/private/', headers={'Authorization': 'Bearer valid'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'username': 'test@example.com', 'same_user': True}
+        assert backend.calls == 1
+
+    def test_login_required_without_header(self):
+        """ 認証ヘッダが無い場合は、認証せずに401を返すこと
+        """
+        response = self.client.get('/private/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert backend.calls == 0
+
+    def test_login_required_invalid_token(self):
+        """ 認証できない場合は401を返すこと
+        """
+        response = self.client.get('/private/', headers={'Authorization': 'Bearer invalid'})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert backend.calls == 1
+
+    def test_optional_authentication(self):
+        """ 認証の依存関係のみのルートでは、未承認ユーザーでもエラーにしないこと
+        """
+        response = self.client.get('/optional/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'is_authenticated': False}
+        assert backend.calls == 1
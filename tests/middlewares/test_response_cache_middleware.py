@@ -0,0 +1,172 @@
+from fastapi import Depends, FastAPI, Request, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.authentication import AuthCredentials, BaseUser
+
+from core.config import get_env
+from dependencies import authenticate, login_required
+from middlewares import DBSessionMiddleware, HttpRequestMiddleware, LazyAuthenticationMiddleware, ResponseCacheMiddleware
+from utilities.authentication import AuthenticatedUser, UnauthenticatedUser
+from utilities.response_cache import cache_response, get_response_cache, mark_changed, SCOPE_PUBLIC, SCOPE_USER
+
+
+class StubBackend:
+    """ トークン「user<ID>」のユーザーとして認証する認証バックエンド
+    """
+    async def authenticate(self, request: Request):
+        token = request.headers.get('Authorization', '')
+        if token.startswith('Bearer user'):
+            user_id = int(token[len('Bearer user'):])
+            return AuthCredentials(['authenticated']), AuthenticatedUser(user_id, f'user{user_id}@example.com')
+        return AuthCredentials(['unauthenticated']), UnauthenticatedUser()
+
+
+class StubDBSession:
+    """ コミット・ロールバックのみ行うDBセッション
+    """
+    def __init__(self) -> None:
+        self.info = {}
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def remove(self) -> None:
+        pass
+
+
+class StubDBSessionMiddleware(DBSessionMiddleware):
+    def get_db_session(self) -> StubDBSession:
+        return StubDBSession()
+
+
+# エンドポイントを実行した回数
+calls = {'items': 0}
+
+app = FastAPI()
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(LazyAuthenticationMiddleware, backend=StubBackend())
+app.add_middleware(HttpRequestMiddleware)
+app.add_middleware(StubDBSessionMiddleware)
+
+
+@app.get('/items/', dependencies=[Depends(login_required)])
+@cache_response(ttl=30, tables=['items'])
+async def items(response: Response) -> dict:
+    calls['items'] += 1
+    response.headers['ETag'] = f'"{calls["items"]}"'
+    return {'calls': calls['items']}
+
+
+@app.get('/mine/')
+@cache_response(ttl=30, tables=['items'], scope=SCOPE_USER)
+async def mine(user: BaseUser = Depends(authenticate)) -> dict:
+    calls['items'] += 1
+    return {'username': user.username}
+
+
+@app.get('/stream/')
+@cache_response(ttl=30, tables=['items'], scope=SCOPE_PUBLIC)
+async def stream() -> StreamingResponse:
+    calls['items'] += 1
+    return StreamingResponse(iter([b'[', b']']), media_type='application/json')
+
+
+@app.post('/items/')
+async def create(request: Request, fail: bool = False) -> dict:
+    mark_changed(request.state.db_session, 'items')
+    if fail:
+        raise RuntimeError()
+    return {}
+
+
+class TestResponseCacheMiddleware:
+    """ レスポンスのキャッシュのミドルウェアのテストクラス
+    """
+    client = TestClient(app)
+    headers = {'Authorization': 'Bearer user1'}
+
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        get_env().response_cache_enabled = True
+        get_response_cache.cache_clear()
+        calls['items'] = 0
+
+    def teardown_method(self, method) -> None:
+        """ テストケースごとの後処理
+        """
+        get_env().response_cache_enabled = False
+
+    def test_cache_hit(self):
+        """ 2回目以降はエンドポイントを実行せずに同じレスポンスを返し、クエリ文字列が違う場合は別にキャッシュすること
+        """
+        first = self.client.get('/items/', headers=self.headers)
+        second = self.client.get('/items/', headers={'Authorization': 'Bearer user2'})
+        assert first.headers['X-Cache'] == 'MISS'
+        assert second.headers['X-Cache'] == 'HIT'
+        assert second.content == first.content
+        assert second.headers['ETag'] == first.headers['ETag']
+        assert calls['items'] == 1
+
+        other = self.client.get('/items/?limit=1', headers=self.headers)
+        assert other.headers['X-Cache'] == 'MISS'
+        assert calls['items'] == 2
+
+    def test_not_modified(self):
+        """ If-None-MatchがキャッシュのETagと一致する場合は304を返すこと
+        """
+        etag = self.client.get('/items/', headers=self.headers).headers['ETag']
+        response = self.client.get('/items/', headers={**self.headers, 'If-None-Match': etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers['X-Cache'] == 'HIT'
+        assert calls['items'] == 1
+
+    def test_unauthenticated(self):
+        """ 承認済みユーザーでない場合はキャッシュを返さず、エンドポイントの依存関係で401を返すこと
+        """
+        self.client.get('/items/', headers=self.headers)
+        response = self.client.get('/items/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert 'X-Cache' not in response.headers
+
+    def test_user_scope(self):
+        """ ユーザーごとの範囲の場合は、他のユーザーのキャッシュを返さないこと
+        """
+        assert self.client.get('/mine/', headers=self.headers).json() == {'username': 'user1@example.com'}
+        response = self.client.get('/mine/', headers={'Authorization': 'Bearer user2'})
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.json() == {'username': 'user2@example.com'}
+        assert self.client.get('/mine/', headers=self.headers).headers['X-Cache'] == 'HIT'
+
+    def test_invalidate_on_commit(self):
+        """ テーブルを更新したリクエストがコミットされた場合は無効化し、ロールバックされた場合は無効化しないこと
+        """
+        self.client.get('/items/', headers=self.headers)
+        self.client.post('/items/', params={'fail': True})
+        assert self.client.get('/items/', headers=self.headers).headers['X-Cache'] == 'HIT'
+
+        self.client.post('/items/')
+        response = self.client.get('/items/', headers=self.headers)
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.json() == {'calls': 2}
+
+    def test_disabled(self):
+        """ 無効の場合はキャッシュしないこと
+        """
+        get_env().response_cache_enabled = False
+        self.client.get('/items/', headers=self.headers)
+        response = self.client.get('/items/', headers=self.headers)
+        assert 'X-Cache' not in response.headers
+        assert calls['items'] == 2
+
+    def test_streaming_response(self):
+        """ ストリーミングのレスポンス（Content-Lengthが無い）はキャッシュしないこと
+        """
+        self.client.get('/stream/')
+        response = self.client.get('/stream/')
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.content == b'[]'
+        assert calls['items'] == 2
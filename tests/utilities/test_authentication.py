@@ -0,0 +1,119 @@
+import asyncio
+from typing import Dict
+
+from middlewares import DBSessionState
+from utilities.authentication import get_token_revocation_list, REVOKED_TOKEN_VERSIONS_KEY, TokenRevocationList
+from tests.utilities.test_throttle import FakeTimer
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+class TestTokenRevocationList:
+    """ アクセストークンの失効リストのテストクラス
+    """
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        self.timer = FakeTimer()
+        self.loaded: Dict[int, int] = {1: 2}
+        self.loads = 0
+        self.revocations = TokenRevocationList(10, loader=self.load, timer=self.timer)
+
+    async def load(self) -> Dict[int, int]:
+        self.loads += 1
+        if self.loaded is None:
+            raise RuntimeError('load failed')
+        return dict(self.loaded)
+
+    def test_is_revoked(self):
+        """ 失効させたバージョンより古いアクセストークンのみ失効していると判定されること
+        """
+        run(self.revocations.refresh_if_stale())
+
+        assert self.revocations.is_revoked(1, 1)
+        assert not self.revocations.is_revoked(1, 2)
+        assert not self.revocations.is_revoked(2, 0)
+
+        # このワーカーで失効させたバージョンは即時に反映されること
+        self.revocations.add({2: 1})
+        assert self.revocations.is_revoked(2, 0)
+
+    def test_refresh_if_stale(self):
+        """ 間隔を過ぎるまでは読み込み直さず、過ぎた場合はバックグラウンドで読み込み直すこと
+        """
+        run(self.revocations.refresh_if_stale())
+        run(self.revocations.refresh_if_stale())
+        assert self.loads == 1
+
+        self.loaded = {1: 3}
+        self.timer.now = 10
+        run(self.revocations.refresh_if_stale())
+        run(asyncio.sleep(0))
+        assert self.loads == 2
+        assert self.revocations.is_revoked(1, 2)
+
+    def test_refresh_failure(self):
+        """ 読み込みに失敗した場合は読み込み前のリストを使用し続け、間隔の2倍を過ぎると最新でないと判定されること
+        """
+        run(self.revocations.refresh_if_stale())
+        assert self.revocations.is_fresh()
+
+        self.loaded = None
+        self.timer.now = 10
+        run(self.revocations.refresh())
+        assert self.revocations.is_revoked(1, 1)
+        assert self.revocations.is_fresh()
+        assert self.revocations.stats()['failures'] == 1
+
+        self.timer.now = 20
+        assert not self.revocations.is_fresh()
+
+
+class StubDBSession:
+    """ コミット・ロールバックのみ行うDBセッション
+    """
+    def __init__(self) -> None:
+        self.info = {}
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+
+class TestRevokedTokensAfterCommit:
+    """ 失効させたトークンを失効リストに追加するタイミングのテストクラス
+    """
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        get_token_revocation_list.cache_clear()
+
+    def teardown_method(self, method) -> None:
+        """ テストケースごとの後処理
+        """
+        get_token_revocation_list.cache_clear()
+
+    def test_commit(self):
+        """ コミットが成功した後に失効リストに追加すること
+        """
+        state = DBSessionState(StubDBSession)
+        state['db_session'].info[REVOKED_TOKEN_VERSIONS_KEY] = {1: 1}
+        assert not get_token_revocation_list().is_revoked(1, 0)
+
+        run(state.commit())
+        assert get_token_revocation_list().is_revoked(1, 0)
+        assert REVOKED_TOKEN_VERSIONS_KEY not in state['db_session'].info
+
+    def test_rollback(self):
+        """ ロールバックした場合は失効リストに追加しないこと
+        """
+        state = DBSessionState(StubDBSession)
+        state['db_session'].info[REVOKED_TOKEN_VERSIONS_KEY] = {1: 1}
+
+        run(state.rollback())
+        run(state.commit())
+        assert not get_token_revocation_list().is_revoked(1, 0)
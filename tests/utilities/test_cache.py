@@ -0,0 +1,55 @@
+from utilities.cache import TTLCache
+
+
+class FakeTimer:
+    """ 任意に時刻を進められるタイマー
+    """
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    """ 有効期限付きLRUキャッシュのテストクラス
+    """
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        self.timer = FakeTimer()
+        self.cache = TTLCache(maxsize=2, ttl=10, timer=self.timer)
+
+    def test_ttl(self):
+        """ 有効期限切れのエントリは返さないこと
+        """
+        self.cache.set('a', 1)
+        self.cache.set('b', 2, ttl=20)
+        self.timer.now = 10
+
+        assert self.cache.get('a') is None
+        assert self.cache.get('b') == 2
+        assert self.cache.stats()['hits'] == 1
+        assert self.cache.stats()['misses'] == 1
+
+    def test_lru(self):
+        """ 上限を超えた場合は最も長く参照されていないエントリを破棄すること
+        """
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        assert self.cache.get('b') is None
+        assert self.cache.get('a') == 1
+        assert self.cache.get('c') == 3
+        assert self.cache.stats()['evictions'] == 1
+
+    def test_delete(self):
+        """ 削除したエントリは返さないこと
+        """
+        self.cache.set('a', 1)
+        self.cache.delete('a')
+        self.cache.delete('not_exists')
+
+        assert self.cache.get('a') is None
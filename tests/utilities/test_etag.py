@@ -0,0 +1,37 @@
+from utilities.etag import if_match, if_none_match, make_etag, parse_etags
+
+
+class TestETag:
+    """ ETagのテストクラス
+    """
+    def test_make_etag(self):
+        """ 同じ値からは同じETagが生成され、値が変わるとETagも変わること
+        """
+        assert make_etag(1, 'a') == make_etag(1, 'a')
+        assert make_etag(1, 'a') != make_etag(1, 'b')
+        assert make_etag(1, weak=True).startswith('W/"')
+        assert make_etag(1).startswith('"')
+
+    def test_parse_etags(self):
+        """ カンマ区切りのETagを分割できること
+        """
+        assert parse_etags(None) == []
+        assert parse_etags('"a", W/"b" ,"c"') == ['"a"', 'W/"b"', '"c"']
+
+    def test_if_none_match(self):
+        """ If-None-Matchは弱い比較で判定すること
+        """
+        assert if_none_match('W/"a"', 'W/"a"')
+        assert if_none_match('"b", "a"', 'W/"a"')
+        assert if_none_match('*', 'W/"a"')
+        assert not if_none_match('W/"b"', 'W/"a"')
+
+    def test_if_match(self):
+        """ If-Matchは強い比較で判定し、データが存在しない場合は一致しないこと
+        """
+        assert if_match('"a"', '"a"')
+        assert if_match('"b", "a"', '"a"')
+        assert if_match('*', '"a"')
+        assert not if_match('W/"a"', '"a"')
+        assert not if_match('W/"a"', 'W/"a"')
+        assert not if_match('*', None)
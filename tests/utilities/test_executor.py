@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy.orm import scoped_session, sessionmaker
+from starlette.requests import Request
+
+from middlewares import DBSessionState
+from utilities.executor import Executor, ExecutorFullError, get_executor, offload
+
+
+class SampleAPI:
+    """ スレッドプールで実行する同期API
+    """
+    @classmethod
+    @offload
+    def current(cls, request: Request) -> tuple:
+        return threading.get_ident(), request.state.db_session()
+
+
+class TestOffload:
+    """ offloadデコレータのテストクラス
+    """
+    def test_offload(self):
+        """ スレッドプールで実行され、呼び出し元のDBセッションが引き継がれること
+        """
+        db_session = scoped_session(sessionmaker())
+        request = Request({'type': 'http', 'state': {'db_session': db_session}})
+        submitted = get_executor().stats()['submitted']
+
+        thread_id, session = asyncio.get_event_loop().run_until_complete(SampleAPI.current(request))
+
+        assert thread_id != threading.get_ident()
+        assert session is db_session()
+
+        stats = get_executor().stats()
+        assert stats['submitted'] == submitted + 1
+        assert stats['running'] == 0
+        assert stats['queued'] == 0
+
+    def test_offload_without_db_session(self):
+        """ DBセッションが生成されていない場合は、DBセッションを生成せずに実行すること
+        """
+        def session_factory() -> scoped_session:
+            raise AssertionError('DBセッションが生成されました')
+
+        request = Request({'type': 'http', 'state': DBSessionState(session_factory)})
+        asyncio.get_event_loop().run_until_complete(offload(lambda request: None)(request))
+
+        assert not request.scope['state'].has_db_session
+
+    def test_cancel_while_queued(self):
+        """ 空きスレッド待ちの間にキャンセルされた場合は実行せず、待ちの処理数を戻すこと
+        """
+        executor = Executor(1, max_queue=1)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        async def scenario() -> None:
+            running = asyncio.ensure_future(executor.run(lambda: (started.set(), release.wait())))
+            await asyncio.get_event_loop().run_in_executor(None, started.wait)
+            waiting = asyncio.ensure_future(executor.run(lambda: calls.append('waiting')))
+            await asyncio.sleep(0)
+            assert executor.stats()['queued'] == 1
+
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            release.set()
+            await running
+
+            # キャンセルした処理が待ちの処理数の上限を占有し続けないこと
+            await executor.run(lambda: calls.append('next'))
+
+        asyncio.get_event_loop().run_until_complete(scenario())
+
+        assert calls == ['next']
+        stats = executor.stats()
+        assert stats['queued'] == 0
+        assert stats['running'] == 0
+        assert stats['submitted'] == 3
+        assert stats['completed'] == 2
+        assert stats['cancelled'] == 1
+
+    def test_max_queue(self):
+        """ 空きスレッド待ちの処理数が上限に達している場合は受け付けないこと
+        """
+        executor = Executor(1, max_queue=0)
+
+        with pytest.raises(ExecutorFullError):
+            asyncio.get_event_loop().run_until_complete(executor.run(lambda: None))
+
+        assert executor.stats()['rejected'] == 1
+        assert executor.stats()['submitted'] == 0
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from core.config import get_env
+from utilities.hasher import (
+    acheck_password,
+    amake_password,
+    amake_passwords,
+    calibrate_hasher,
+    check_password,
+    make_password,
+    must_update_password,
+)
+
+
+class TestAsyncHasher:
+    """ パスワードハッシュ（スレッドプール実行）のテストクラス
+    """
+    def test_make_and_check_password(self):
+        """ ハッシュ化したパスワードを検証できること
+        """
+        loop = asyncio.get_event_loop()
+
+        hashed_password = loop.run_until_complete(amake_password('password'))
+
+        assert hashed_password.startswith('pbkdf2_sha256$')
+        assert check_password('password', hashed_password)
+        assert loop.run_until_complete(acheck_password('password', hashed_password))
+        assert not loop.run_until_complete(acheck_password('invalid', hashed_password))
+
+    def test_make_passwords(self):
+        """ 複数のパスワードを順序を保ってハッシュ化できること
+        """
+        plain_passwords = [f'password{i}' for i in range(10)]
+
+        hashed_passwords = asyncio.get_event_loop().run_until_complete(amake_passwords(plain_passwords))
+
+        assert len(hashed_passwords) == len(plain_passwords)
+        assert all(check_password(p, h) for p, h in zip(plain_passwords, hashed_passwords))
+
+
+class TestPasswordHasher:
+    """ パスワードハッシュのアルゴリズム・強度の切り替えのテストクラス
+    """
+    def setup_method(self, method) -> None:
+        self.env = get_env().copy()
+
+    def teardown_method(self, method) -> None:
+        for key, value in self.env:
+            setattr(get_env(), key, value)
+
+    def test_must_update_when_iterations_changed(self):
+        """ ストレッチングの回数を変更すると、変更前のパスワードを検証でき、ハッシュ化し直す必要があると判定されること
+        """
+        hashed_password = make_password('password')
+        assert not must_update_password(hashed_password)
+
+        get_env().password_hash_iterations = 1000
+        assert check_password('password', hashed_password)
+        assert must_update_password(hashed_password)
+        assert not must_update_password(make_password('password'))
+
+    @pytest.mark.skipif(not hasattr(hashlib, 'scrypt'), reason='hashlib.scryptを使用できない')
+    def test_scrypt(self):
+        """ scryptでハッシュ化したパスワードを検証でき、PBKDF2との切り替えが判定されること
+        """
+        get_env().password_hasher = 'scrypt'
+        get_env().password_hash_scrypt_n = 2 ** 10
+        hashed_password = make_password('password')
+
+        assert hashed_password.startswith('scrypt$1024$8$1$')
+        assert check_password('password', hashed_password)
+        assert not check_password('invalid', hashed_password)
+        assert not must_update_password(hashed_password)
+
+        get_env().password_hasher = 'pbkdf2_sha256'
+        assert check_password('password', hashed_password)
+        assert must_update_password(hashed_password)
+
+    def test_unknown_algorithm(self):
+        """ 対応していないアルゴリズムのパスワードは一致しないと判定されること
+        """
+        assert not check_password('password', 'md5$salt$hash')
+        assert must_update_password('md5$salt$hash')
+
+    def test_calibrate_hasher(self):
+        """ 目標時間に合わせたストレッチングの回数が求められること
+        """
+        params = calibrate_hasher('pbkdf2_sha256', 0.01, repeat=1)
+        assert params['iterations'] >= 1000
+        assert params['iterations'] % 1000 == 0
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+from jose import jwt
+
+from utilities import jwt_handler
+from utilities.jwt_handler import get_jwt_claims_cache, jwt_decord_handler, jwt_encode_handler
+
+
+class TestJwtDecordHandler:
+    """ JWTデコードのテストクラス
+    """
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        get_jwt_claims_cache().clear()
+
+    def test_cache(self):
+        """ 同じJWT文字列の2回目以降はキャッシュしたクレームセットを返すこと
+        """
+        token = jwt_encode_handler({'user_id': 1, 'exp': int(time.time()) + 60})
+        hits = get_jwt_claims_cache().stats()['hits']
+
+        claims = jwt_decord_handler(token)
+        claims['user_id'] = 2  # 返却値を変更してもキャッシュに影響しないこと
+
+        assert jwt_decord_handler(token)['user_id'] == 1
+        assert get_jwt_claims_cache().stats()['hits'] == hits + 1
+
+    def test_bypass_cache(self):
+        """ use_cache=Falseの場合はキャッシュを使用しないこと
+        """
+        token = jwt_encode_handler({'user_id': 1, 'exp': int(time.time()) + 60})
+        jwt_decord_handler(token, use_cache=False)
+
+        assert get_jwt_claims_cache().stats()['size'] == 0
+
+    def test_expired(self, monkeypatch):
+        """ 有効期限切れのクレームセットはキャッシュから返さないこと
+        """
+        now = time.time()
+        token = jwt_encode_handler({'user_id': 1, 'exp': int(now) + 60})
+        jwt_decord_handler(token)
+
+        monkeypatch.setattr(jwt_handler.time, 'time', lambda: now + 61)
+        with pytest.raises(jwt.ExpiredSignatureError):
+            jwt_decord_handler(token)
@@ -0,0 +1,75 @@
+import json
+import logging
+import queue
+
+from utilities.logger import (
+    get_request_id,
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    reset_request_id,
+    set_request_id,
+    TracebackDeduplicationFilter,
+)
+
+
+def create_error_record(message: str) -> logging.LogRecord:
+    """ 同じ箇所で発生した例外のログを生成する
+    """
+    try:
+        raise RuntimeError(message)
+    except RuntimeError as e:
+        return logging.LogRecord('test', logging.ERROR, __file__, 0, 'error', (), (type(e), e, e.__traceback__))
+
+
+class TestLogger:
+    """ ログ出力のユーティリティのテストクラス
+    """
+    def test_json_formatter(self):
+        """ 1行のJSONに変換され、extraで指定した項目とトレースバックが含まれること
+        """
+        record = create_error_record('boom')
+        record.request_id = 'abc'
+        record.latency_ms = 1.5
+        log = json.loads(JsonFormatter().format(record))
+
+        assert log['level'] == 'ERROR'
+        assert log['message'] == 'error'
+        assert log['request_id'] == 'abc'
+        assert log['latency_ms'] == 1.5
+        assert 'RuntimeError: boom' in log['traceback']
+
+    def test_traceback_deduplication(self):
+        """ 間隔内に同じ箇所で発生した例外はトレースバックのみ省略され、省略した件数が次のログに付与されること
+        """
+        log_filter = TracebackDeduplicationFilter(interval=60)
+        records = [create_error_record(f'boom {i}') for i in range(3)]
+        assert all(log_filter.filter(record) for record in records)
+
+        assert records[0].exc_info is not None
+        assert records[1].exc_info is None and records[2].exc_info is None
+        assert records[1].exception == 'RuntimeError: boom 1'
+        assert len({record.traceback_id for record in records}) == 1
+
+        # 間隔が経過した後は再びトレースバックが出力されること
+        log_filter._entries[records[0].traceback_id][0] -= 60
+        record = create_error_record('boom')
+        log_filter.filter(record)
+        assert record.exc_info is not None
+        assert record.traceback_suppressed == 2
+
+    def test_queue_handler(self):
+        """ リクエストIDが付与され、キューが一杯の場合は破棄した件数が数えられること
+        """
+        handler = NonBlockingQueueHandler(queue.Queue(1))
+        token = set_request_id('abc')
+        try:
+            handler.handle(logging.LogRecord('test', logging.INFO, __file__, 0, '%s', ('first',), None))
+            handler.handle(logging.LogRecord('test', logging.INFO, __file__, 0, 'second', (), None))
+        finally:
+            reset_request_id(token)
+
+        assert get_request_id() is None
+        record = handler.queue.get_nowait()
+        assert record.getMessage() == 'first'
+        assert record.request_id == 'abc'
+        assert handler.stats() == {'queued': 0, 'max_queue': 1, 'dropped': 1}
@@ -0,0 +1,36 @@
+from tests.conftest import test_app
+from utilities.metrics import get_route_template, get_sql_operation, get_status_class, UNMATCHED_ROUTE
+
+
+def create_scope(method: str, path: str) -> dict:
+    """ テスト用のリクエストのスコープを生成する
+    """
+    return {'type': 'http', 'app': test_app, 'method': method, 'path': path, 'root_path': ''}
+
+
+class TestMetrics:
+    """ メトリクスのユーティリティのテストクラス
+    """
+    def test_route_template(self):
+        """ パスパラメータを含むパスはルートのテンプレートになること
+        """
+        assert get_route_template(create_scope('PUT', '/api/v1/users/1/')) == '/api/v1/users/{id}/'
+        assert get_route_template(create_scope('PUT', '/api/v1/users/bulk/')) == '/api/v1/users/bulk/'
+
+    def test_route_template_unmatched(self):
+        """ 一致するルートが無い場合は生のパスではなく固定のラベルになること
+        """
+        assert get_route_template(create_scope('GET', '/unknown/1')) == UNMATCHED_ROUTE
+
+    def test_status_class(self):
+        """ ステータスコードはクラスにまとめられること
+        """
+        assert get_status_class(200) == '2xx'
+        assert get_status_class(404) == '4xx'
+
+    def test_sql_operation(self):
+        """ SQLの種類を判定できること
+        """
+        assert get_sql_operation('  select * from users') == 'SELECT'
+        assert get_sql_operation('INSERT INTO users ...') == 'INSERT'
+        assert get_sql_operation('SET TIME ZONE UTC') == 'OTHER'
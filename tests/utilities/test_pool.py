@@ -0,0 +1,44 @@
+from unittest import mock
+
+import pytest
+from sqlalchemy import exc
+
+from utilities.pool import InstrumentedQueuePool
+
+
+class TestInstrumentedQueuePool:
+    """ 計測機能付きのコネクションプールのテストクラス
+    """
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        self.pool = InstrumentedQueuePool(mock.Mock, pool_size=1, max_overflow=0, timeout=0.01)
+
+    def test_checkout(self):
+        """ コネクションの取得回数が記録されること
+        """
+        self.pool.connect().close()
+        self.pool.connect().close()
+
+        assert self.pool.stats.checkouts == 2
+        assert self.pool.stats.waits == 0
+        assert self.pool.stats.timeouts == 0
+
+    def test_wait_and_timeout(self):
+        """ 空きコネクションが無い場合は返却待ちとタイムアウトが記録されること
+        """
+        connection = self.pool.connect()
+        with pytest.raises(exc.TimeoutError):
+            self.pool.connect()
+        connection.close()
+
+        assert self.pool.stats.waits == 1
+        assert self.pool.stats.timeouts == 1
+        assert self.pool.stats.checkout_time_max >= 0.01
+
+    def test_recreate(self):
+        """ プールを再生成しても計測値が引き継がれること
+        """
+        self.pool.connect().close()
+
+        assert self.pool.recreate().stats.checkouts == 1
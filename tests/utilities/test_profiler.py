@@ -0,0 +1,55 @@
+from sqlalchemy import text
+
+from tests.db_session import test_db_connection
+from utilities.profiler import end_profile, get_current_profile, normalize_statement, profile_engine, QueryProfile, start_profile
+
+
+class TestProfiler:
+    """ SQLのプロファイラのテストクラス
+    """
+    def test_normalize_statement(self):
+        """ パラメータ・IN句のリスト・空白の違いは同じ形とみなされること
+        """
+        assert normalize_statement('SELECT * FROM users\n WHERE id = %(id_1)s') == 'SELECT * FROM users WHERE id = ?'
+        assert normalize_statement('SELECT * FROM users WHERE id IN ($1, $2, $3)') == \
+            normalize_statement('SELECT * FROM users WHERE id IN ($1)') == \
+            normalize_statement('SELECT * FROM users WHERE id IN ($1, $2)')
+
+    def test_n_plus_one(self):
+        """ 同じ形のSELECTをしきい値以上実行した場合のみN+1の可能性として検出されること
+        """
+        profile = QueryProfile()
+        for i in range(3):
+            profile.record(f'SELECT * FROM users WHERE id = %(id_{i})s', 0.001)
+            profile.record('UPDATE users SET is_active = %(is_active)s', 0.001)
+        profile.record('SELECT * FROM users', 0.001)
+
+        assert profile.count == 7
+        assert profile.n_plus_one(3) == {'SELECT * FROM users WHERE id = ?': 3}
+        assert profile.n_plus_one(4) == {}
+
+        summary = profile.summary(3, limit=2)
+        assert summary['count'] == 7
+        assert len(summary['statements']) == 2
+        assert summary['n_plus_one'] == [{'statement': 'SELECT * FROM users WHERE id = ?', 'count': 3}]
+
+    def test_profile_engine(self):
+        """ 記録中のコンテキストで実行したSQLのみ記録されること
+        """
+        profile_engine(test_db_connection)
+        with test_db_connection.connect() as conn:
+            conn.execute(text('SELECT 1'))
+
+            token = start_profile()
+            profile = get_current_profile()
+            try:
+                conn.execute(text('SELECT 1'))
+                conn.execute(text('SELECT 2'))
+            finally:
+                end_profile(token)
+
+            conn.execute(text('SELECT 3'))
+
+        assert get_current_profile() is None
+        assert profile.count == 2
+        assert set(profile.statements) == {'SELECT 1', 'SELECT 2'}
@@ -0,0 +1,253 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
+import pytest
+
+from utilities.response_cache import (
+    decode_entry,
+    encode_entry,
+    MemcachedResponseCacheStore,
+    MemoryResponseCacheStore,
+    ResponseCacheStore,
+)
+
+
+class FakeTimer:
+    """ 任意に時刻を進められるタイマー
+    """
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeMemcachedServer:
+    """ テスト用のmemcachedの代わりのサーバー（テキストプロトコルのget・set・add・incrのみ、有効期限は無視する）
+
+    faultを設定すると、全てのコマンドに対して障害を再現する
+    ・error: 「SERVER_ERROR」を返す
+    ・partial: getの応答を値の途中で切断する
+    ・hang: 応答しない
+    """
+    def __init__(self) -> None:
+        self.data: Dict[str, bytes] = {}
+        self.fault: Optional[str] = None
+        self.server = None
+
+    async def start(self) -> Tuple[str, int]:
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command, *args = line.decode().split()
+            if command in ('set', 'add'):
+                value = (await reader.readexactly(int(args[3]) + 2))[:-2]
+
+            if self.fault == 'hang':
+                continue
+            if self.fault == 'error':
+                writer.write(b'SERVER_ERROR out of memory\r\n')
+            elif self.fault == 'partial' and command == 'get':
+                value = self.data.get(args[0], b'value')
+                writer.write(b'VALUE %s 0 %d\r\n%s' % (args[0].encode(), len(value), value[:len(value) // 2]))
+                await writer.drain()
+                break
+            elif command == 'get':
+                for key in args:
+                    if key in self.data:
+                        writer.write(b'VALUE %s 0 %d\r\n%s\r\n' % (key.encode(), len(self.data[key]), self.data[key]))
+                writer.write(b'END\r\n')
+            elif command in ('set', 'add'):
+                if command == 'add' and args[0] in self.data:
+                    writer.write(b'NOT_STORED\r\n')
+                else:
+                    self.data[args[0]] = value
+                    writer.write(b'STORED\r\n')
+            elif command == 'incr':
+                if args[0] in self.data:
+                    self.data[args[0]] = str(int(self.data[args[0]]) + int(args[1])).encode()
+                    writer.write(self.data[args[0]] + b'\r\n')
+                else:
+                    writer.write(b'NOT_FOUND\r\n')
+            else:
+                writer.write(b'ERROR\r\n')
+            await writer.drain()
+        writer.close()
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+class TestEntry:
+    """ キャッシュに保存するレスポンスの変換のテストクラス
+    """
+    def test_encode_decode(self):
+        """ ステータス・ヘッダ・ボディ（改行を含む）を元に戻せること
+        """
+        headers = [(b'content-type', b'application/json'), (b'etag', b'W/"abc"')]
+        body = b'[{"id": 1}]\n[]'
+        assert decode_entry(encode_entry(200, headers, body)) == (200, headers, body)
+
+
+class TestResponseCacheStore:
+    """ レスポンスのキャッシュの保存先のインターフェースのテストクラス
+    """
+    def test_incomplete_store(self):
+        """ メソッドを実装していないストアは生成時にエラーにすること
+        """
+        class IncompleteStore(ResponseCacheStore):
+            async def get(self, key: str) -> Optional[bytes]:
+                return None
+
+        with pytest.raises(TypeError):
+            IncompleteStore()
+
+
+class TestMemoryResponseCacheStore:
+    """ プロセス内のレスポンスのキャッシュのテストクラス
+    """
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        self.timer = FakeTimer()
+        self.store = MemoryResponseCacheStore(max_bytes=10, timer=self.timer)
+
+    def test_ttl(self):
+        """ 有効期間を過ぎたエントリは返さないこと
+        """
+        run(self.store.set('a', b'1', ttl=10))
+        self.timer.now = 9
+        assert run(self.store.get('a')) == b'1'
+        self.timer.now = 10
+        assert run(self.store.get('a')) is None
+        assert self.store.stats()['bytes'] == 0
+
+    def test_evict_by_bytes(self):
+        """ バイト数が上限を超えた場合は、最も長く参照されていないエントリから破棄すること
+        """
+        run(self.store.set('a', b'111', ttl=10))
+        run(self.store.set('b', b'222', ttl=10))
+        assert run(self.store.get('a')) == b'111'
+
+        run(self.store.set('c', b'333', ttl=10))
+        assert run(self.store.get('b')) is None
+        assert run(self.store.get('a')) == b'111'
+        assert run(self.store.get('c')) == b'333'
+        assert self.store.stats()['bytes'] == 8
+        assert self.store.stats()['evictions'] == 1
+
+    def test_too_large_entry(self):
+        """ 上限を超えるエントリは保存せず、他のエントリも破棄しないこと
+        """
+        run(self.store.set('a', b'1', ttl=10))
+        run(self.store.set('b', b'x' * 10, ttl=10))
+        assert run(self.store.get('b')) is None
+        assert run(self.store.get('a')) == b'1'
+
+    def test_versions(self):
+        """ テーブルのバージョンを進められること
+        """
+        assert run(self.store.get_versions(['users', 'groups'])) == [0, 0]
+        run(self.store.incr_versions(['users']))
+        assert run(self.store.get_versions(['users', 'groups'])) == [1, 0]
+
+
+class TestMemcachedResponseCacheStore:
+    """ memcachedのレスポンスのキャッシュのテストクラス
+    """
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        self.server = FakeMemcachedServer()
+        host, port = run(self.server.start())
+        self.address = f'{host}:{port}'
+        self.store = MemcachedResponseCacheStore(self.address)
+
+    def teardown_method(self, method) -> None:
+        """ テストケースごとの後処理
+        """
+        run(self.store.close())
+        run(self.server.stop())
+
+    def test_get_set(self):
+        """ 保存したバイト列を取得できること（キーはハッシュ値に変換すること）
+        """
+        key = '/api/v1/users/|users=1|authenticated|/api/v1/users/|limit=10|*/*'
+        assert run(self.store.get(key)) is None
+        run(self.store.set(key, b'entry\r\nEND\r\n', ttl=10))
+        assert run(self.store.get(key)) == b'entry\r\nEND\r\n'
+        assert all(' ' not in key and len(key) <= 250 for key in self.server.data)
+        assert self.store.stats() == {'hits': 1, 'misses': 1, 'errors': 0}
+
+    def test_versions(self):
+        """ バージョンは共有ストアで作成・更新され、破棄された場合も以前のバージョンに戻らないこと
+        """
+        users, groups = run(self.store.get_versions(['users', 'groups']))
+        assert run(self.store.get_versions(['users', 'groups'])) == [users, groups]
+
+        run(self.store.incr_versions(['users']))
+        assert run(self.store.get_versions(['users', 'groups'])) == [users + 1, groups]
+
+        self.server.data.clear()
+        run(self.store.incr_versions(['users']))
+        assert run(self.store.get_versions(['users']))[0] > users + 1
+
+    def test_unavailable(self):
+        """ 接続できない場合はキャッシュミスとして扱い、例外を発生させないこと
+        """
+        store = MemcachedResponseCacheStore('127.0.0.1:1', timeout=0.5)
+        assert run(store.get('a')) is None
+        run(store.set('a', b'1', ttl=10))
+        assert run(store.get_versions(['users'])) is None
+        run(store.incr_versions(['users']))
+        assert store.stats()['errors'] == 4
+
+    def test_server_error(self):
+        """ サーバーがエラーを返した場合はキャッシュミスとして扱い、復旧後は同じストアで通信できること
+        """
+        run(self.store.set('a', b'1', ttl=10))
+        self.server.fault = 'error'
+        assert run(self.store.get('a')) is None
+        run(self.store.set('b', b'2', ttl=10))
+        assert run(self.store.get_versions(['users'])) is None
+        assert self.store.stats()['errors'] == 3
+
+        self.server.fault = None
+        assert run(self.store.get('a')) == b'1'
+        assert self.store.stats()['errors'] == 3
+
+    def test_partial_read(self):
+        """ 応答が値の途中で切断された場合はキャッシュミスとして扱い、再接続して通信できること
+        """
+        run(self.store.set('a', b'0123456789', ttl=10))
+        self.server.fault = 'partial'
+        assert run(self.store.get('a')) is None
+        assert self.store.stats()['errors'] == 1
+
+        self.server.fault = None
+        assert run(self.store.get('a')) == b'0123456789'
+        assert self.store.stats()['errors'] == 1
+
+    def test_timeout(self):
+        """ 応答がタイムアウトした場合はキャッシュミスとして扱い、再接続して通信できること
+        """
+        store = MemcachedResponseCacheStore(self.address, timeout=0.2)
+        run(store.set('a', b'1', ttl=10))
+        self.server.fault = 'hang'
+        assert run(store.get('a')) is None
+        assert store.stats()['errors'] == 1
+
+        self.server.fault = None
+        assert run(store.get('a')) == b'1'
+        assert store.stats()['errors'] == 1
+        run(store.close())
@@ -0,0 +1,31 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from api.schemas.user import UserInDB
+from utilities.serializer import rows_to_json
+
+
+class TestRowsToJson:
+    """ 行のJSON変換のテストクラス
+    """
+    def test_same_as_pydantic(self):
+        """ pydanticでシリアライズした場合と同じJSONになること
+        """
+        columns = tuple(UserInDB.__fields__)
+        user = {
+            'id': 1,
+            'username': 'test1@example.com',
+            'last_name': 'last_name',
+            'first_name': 'first_name',
+            'is_admin': False,
+            'created_at': datetime(2021, 4, 1, 9, 0, 0, 123456, tzinfo=timezone(timedelta(hours=9))),
+            'updated_at': datetime(2021, 4, 1, 0, 0, 0, tzinfo=timezone.utc),
+        }
+        rows = [tuple(user[column] for column in columns)]
+
+        assert json.loads(rows_to_json(rows, columns)) == [json.loads(UserInDB(**user).json())]
+
+    def test_empty(self):
+        """ 0件の場合は空の配列になること
+        """
+        assert rows_to_json([], ('id',)) == b'[]'
@@ -0,0 +1,115 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from fastapi import status
+
+from exceptions import ApiException
+from tests.base import BaseTestCase
+from utilities.throttle import LoginThrottle, MemoryThrottleStore
+
+
+class FakeTimer:
+    """ 任意に時刻を進められるタイマー
+    """
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def consume(store: MemoryThrottleStore, key: str, capacity: int = 2, rate: float = 1.0) -> float:
+    return asyncio.get_event_loop().run_until_complete(store.consume(key, capacity, rate))
+
+
+class TestMemoryThrottleStore:
+    """ プロセス内のトークンバケットのテストクラス
+    """
+    def setup_method(self, method) -> None:
+        """ テストケースごとの前処理
+        """
+        self.timer = FakeTimer()
+        self.store = MemoryThrottleStore(maxsize=2, timer=self.timer)
+
+    def test_consume(self):
+        """ 容量分は連続して許可し、超過した場合は次のトークンが補充されるまでの秒数を返すこと
+        """
+        assert consume(self.store, 'a') == 0
+        assert consume(self.store, 'a') == 0
+        assert consume(self.store, 'a') == pytest.approx(1.0)
+
+        self.timer.now = 0.5
+        assert consume(self.store, 'a') == pytest.approx(0.5)
+
+        self.timer.now = 1.0
+        assert consume(self.store, 'a') == 0
+        assert self.store.stats()['rejected'] == 2
+
+    def test_evict_full_buckets(self):
+        """ 満杯まで補充されたバケットは削除され、上限を超える場合は古いバケットから削除されること
+        """
+        consume(self.store, 'a')
+        consume(self.store, 'b')
+        self.timer.now = 1.0
+        consume(self.store, 'c')
+        assert self.store.stats()['size'] == 1  # a・bは満杯に戻ったため削除
+        assert self.store.stats()['evictions'] == 0
+
+        consume(self.store, 'd')
+        consume(self.store, 'e')
+        assert self.store.stats()['size'] == 2
+        assert self.store.stats()['evictions'] == 1
+
+
+class TestLoginThrottle(BaseTestCase):
+    """ ログインの試行回数の制限のテストクラス
+    """
+    TEST_URL = '/api/v1/auth/login/'
+
+    def test_check(self):
+        """ ユーザー名ごとの上限を超えた場合は、IPアドレスが違っても429とRetry-Afterを返すこと
+        """
+        throttle = LoginThrottle(MemoryThrottleStore(10), ip_capacity=10, ip_rate=1, username_capacity=1, username_rate=0.1)
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(throttle.check('127.0.0.1', 'user@example.com'))
+
+        with pytest.raises(ApiException) as e:
+            loop.run_until_complete(throttle.check('127.0.0.2', 'USER@example.com'))
+        assert e.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert e.value.headers == {'Retry-After': '10'}
+
+    def test_ip_limited_keeps_username_bucket(self):
+        """ IPアドレスの制限で拒否した場合は、ユーザー名のバケットを消費しないこと
+        """
+        throttle = LoginThrottle(MemoryThrottleStore(10), ip_capacity=1, ip_rate=0.1, username_capacity=2, username_rate=0.1)
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(throttle.check('127.0.0.1', 'user@example.com'))
+        for _ in range(3):
+            with pytest.raises(ApiException):
+                loop.run_until_complete(throttle.check('127.0.0.1', 'user@example.com'))
+
+        # 他のIPアドレスからは同じユーザー名でログインを試行できること
+        loop.run_until_complete(throttle.check('127.0.0.2', 'user@example.com'))
+
+    def test_zero_rate_disabled(self):
+        """ 1秒あたりの補充数が0の制限は無効にすること（容量が0の場合と同じ）
+        """
+        throttle = LoginThrottle(MemoryThrottleStore(10), ip_capacity=1, ip_rate=0, username_capacity=1, username_rate=0)
+        loop = asyncio.get_event_loop()
+        for _ in range(3):
+            loop.run_until_complete(throttle.check('127.0.0.1', 'user@example.com'))
+
+    def test_login_throttled(self):
+        """ 上限を超えたログインはユーザーの取得・パスワードの検証の前に429を返すこと
+        """
+        throttle = LoginThrottle(MemoryThrottleStore(10), ip_capacity=0, ip_rate=1, username_capacity=1, username_rate=1)
+        data = {'username': 'unknown@example.com', 'password': 'password'}
+        with mock.patch('api.v1.auth.get_login_throttle', return_value=throttle):
+            assert self.client.post(self.TEST_URL, data=data).status_code == status.HTTP_400_BAD_REQUEST
+
+            with mock.patch('api.v1.auth.AsyncCRUDUser') as crud:
+                response = self.client.post(self.TEST_URL, data=data)
+            assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+            assert response.headers['Retry-After'] == '1'
+            crud.assert_not_called()
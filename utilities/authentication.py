@@ -1,11 +1,26 @@
-from typing import Optional
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Union
 
 from fastapi import security, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import scoped_session
 from starlette import authentication
 
+from core.config import get_env
+from crud import get_async_db_session
+from crud.crud_token_revocation import AsyncCRUDTokenRevocation
+from crud.crud_user import AsyncCRUDUser
 from exceptions import ApiException, create_error
 from exceptions.error_messages import ErrorMessage
-from migrations.models import User
+from utilities.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# DBセッションのinfoに、コミット後に失効リストに追加するトークンのバージョンを記録するキー
+REVOKED_TOKEN_VERSIONS_KEY = 'revoked_token_versions'
 
 
 class OAuth2PasswordBearer(security.OAuth2PasswordBearer):
@@ -35,12 +50,180 @@ class OAuth2PasswordBearer(security.OAuth2PasswordBearer):
 class AuthenticatedUser(authentication.SimpleUser):
     """ 承認済みユーザー
     """
-    def __init__(self, user: User) -> None:
-        self.id = user.id
-        self.username = user.username
+    def __init__(self, id: int, username: str) -> None:
+        self.id = id
+        self.username = username
 
 
 class UnauthenticatedUser(authentication.UnauthenticatedUser):
     """ 未承認ユーザー
     """
     pass
+
+
+@lru_cache
+def get_authenticated_user_cache() -> TTLCache:
+    """ 認証済みユーザーのキャッシュを返す
+
+    ユーザーID → (ユーザー名, 有効かどうか) を保持し、リクエストごとのユーザー取得を省略する
+    ユーザーを更新・削除した場合はキャッシュから削除すること
+
+    Returns:
+        TTLCache: 認証済みユーザーのキャッシュ
+    """
+    return TTLCache(
+        maxsize=get_env().auth_user_cache_size,
+        ttl=get_env().auth_user_cache_ttl,
+    )
+
+
+async def load_token_revocations() -> Dict[int, int]:
+    """ アクセストークンの有効期間内の失効の記録を読み込む
+
+    Returns:
+        Dict[int, int]: ユーザーIDと有効なアクセストークンの最小のバージョン
+    """
+    db_session = get_async_db_session()
+    try:
+        return await AsyncCRUDTokenRevocation(db_session).get_versions(get_env().jwt_access_token_expire)
+    finally:
+        await db_session.close()
+
+
+class TokenRevocationList:
+    """ ステートレス認証で使用するアクセストークンの失効リスト
+
+    ユーザーID → 有効なアクセストークンの最小のバージョン を保持し、これより古いバージョンのアクセストークンは失効しているとみなす
+    リストはinterval秒ごとにDBから読み込み直す（リクエストは待たせず、バックグラウンドで読み込む）ため、
+    他のワーカーで失効させたアクセストークンは最大interval秒後に使用できなくなる
+
+    Attributes:
+        interval (float): DBから読み込み直す間隔（秒）
+        loader (Callable[[], Awaitable[Dict[int, int]]]): DBから失効の記録を読み込む関数
+        versions (Dict[int, int]): ユーザーIDと有効なアクセストークンの最小のバージョン
+        loaded_at (Optional[float]): 最後に読み込んだ時刻（timerの値）
+        failures (int): 読み込みに失敗した回数
+    """
+    def __init__(
+        self,
+        interval: float,
+        loader: Callable[[], Awaitable[Dict[int, int]]] = load_token_revocations,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = interval
+        self.loader = loader
+        self._timer = timer
+        self.versions: Dict[int, int] = {}
+        self.loaded_at: Optional[float] = None
+        self.failures = 0
+        self._task: Optional[asyncio.Future] = None
+
+    def is_revoked(self, user_id: int, token_version: int) -> bool:
+        """ アクセストークンが失効しているかどうか
+
+        Args:
+            user_id (int): ユーザーID
+            token_version (int): アクセストークンのバージョン
+
+        Returns:
+            bool: 失効している場合はTrue
+        """
+        return token_version < self.versions.get(user_id, 0)
+
+    def is_fresh(self) -> bool:
+        """ リストが最新かどうか（読み込みに失敗し続けて、2回分の間隔より前のリストのままになっていないか）
+        """
+        return self.loaded_at is not None and self._timer() - self.loaded_at < self.interval * 2
+
+    def add(self, versions: Dict[int, int]) -> None:
+        """ 失効させたバージョンをリストに反映する（DBから読み込むまで待たずに、このワーカーでは即時に失効させる）
+
+        Args:
+            versions (Dict[int, int]): ユーザーIDと有効なアクセストークンの最小のバージョン
+        """
+        for user_id, token_version in versions.items():
+            self.versions[user_id] = max(token_version, self.versions.get(user_id, 0))
+
+    async def refresh_if_stale(self) -> None:
+        """ 読み込み直す間隔を過ぎている場合はバックグラウンドで読み込む
+
+        一度も読み込んでいない場合のみ、読み込みが終わるまで待つ
+        """
+        if self.loaded_at is not None and self._timer() - self.loaded_at < self.interval:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.refresh())
+        if self.loaded_at is None:
+            await asyncio.shield(self._task)
+
+    async def refresh(self) -> None:
+        """ DBから読み込み直す（失敗した場合は読み込み前のリストを使用し続ける）
+        """
+        try:
+            versions = await self.loader()
+        except Exception as e:
+            self.failures += 1
+            logger.error('アクセストークンの失効リストを読み込めませんでした', exc_info=e)
+            return
+        self.versions = versions
+        self.loaded_at = self._timer()
+
+    def stats(self) -> Dict[str, Union[int, float, None]]:
+        """ リストの状態を返す
+        """
+        return {
+            'size': len(self.versions),
+            'age': None if self.loaded_at is None else round(self._timer() - self.loaded_at, 3),
+            'failures': self.failures,
+        }
+
+
+@lru_cache
+def get_token_revocation_list() -> TokenRevocationList:
+    """ アクセストークンの失効リストを返す
+    """
+    return TokenRevocationList(get_env().auth_revocation_refresh_interval)
+
+
+async def revoke_tokens(db_session: Union[AsyncSession, scoped_session], ids: Sequence[int]) -> None:
+    """ ユーザーのトークンのバージョンを進めて、発行済みのアクセストークンを失効させる
+
+    ステートレス認証（AUTH_STATELESS）が有効な場合のみ実行する
+    更新の場合は更新した後、削除の場合は削除する前に呼び出すこと（削除後はバージョンを進められないため）
+    自ワーカーの失効リストへの追加は、コミットが成功した後に行う（apply_revoked_tokens）
+
+    Args:
+        db_session (Union[AsyncSession, scoped_session]): DBセッション
+        ids (Sequence[int]): ユーザーIDのリスト
+    """
+    if not get_env().auth_stateless:
+        return
+    versions = await AsyncCRUDUser(db_session).increment_token_versions(ids)
+    await AsyncCRUDTokenRevocation(db_session).revoke(versions, get_env().jwt_access_token_expire)
+    db_session.info.setdefault(REVOKED_TOKEN_VERSIONS_KEY, {}).update(versions)
+
+
+def pop_revoked_tokens(db_session: Any) -> Dict[int, int]:
+    """ DBセッションで失効させたトークンのバージョンの記録を取り出す
+
+    Args:
+        db_session (Any): DBセッション（scoped_session・AsyncSession）
+
+    Returns:
+        Dict[int, int]: ユーザーIDと失効させたトークンのバージョン
+    """
+    info = getattr(db_session, 'info', None)
+    if info is None:
+        return {}
+    return info.pop(REVOKED_TOKEN_VERSIONS_KEY, {})
+
+
+def apply_revoked_tokens(db_session: Any) -> None:
+    """ コミットしたDBセッションで失効させたトークンのバージョンを、自ワーカーの失効リストに追加する
+
+    Args:
+        db_session (Any): コミットしたDBセッション
+    """
+    versions = pop_revoked_tokens(db_session)
+    if versions:
+        get_token_revocation_list().add(versions)
@@ -0,0 +1,115 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールはプロセス内キャッシュに関するユーティリティを提供する
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """ 有効期限付きのLRUキャッシュ
+
+    件数が上限に達した場合は最も長く参照されていないエントリから破棄する
+
+    Attributes:
+        maxsize (int): 保持するエントリ数の上限
+        ttl (float): エントリの有効期間（秒）
+        hits (int): キャッシュヒット数
+        misses (int): キャッシュミス数
+        evictions (int): 上限超過により破棄したエントリ数
+    """
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._timer = timer
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ キャッシュから値を取得する
+
+        Args:
+            key (Hashable): キー
+            default (Any): キャッシュに存在しない、または有効期限切れの場合に返す値
+
+        Returns:
+            Any: キャッシュの値
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= self._timer():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """ キャッシュに値を設定する
+
+        Args:
+            key (Hashable): キー
+            value (Any): 値
+            ttl (Optional[float]): このエントリの有効期間（秒）、未指定の場合はself.ttl
+        """
+        if self.maxsize <= 0:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, self._timer() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """ キャッシュから値を削除する
+
+        Args:
+            key (Hashable): キー
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """ キャッシュをすべて削除する
+        """
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """ キャッシュの使用状況を返す
+
+        Returns:
+            Dict[str, int]: キャッシュの使用状況
+        """
+        with self._lock:
+            return {
+                'maxsize': self.maxsize,
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
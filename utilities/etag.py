@@ -0,0 +1,74 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールはETagと条件付きリクエスト（If-None-Match・If-Match）に関するユーティリティを提供する
+
+ETagはレスポンスボディではなく、レスポンスの元になるデータの版（主キー・最終更新日時など）から生成する
+（ボディを生成しなくても、データが変わっていないことを確認できるようにするため）
+"""
+import hashlib
+from typing import Any, List, Optional
+
+
+def make_etag(*values: Any, weak: bool = False) -> str:
+    """ 値からETagを生成する
+
+    Args:
+        values (Any): データの版を表す値（文字列に変換してハッシュ化する）
+        weak (bool): 弱いETag（「W/」付き）にするかどうか
+
+    Returns:
+        str: ETag（ダブルクォートで囲んだ値）
+    """
+    digest = hashlib.md5('|'.join(map(str, values)).encode('utf-8')).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def parse_etags(header: Optional[str]) -> List[str]:
+    """ If-None-Match・If-Matchヘッダの値をETagのリストに分割する
+
+    Args:
+        header (Optional[str]): ヘッダの値
+
+    Returns:
+        List[str]: ETagのリスト（「*」の場合は["*"]）
+    """
+    if not header:
+        return []
+    return [etag.strip() for etag in header.split(',') if etag.strip()]
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """ If-None-Matchヘッダにetagが含まれるかどうか（弱い比較、含まれる場合は304を返す）
+
+    Args:
+        header (Optional[str]): If-None-Matchヘッダの値
+        etag (str): 現在のETag
+
+    Returns:
+        bool: 含まれる場合はTrue
+    """
+    etags = parse_etags(header)
+    return '*' in etags or _opaque(etag) in {_opaque(value) for value in etags}
+
+
+def if_match(header: Optional[str], etag: Optional[str]) -> bool:
+    """ If-Matchヘッダにetagが含まれるかどうか（強い比較、含まれない場合は412を返す）
+
+    Args:
+        header (Optional[str]): If-Matchヘッダの値
+        etag (Optional[str]): 現在のETag（データが存在しない場合はNone）
+
+    Returns:
+        bool: 含まれる場合はTrue（弱いETagは一致しない）
+    """
+    if etag is None:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or (not etag.startswith('W/') and etag in etags)
+
+
+def _opaque(etag: str) -> str:
+    """ 弱いETagの「W/」を除いた値を返す
+    """
+    return etag[2:] if etag.startswith('W/') else etag
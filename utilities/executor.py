@@ -0,0 +1,181 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールは同期処理をスレッドプールで実行するユーティリティを提供する
+
+同期のDBセッション（scoped_session）を使用する処理をイベントループ上で直接実行すると、
+クエリの完了を待つ間に他のリクエストの処理がすべて止まってしまうため、スレッドプールで実行する
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from sqlalchemy.orm import scoped_session
+from starlette.requests import Request
+
+from core.config import get_env
+
+ResultType = TypeVar('ResultType')
+
+
+class ExecutorFullError(Exception):
+    """ 空きスレッド待ちの処理数が上限に達している場合の例外
+    """
+    pass
+
+
+class Executor:
+    """ スレッド数に上限のあるスレッドプール
+
+    Attributes:
+        max_workers (int): スレッド数の上限
+        max_queue (Optional[int]): 空きスレッド待ちの処理数の上限（Noneの場合は上限なし）
+        running (int): 実行中の処理数
+        queued (int): 空きスレッド待ちの処理数
+        submitted (int): 受け付けた処理数の累計
+        completed (int): 完了した処理数の累計
+        max_queued (int): 空きスレッド待ちの処理数の最大値
+        rejected (int): 上限超過で受け付けなかった処理数の累計
+        cancelled (int): 空きスレッド待ちの間にキャンセルされ、実行されなかった処理数の累計
+    """
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: Optional[int] = None,
+        thread_name_prefix: str = 'executor',
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.running = 0
+        self.queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.max_queued = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=thread_name_prefix,
+        )
+
+    async def run(
+        self,
+        func: Callable[[], ResultType],
+        db_session: Optional[scoped_session] = None,
+    ) -> ResultType:
+        """ スレッドプールで関数を実行して結果を返す
+
+        scoped_sessionはスレッドごとに別のセッションを返すため、
+        db_sessionが指定された場合は呼び出し元のスレッドのセッションを実行スレッドでも使用するようにする
+
+        Args:
+            func (Callable[[], ResultType]): 実行する関数
+            db_session (Optional[scoped_session]): 実行スレッドに引き継ぐDBセッション
+
+        Returns:
+            ResultType: funcの戻り値
+
+        Raises:
+            ExecutorFullError: 空きスレッド待ちの処理数が上限に達している場合
+        """
+        session = db_session() if db_session is not None else None
+        context = contextvars.copy_context()
+        # 空きスレッド待ちから外したかどうか（実行開始時またはキャンセル時のどちらか一方で1回だけ外す）
+        dequeued = False
+
+        def task() -> ResultType:
+            nonlocal dequeued
+            with self._lock:
+                if not dequeued:
+                    dequeued = True
+                    self.queued -= 1
+                self.running += 1
+            if session is not None:
+                db_session.registry.set(session)
+            try:
+                return context.run(func)
+            finally:
+                if session is not None:
+                    db_session.registry.clear()
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        with self._lock:
+            if self.max_queue is not None and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorFullError()
+            self.submitted += 1
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        try:
+            return await asyncio.get_event_loop().run_in_executor(self._executor, task)
+        finally:
+            # 空きスレッド待ちの間に呼び出し元がキャンセルされた場合、taskは実行されないためここで外す
+            with self._lock:
+                if not dequeued:
+                    dequeued = True
+                    self.queued -= 1
+                    self.cancelled += 1
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """ スレッドプールの使用状況を返す
+
+        Returns:
+            Dict[str, Optional[int]]: スレッドプールの使用状況
+        """
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'running': self.running,
+                'queued': self.queued,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'max_queued': self.max_queued,
+                'rejected': self.rejected,
+                'cancelled': self.cancelled,
+            }
+
+
+@lru_cache
+def get_executor() -> Executor:
+    """ アプリケーション共通のスレッドプールを返す
+    """
+    return Executor(get_env().executor_max_workers)
+
+
+def offload(func: Callable[..., ResultType]) -> Callable[..., Any]:
+    """ 同期関数をスレッドプールで実行するコルーチン関数に変換するデコレータ
+
+    引数にRequestが含まれる場合は「request.state.db_session」を実行スレッドに引き継ぐ
+    DBセッションが生成されていない場合は生成しない（DBSessionStateの__missing__を呼び出さないよう、ステートを直接参照する）
+
+    Examples
+    --------
+    >>> class SampleAPI:
+    ...     @classmethod
+    ...     @offload
+    ...     def gets(cls, request: Request) -> List[User]:
+    ...         return CRUDUser(request.state.db_session).gets()
+    >>> await SampleAPI.gets(request)
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs) -> ResultType:
+        db_session = None
+        for arg in (*args, *kwargs.values()):
+            if isinstance(arg, Request):
+                db_session = arg.state._state.get('db_session')
+                break
+        if not isinstance(db_session, scoped_session):
+            db_session = None
+        return await get_executor().run(
+            functools.partial(func, *args, **kwargs),
+            db_session=db_session,
+        )
+    return wrapper
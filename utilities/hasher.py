@@ -2,12 +2,25 @@
 # -*- coding: utf-8 -*-
 """
 このモジュールはパスワードハッシュに関するユーティリティ提供する
+
+ハッシュ化のアルゴリズム（PBKDF2・scrypt）と強度は環境変数で指定する
+ハッシュ化されたパスワードには使用したアルゴリズムと強度を含めるため、設定を変更しても既存のパスワードは検証でき、
+ログイン時に現在の設定でハッシュ化し直す（must_update_password）
 """
+import asyncio
 import base64
 import hashlib
 import hmac
-from typing import Any
+import time
+from functools import lru_cache, partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import status
 
+from core.config import get_env
+from exceptions import ApiException, create_error
+from exceptions.error_messages import ErrorMessage
+from utilities.executor import Executor, ExecutorFullError
 from utilities.string import StringUtils
 
 
@@ -27,14 +40,14 @@ class PasswordHasher:
         self,
         plain_password: str,
         salt: str,
-        iterations: int = 36000
+        iterations: Optional[int] = None
     ) -> str:
         """ 平文のパスワードをハッシュ化する
 
         Args:
             plain_password (str): 平文のパスワード
             salt (str): ソルト値
-            iterations (str): ストレッチングの回数
+            iterations (Optional[int]): ストレッチングの回数（未指定の場合は環境変数「PASSWORD_HASH_ITERATIONS」）
 
         Returns:
             str: 平文のパスワードをハッシュ化した文字列
@@ -46,6 +59,7 @@ class PasswordHasher:
         """
         assert plain_password is not None
         assert salt and '$' not in salt
+        iterations = iterations or get_env().password_hash_iterations
 
         # 平文のパスワード と ソルト値を結合してiterationsの回数分ストレッチング
         hash = self.__pbkdf2(
@@ -71,7 +85,19 @@ class PasswordHasher:
         """
         _, iterations, salt, _ = hashed_password.split('$', 3)
         encoded_2 = self.encode(plain_password, salt, int(iterations))
-        return self.__constant_time_compare(hashed_password, encoded_2)
+        return self._constant_time_compare(hashed_password, encoded_2)
+
+    def must_update(self, hashed_password: str) -> bool:
+        """ ハッシュ化されたパスワードの強度が現在の設定と異なるかどうか
+
+        Args:
+            hashed_password (str): ハッシュ化されたパスワード
+
+        Returns:
+            bool: 現在の設定でハッシュ化し直す必要がある場合はTrue
+        """
+        _, iterations, _, _ = hashed_password.split('$', 3)
+        return int(iterations) != get_env().password_hash_iterations
 
     def __pbkdf2(
         self,
@@ -94,13 +120,13 @@ class PasswordHasher:
             str: パスワードをハッシュ化した文字列
         """
         dklen = dklen or None
-        plain_password = self.__force_bytes(plain_password)
-        salt = self.__force_bytes(salt)
+        plain_password = self._force_bytes(plain_password)
+        salt = self._force_bytes(salt)
         return hashlib.pbkdf2_hmac(
             digest().name, plain_password, salt, iterations, dklen
         )
 
-    def __constant_time_compare(self, value1: str, value2: str) -> bool:
+    def _constant_time_compare(self, value1: str, value2: str) -> bool:
         """ 2つの文字列（value1 と value2）が等しいかどうか
 
         Args:
@@ -111,11 +137,11 @@ class PasswordHasher:
             bool: 文字列が等しい場合はTrue, 等しくない場合はFalse
         """
         return hmac.compare_digest(
-            self.__force_bytes(value1),
-            self.__force_bytes(value2)
+            self._force_bytes(value1),
+            self._force_bytes(value2)
         )
 
-    def __force_bytes(
+    def _force_bytes(
         self,
         s,
         encoding: str = 'utf-8',
@@ -142,6 +168,113 @@ class PasswordHasher:
         return str(s).encode(encoding, errors)
 
 
+class ScryptPasswordHasher(PasswordHasher):
+    """ scryptアルゴリズムを使用したパスワードハッシュクラス
+
+    CPUに加えてメモリ（約128 * n * r バイト）も消費するため、GPUなどによる総当たりに強い
+    hashlib.scryptはOpenSSL 1.1以上でビルドされたPythonでのみ使用できる
+
+    Attributes:
+        algorithm (str): 暗号化アルゴリズム
+        dklen (int): 生成鍵長(オクテット)
+    """
+    algorithm = 'scrypt'
+    dklen = 64
+
+    def encode(
+        self,
+        plain_password: str,
+        salt: str,
+        n: Optional[int] = None,
+        r: Optional[int] = None,
+        p: Optional[int] = None,
+    ) -> str:
+        """ 平文のパスワードをハッシュ化する
+
+        Args:
+            plain_password (str): 平文のパスワード
+            salt (str): ソルト値
+            n (Optional[int]): CPU・メモリのコスト（2の累乗、未指定の場合は環境変数「PASSWORD_HASH_SCRYPT_N」）
+            r (Optional[int]): ブロックサイズ（未指定の場合は環境変数「PASSWORD_HASH_SCRYPT_R」）
+            p (Optional[int]): 並列度（未指定の場合は環境変数「PASSWORD_HASH_SCRYPT_P」）
+
+        Returns:
+            str: 平文のパスワードをハッシュ化した文字列
+
+        Raises:
+            AssertionError:
+                ・平文のパスワードが空文字やNoneが指定された場合
+                ・ソルト値に空文字やNoneが指定された、またはソルト値に"$"が含まれてしまっている場合
+        """
+        assert plain_password is not None
+        assert salt and '$' not in salt
+        n = n or get_env().password_hash_scrypt_n
+        r = r or get_env().password_hash_scrypt_r
+        p = p or get_env().password_hash_scrypt_p
+
+        hash = hashlib.scrypt(
+            self._force_bytes(plain_password),
+            salt=self._force_bytes(salt),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+            dklen=self.dklen,
+        )
+        hash = base64.b64encode(hash).decode('ascii').strip()
+
+        # 「アルゴリズム名」「n」「r」「p」「ソルト値」「ハッシュ値」を結合した文字列を返す
+        return "%s$%d$%d$%d$%s$%s" % (self.algorithm, n, r, p, salt, hash)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        _, n, r, p, salt, _ = hashed_password.split('$', 5)
+        encoded_2 = self.encode(plain_password, salt, int(n), int(r), int(p))
+        return self._constant_time_compare(hashed_password, encoded_2)
+
+    def must_update(self, hashed_password: str) -> bool:
+        _, n, r, p, _, _ = hashed_password.split('$', 5)
+        return (int(n), int(r), int(p)) != (
+            get_env().password_hash_scrypt_n,
+            get_env().password_hash_scrypt_r,
+            get_env().password_hash_scrypt_p,
+        )
+
+
+# アルゴリズム名とパスワードハッシュクラスの対応
+PASSWORD_HASHERS = {hasher.algorithm: hasher for hasher in (PasswordHasher, ScryptPasswordHasher)}
+
+
+def get_hasher(algorithm: Optional[str] = None) -> PasswordHasher:
+    """ パスワードハッシュクラスのインスタンスを返す
+
+    Args:
+        algorithm (Optional[str]): アルゴリズム名（未指定の場合は環境変数「PASSWORD_HASHER」）
+
+    Returns:
+        PasswordHasher: パスワードハッシュクラスのインスタンス
+
+    Raises:
+        ValueError: 対応していないアルゴリズム名が指定された場合
+    """
+    algorithm = algorithm or get_env().password_hasher
+    if algorithm not in PASSWORD_HASHERS:
+        raise ValueError(f'対応していないパスワードハッシュのアルゴリズムです: {algorithm}')
+    return PASSWORD_HASHERS[algorithm]()
+
+
+def identify_hasher(hashed_password: str) -> Optional[PasswordHasher]:
+    """ ハッシュ化されたパスワードのアルゴリズムのパスワードハッシュクラスのインスタンスを返す
+
+    Args:
+        hashed_password (str): ハッシュ化されたパスワード
+
+    Returns:
+        Optional[PasswordHasher]: パスワードハッシュクラスのインスタンス、対応していないアルゴリズムの場合はNone
+    """
+    hasher = PASSWORD_HASHERS.get(hashed_password.split('$', 1)[0])
+    return hasher() if hasher else None
+
+
 def is_hashed_password_usable(hashed_password: str) -> bool:
     """ ハッシュ化されたパスワードが正当な値かどうか
 
@@ -167,7 +300,21 @@ def check_password(plain_password: str, hashed_password: str) -> bool:
     if plain_password is None\
             or not is_hashed_password_usable(hashed_password):
         return False
-    return PasswordHasher().verify(plain_password, hashed_password)
+    hasher = identify_hasher(hashed_password)
+    return hasher is not None and hasher.verify(plain_password, hashed_password)
+
+
+def must_update_password(hashed_password: str) -> bool:
+    """ ハッシュ化されたパスワードのアルゴリズム・強度が現在の設定と異なるかどうか
+
+    Args:
+        hashed_password (str): ハッシュ化されたパスワード
+
+    Returns:
+        bool: 現在の設定でハッシュ化し直す必要がある場合はTrue
+    """
+    hasher = identify_hasher(hashed_password)
+    return hasher is None or hasher.algorithm != get_env().password_hasher or hasher.must_update(hashed_password)
 
 
 def make_password(plain_password: str) -> str:
@@ -179,4 +326,161 @@ def make_password(plain_password: str) -> str:
     Returns:
         str: パスワードをハッシュ化した文字列
     """
-    return PasswordHasher().encode(plain_password, StringUtils.get_random_string())
+    return get_hasher().encode(plain_password, StringUtils.get_random_string())
+
+
+def measure_hasher(hasher: PasswordHasher, repeat: int = 5, **params: int) -> float:
+    """ 1回のハッシュ化にかかる時間（秒）を計測する
+
+    Args:
+        hasher (PasswordHasher): パスワードハッシュクラスのインスタンス
+        repeat (int): 計測の繰り返し回数（最小値を返す）
+        params (int): encodeに渡す強度（iterations、n・r・p）
+
+    Returns:
+        float: 1回のハッシュ化にかかる時間（秒）
+    """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hasher.encode('password', 'calibrationsalt', **params)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def calibrate_hasher(algorithm: str, target: float, repeat: int = 5) -> Dict[str, int]:
+    """ 1回のハッシュ化にかかる時間が目標時間以下で最大になる強度を求める
+
+    ・PBKDF2: 処理時間はストレッチングの回数に比例するため、基準の回数で計測した時間から回数を求める（1000回単位）
+    ・scrypt: nは2の累乗のみのため、nを2倍にしながら目標時間を超えない最大のnを求める（r・pは設定値のまま）
+
+    Args:
+        algorithm (str): アルゴリズム名
+        target (float): 1回のハッシュ化の目標時間（秒）
+        repeat (int): 計測の繰り返し回数
+
+    Returns:
+        Dict[str, int]: 強度（encodeの引数名と値）
+    """
+    hasher = get_hasher(algorithm)
+
+    if isinstance(hasher, ScryptPasswordHasher):
+        r, p = get_env().password_hash_scrypt_r, get_env().password_hash_scrypt_p
+        n = 2 ** 10
+        while measure_hasher(hasher, repeat, n=n * 2, r=r, p=p) <= target:
+            n *= 2
+        return {'n': n, 'r': r, 'p': p}
+
+    base_iterations = 10000
+    elapsed = measure_hasher(hasher, repeat, iterations=base_iterations)
+    return {'iterations': max(1000, int(base_iterations * target / elapsed) // 1000 * 1000)}
+
+
+@lru_cache
+def get_hasher_executor() -> Executor:
+    """ パスワードハッシュ専用のスレッドプールを返す
+
+    hashlib.pbkdf2_hmacは実行中にGILを解放するため、スレッドプールでも複数コアで並列に実行される
+    DBアクセス用のスレッドプール（utilities.executor.get_executor）とは分けて、ハッシュ化がDBアクセスを待たせないようにする
+    """
+    return Executor(
+        get_env().hasher_max_workers,
+        max_queue=get_env().hasher_max_queue,
+        thread_name_prefix='hasher',
+    )
+
+
+async def run_in_hasher(func: Any, *args) -> Any:
+    """ パスワードハッシュ専用のスレッドプールで関数を実行する
+
+    Args:
+        func (Any): 実行する関数
+        args: 関数の引数
+
+    Returns:
+        Any: 関数の戻り値
+
+    Raises:
+        ApiException: 空きスレッド待ちの処理数が上限に達している場合
+    """
+    try:
+        return await get_hasher_executor().run(partial(func, *args))
+    except ExecutorFullError:
+        raise ApiException(create_error(ErrorMessage.SERVER_BUSY), status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+async def acheck_password(plain_password: str, hashed_password: str) -> bool:
+    """ check_passwordをパスワードハッシュ専用のスレッドプールで実行する
+
+    Args:
+        plain_password (str): 平文パスワード
+        hashed_password (str): ハッシュ化されたパスワード
+
+    Returns:
+        bool: 平文のパスワードとハッシュ化されたパスワードのハッシュ値が一致する場合はTrue、一致しない場合はFalse
+
+    Raises:
+        ApiException: 空きスレッド待ちの処理数が上限に達している場合
+    """
+    return await run_in_hasher(check_password, plain_password, hashed_password)
+
+
+async def amake_password(plain_password: str) -> str:
+    """ make_passwordをパスワードハッシュ専用のスレッドプールで実行する
+
+    Args:
+        plain_password (str): 平文パスワード
+
+    Returns:
+        str: パスワードをハッシュ化した文字列
+
+    Raises:
+        ApiException: 空きスレッド待ちの処理数が上限に達している場合
+    """
+    return await run_in_hasher(make_password, plain_password)
+
+
+async def amake_passwords(plain_passwords: Sequence[str]) -> List[str]:
+    """ 複数のパスワードをパスワードハッシュ専用のスレッドプールで並列にハッシュ化する
+
+    待ち行列の上限（hasher_max_queue）を超えないよう、同時に投入する件数はスレッド数までとする
+
+    Args:
+        plain_passwords (Sequence[str]): 平文パスワードのリスト
+
+    Returns:
+        List[str]: パスワードをハッシュ化した文字列のリスト（plain_passwordsと同じ順序）
+
+    Raises:
+        ApiException: 空きスレッド待ちの処理数が上限に達している場合
+    """
+    return await _gather_in_hasher(make_password, [(plain_password,) for plain_password in plain_passwords])
+
+
+async def acheck_passwords(passwords: Sequence[Tuple[str, str]]) -> List[bool]:
+    """ 複数のパスワードをパスワードハッシュ専用のスレッドプールで並列に検証する
+
+    Args:
+        passwords (Sequence[Tuple[str, str]]): 平文パスワードとハッシュ化されたパスワードの組のリスト
+
+    Returns:
+        List[bool]: 一致するかどうかのリスト（passwordsと同じ順序）
+
+    Raises:
+        ApiException: 空きスレッド待ちの処理数が上限に達している場合
+    """
+    return await _gather_in_hasher(check_password, passwords)
+
+
+async def _gather_in_hasher(func: Any, args_list: Sequence[tuple]) -> list:
+    """ 関数を引数の組ごとにパスワードハッシュ専用のスレッドプールで並列に実行する
+
+    待ち行列の上限（hasher_max_queue）を超えないよう、同時に投入する件数はスレッド数までとする
+    """
+    semaphore = asyncio.Semaphore(get_hasher_executor().max_workers)
+
+    async def run(args: tuple) -> Any:
+        async with semaphore:
+            return await run_in_hasher(func, *args)
+
+    return list(await asyncio.gather(*(run(args) for args in args_list)))
@@ -3,18 +3,22 @@
 """
 このモジュールはJsonWebTokenの生成や複合に関するユーティリティ提供する
 """
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, Optional
 
 from jose import jwt
 
 from core.config import get_env
 from migrations.models import User
+from utilities.cache import TTLCache
 
 TYPE_ACCESS_TOKEN = 'access_token'
 TYPE_REFRESH_TOKEN = 'refresh_token'
 
-PROTECTED_TOKEN_TYPES = (TYPE_ACCESS_TOKEN)
+PROTECTED_TOKEN_TYPES = (TYPE_ACCESS_TOKEN, TYPE_REFRESH_TOKEN)
 
 
 def jwt_claims_handler(user: User, token_type: str = '') -> Dict[str, Any]:
@@ -31,7 +35,7 @@ def jwt_claims_handler(user: User, token_type: str = '') -> Dict[str, Any]:
         AssertionError: 不正なトークンタイプが指定された場合
     """
     assert token_type in PROTECTED_TOKEN_TYPES, \
-        f'引数token_type には{"".join(PROTECTED_TOKEN_TYPES)}を指定してください'
+        f'引数token_type には{"、".join(PROTECTED_TOKEN_TYPES)}を指定してください'
 
     claims = {
         'token_type': token_type,
@@ -42,6 +46,18 @@ def jwt_claims_handler(user: User, token_type: str = '') -> Dict[str, Any]:
     if claims['token_type'] == TYPE_ACCESS_TOKEN:
         claims['exp'] = datetime.utcnow() + timedelta(seconds=get_env().jwt_access_token_expire)
 
+        # ステートレス認証の場合は、認証時にDBから取得していたユーザー情報とトークンのバージョンを含める
+        if get_env().auth_stateless:
+            claims.update({
+                'username': user.username,
+                'is_active': user.is_active,
+                'token_version': user.token_version,
+            })
+
+    # 「リフレッシュトークン」の有効期限設定
+    elif claims['token_type'] == TYPE_REFRESH_TOKEN:
+        claims['exp'] = datetime.utcnow() + timedelta(seconds=get_env().jwt_refresh_token_expire)
+
     return claims
 
 
@@ -61,29 +77,72 @@ def jwt_encode_handler(claims: dict) -> str:
     )
 
 
-def jwt_decord_handler(jwt_string: str) -> Dict[str, Any]:
+@lru_cache
+def get_jwt_claims_cache() -> TTLCache:
+    """ 検証済みのクレームセットのキャッシュを返す
+
+    JWT文字列のダイジェスト → クレームセット を有効期限（exp）まで保持する
+
+    Returns:
+        TTLCache: 検証済みのクレームセットのキャッシュ
+    """
+    return TTLCache(maxsize=get_env().jwt_claims_cache_size, ttl=0)
+
+
+def jwt_decord_handler(jwt_string: str, use_cache: bool = True) -> Dict[str, Any]:
     """ JWT文字列をデコードしてクレームセットを返す
 
+    同じJWT文字列は有効期限までキャッシュした検証済みのクレームセットを返し、署名の検証を省略する
+
     Args:
         jwt_string (str): JWT文字列
+        use_cache (bool): キャッシュを使用するかどうか
 
     Returns:
         Dict[str, Any]: JWTをデコードして取得したクレームセット
+
+    Raises:
+        jwt.ExpiredSignatureError: 有効期限切れの場合
     """
-    claims = jwt.decode(
-        jwt_string,
-        get_env().jwt_secret_key,
-        algorithms=get_env().jwt_algorithm,)
-    return claims
+    if not use_cache:
+        return jwt.decode(
+            jwt_string,
+            get_env().jwt_secret_key,
+            algorithms=get_env().jwt_algorithm,)
+
+    cache = get_jwt_claims_cache()
+    key = hashlib.sha256(jwt_string.encode('utf-8')).digest()
+    claims = cache.get(key)
+
+    if claims is None:
+        claims = jwt.decode(
+            jwt_string,
+            get_env().jwt_secret_key,
+            algorithms=get_env().jwt_algorithm,)
+
+        # 有効期限があるクレームセットのみ、有効期限までキャッシュする
+        if isinstance(claims.get('exp'), (int, float)):
+            cache.set(key, claims, ttl=claims['exp'] - time.time())
+
+    # キャッシュの有効期間はプロセス内の時刻で管理しているため、有効期限切れでないことを改めて確認する
+    elif claims['exp'] <= time.time():
+        cache.delete(key)
+        raise jwt.ExpiredSignatureError('Signature has expired.')
+
+    return dict(claims)
 
 
-def jwt_response_handler(access_token: str) -> Dict[str, str]:
+def jwt_response_handler(access_token: str, refresh_token: Optional[str] = None) -> Dict[str, str]:
     """ JWT文字列を含んだ辞書データを返す
 
     Args:
         access_token (str): アクセストークン
+        refresh_token (Optional[str]): リフレッシュトークン
 
     Returns:
         Dict[str, str]: JWT認証レスポンス
     """
-    return {'token_type': 'bearer', TYPE_ACCESS_TOKEN: access_token}
+    response = {'token_type': 'bearer', TYPE_ACCESS_TOKEN: access_token}
+    if refresh_token:
+        response[TYPE_REFRESH_TOKEN] = refresh_token
+    return response
@@ -0,0 +1,212 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールはログ出力に関するユーティリティを提供する
+
+・ログはキューに積むだけにして、標準出力への書き込み（とトレースバックの整形）は専用のスレッドで行う
+  （イベントループ上で同期的に書き込むと、エラーが多発した際に書き込み待ちで全リクエストが止まるため）
+・ログは1行1件のJSONで出力し、リクエストID（X-Request-ID）を付与してリクエスト単位で追跡できるようにする
+・同じ箇所で発生した例外のトレースバックは一定時間に1回だけ出力し、それ以外はトレースバックを省略する
+"""
+import atexit
+import copy
+import hashlib
+import logging
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+import orjson
+
+from core.config import get_env
+
+_request_id: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
+# LogRecordの標準の属性（これ以外の属性はextraで指定された項目としてJSONに含める）
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def get_request_id() -> Optional[str]:
+    """ 処理中のリクエストのID（リクエスト外の場合はNone）を返す
+    """
+    return _request_id.get()
+
+
+def set_request_id(request_id: Optional[str]):
+    """ 処理中のリクエストのIDを設定する
+
+    Args:
+        request_id (Optional[str]): リクエストID
+
+    Returns:
+        Token: 設定を戻す際にreset_request_idに渡すトークン
+    """
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token) -> None:
+    """ リクエストIDの設定を戻す
+
+    Args:
+        token (Token): set_request_idが返したトークン
+    """
+    _request_id.reset(token)
+
+
+def get_traceback_fingerprint(exc_info) -> str:
+    """ 例外の種類と発生箇所（トレースバックの各フレームのファイル・行番号）から、例外を識別する値を返す
+
+    例外のメッセージは含めないため、IDなどの値だけが違う同じ箇所の例外は同じ値になる
+
+    Args:
+        exc_info: sys.exc_info()の値
+
+    Returns:
+        str: 例外を識別する値
+    """
+    exc_type, _, tb = exc_info
+    frames = [f'{exc_type.__module__}.{exc_type.__qualname__}']
+    while tb is not None:
+        frames.append(f'{tb.tb_frame.f_code.co_filename}:{tb.tb_lineno}')
+        tb = tb.tb_next
+    return hashlib.sha1('|'.join(frames).encode()).hexdigest()[:12]
+
+
+class TracebackDeduplicationFilter(logging.Filter):
+    """ 同じ例外のトレースバックを一定時間に1回だけ出力するフィルタ
+
+    ログ自体は破棄せず、トレースバックのみ省略する（リクエストIDでエラーになったリクエストを追跡できるようにするため）
+    ログには例外を識別する値（traceback_id）と例外のメッセージ（exception）を付与し、
+    省略したログは同じtraceback_idのトレースバックを参照する
+    省略した件数は、次にトレースバックを出力する際にtraceback_suppressedとして付与する
+
+    Attributes:
+        interval (float): 同じ例外のトレースバックを出力する間隔（秒）、0以下の場合は省略しない
+        max_entries (int): 記録する例外の種類の上限（超過した場合は古いものから削除する）
+    """
+    def __init__(self, interval: float, max_entries: int = 1024) -> None:
+        super().__init__()
+        self.interval = interval
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not record.exc_info or record.exc_info[0] is None or self.interval <= 0:
+            return True
+
+        fingerprint = get_traceback_fingerprint(record.exc_info)
+        record.traceback_id = fingerprint
+        record.exception = traceback.format_exception_only(*record.exc_info[:2])[-1].strip()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                record.exc_info = None
+                record.exc_text = None
+                return True
+
+            self._entries[fingerprint] = [now, 0]
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        if entry is not None and entry[1]:
+            record.traceback_suppressed = entry[1]
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """ ログを1行のJSONに変換するフォーマッタ
+
+    出力する項目: timestamp・level・logger・message・request_id、extraで指定した項目、例外の場合はtraceback
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        log = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in log:
+                log[key] = value
+        if record.exc_info and record.exc_info[0] is not None:
+            log['traceback'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log['traceback'] = record.exc_text
+        return orjson.dumps(log, default=str).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """ ログをキューに積むだけのハンドラ
+
+    キューが一杯の場合はログを破棄して件数を数える（呼び出し元を待たせないため）
+    メッセージの整形とリクエストIDの付与のみ呼び出し元で行い、トレースバックの整形は出力スレッドで行う
+
+    Attributes:
+        listener (Optional[QueueListener]): キューからログを取り出して出力するリスナー
+        dropped (int): キューが一杯で破棄したログの件数
+    """
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.listener: Optional[QueueListener] = None
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = get_request_id()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        """ キューの使用状況を返す
+        """
+        return {
+            'queued': self.queue.qsize(),
+            'max_queue': self.queue.maxsize,
+            'dropped': self.dropped,
+        }
+
+
+@lru_cache
+def setup_logging() -> NonBlockingQueueHandler:
+    """ ルートロガーにキュー経由でJSONを標準出力に書き込むハンドラを設定し、出力スレッドを開始する
+
+    2回目以降の呼び出しでは設定済みのハンドラを返す（プロセス終了時に残りのログを出力してスレッドを停止する）
+
+    Returns:
+        NonBlockingQueueHandler: ルートロガーに設定したハンドラ
+    """
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(get_env().log_queue_size))
+    handler.addFilter(TracebackDeduplicationFilter(get_env().log_traceback_interval))
+    handler.listener = QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+    handler.listener.start()
+    atexit.register(handler.listener.stop)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(get_env().log_level.upper())
+    root_logger.addHandler(handler)
+    return handler
@@ -0,0 +1,157 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールはPrometheus形式のメトリクスに関するユーティリティを提供する
+
+・HTTPリクエスト: ルート（パスのテンプレート）・ステータスクラスごとの件数、レイテンシのヒストグラム、処理中の件数
+・DB: SQLの種類ごとの実行回数、実行時間のヒストグラム
+
+uvicornを複数ワーカーで起動する場合は、環境変数「PROMETHEUS_MULTIPROC_DIR」に空のディレクトリを指定して起動すると、
+全ワーカーの値を集計して返す（prometheus_clientのマルチプロセスモード、ディレクトリは起動のたびに空にすること）
+"""
+import os
+import time
+from typing import Optional, Tuple, Union
+
+from prometheus_client import (
+    CollectorRegistry,
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    generate_latest,
+    Histogram,
+    multiprocess,
+    REGISTRY,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+from starlette.types import Scope
+
+# ルートに一致しなかったリクエストのラベル（生のパスをラベルにすると件数が際限なく増えるため）
+UNMATCHED_ROUTE = '<unmatched>'
+
+# ラベルに使用するSQLの種類
+SQL_OPERATIONS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total',
+    'HTTPリクエスト数',
+    ['method', 'route', 'status'],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'HTTPリクエストの処理時間（秒）',
+    ['method', 'route'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    '処理中のHTTPリクエスト数',
+    ['method'],
+    multiprocess_mode='livesum',
+)
+DB_STATEMENTS = Counter(
+    'db_statements_total',
+    'SQLの実行回数',
+    ['operation'],
+)
+DB_STATEMENT_DURATION = Histogram(
+    'db_statement_duration_seconds',
+    'SQLの実行時間（秒）',
+    ['operation'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+def get_route_template(scope: Scope) -> str:
+    """ リクエストに一致したルートのパスのテンプレート（例: /api/v1/users/{id}/）を返す
+
+    Args:
+        scope (Scope): リクエストのスコープ
+
+    Returns:
+        str: パスのテンプレート、一致するルートが無い場合はUNMATCHED_ROUTE
+    """
+    app = scope.get('app')
+    partial = None
+    for route in getattr(app, 'routes', []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path  # メソッドのみ一致しない（405）
+    return partial or UNMATCHED_ROUTE
+
+
+def get_status_class(status_code: int) -> str:
+    """ ステータスコードのクラス（例: 2xx）を返す
+    """
+    return f'{status_code // 100}xx'
+
+
+def get_sql_operation(statement: str) -> str:
+    """ SQLの種類（SELECT・INSERTなど）を返す
+    """
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return operation if operation in SQL_OPERATIONS else 'OTHER'
+
+
+def observe_request(method: str, route: str, status_code: int, elapsed: float) -> None:
+    """ HTTPリクエストの処理結果を記録する
+
+    Args:
+        method (str): HTTPメソッド
+        route (str): パスのテンプレート
+        status_code (int): ステータスコード
+        elapsed (float): 処理時間（秒）
+    """
+    HTTP_REQUESTS.labels(method, route, get_status_class(status_code)).inc()
+    HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+
+
+def observe_engine(engine: Union[Engine, AsyncEngine]) -> None:
+    """ エンジンで実行したSQLの回数と実行時間を記録する
+
+    Args:
+        engine (Union[Engine, AsyncEngine]): エンジン
+    """
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started: Optional[float] = getattr(context, '_metrics_started', None)
+        operation = get_sql_operation(statement)
+        DB_STATEMENTS.labels(operation).inc()
+        if started is not None:
+            DB_STATEMENT_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+
+def generate_metrics() -> Tuple[bytes, str]:
+    """ Prometheusのテキスト形式でメトリクスを返す
+
+    マルチプロセスモードの場合は全ワーカーの値を集計する
+
+    Returns:
+        Tuple[bytes, str]: メトリクスとContent-Type
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """ メトリクスを返すエンドポイント
+    """
+    content, content_type = generate_metrics()
+    return Response(content, headers={'Content-Type': content_type})
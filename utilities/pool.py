@@ -0,0 +1,155 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールはDBのコネクションプールの計測に関するユーティリティを提供する
+
+コネクションの取得待ち時間・待ち回数・タイムアウト回数と、使用中・待機中のコネクション数を記録し、
+プールのサイズをワーカー数に合わせて決めるための材料にする
+"""
+import threading
+import time
+from typing import Dict, Union
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """ コネクションプールの計測値
+
+    Attributes:
+        checkouts (int): コネクションの取得回数
+        waits (int): 空きコネクションが無く、返却を待った回数
+        timeouts (int): 返却待ちがタイムアウトした回数
+        checkout_time_total (float): コネクションの取得にかかった時間の合計（秒）
+        checkout_time_max (float): コネクションの取得にかかった時間の最大値（秒）
+        connects (int): DBとの接続を新しく確立した回数
+        checkins (int): コネクションの返却回数
+        invalidations (int): コネクションが無効化（切断）された回数
+    """
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.checkout_time_total = 0.0
+        self.checkout_time_max = 0.0
+        self.connects = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, elapsed: float, waited: bool, timed_out: bool) -> None:
+        """ コネクションの取得を記録する
+
+        Args:
+            elapsed (float): 取得にかかった時間（秒）
+            waited (bool): 空きコネクションの返却を待ったかどうか
+            timed_out (bool): 返却待ちがタイムアウトしたかどうか
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.waits += int(waited)
+            self.timeouts += int(timed_out)
+            self.checkout_time_total += elapsed
+            self.checkout_time_max = max(self.checkout_time_max, elapsed)
+
+    def increment(self, name: str) -> None:
+        """ 回数を1増やす
+
+        Args:
+            name (str): 属性名（connects・checkins・invalidations）
+        """
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class InstrumentedPoolMixin:
+    """ コネクションの取得を計測するコネクションプールのMixin
+
+    プールのイベントには取得待ちの開始を通知するものが無いため、取得処理（_do_get）をオーバーライドして計測する
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        waited = self._max_overflow > -1 and self.checkedin() == 0 and self._overflow >= self._max_overflow
+        timed_out = False
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.record_checkout(time.perf_counter() - started, waited, timed_out)
+
+    def recreate(self):
+        """ プールの再生成（engine.dispose()など）後も計測値を引き継ぐ
+        """
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    """ 計測機能付きのQueuePool（同期エンジン用）
+    """
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """ 計測機能付きのAsyncAdaptedQueuePool（非同期エンジン用）
+    """
+    pass
+
+
+def instrument_engine(engine: Union[Engine, AsyncEngine]) -> None:
+    """ エンジンのプールのイベント（接続・返却・無効化）を計測値に記録する
+
+    エンジンのプールにはInstrumentedQueuePoolまたはInstrumentedAsyncAdaptedQueuePoolを指定すること
+
+    Args:
+        engine (Union[Engine, AsyncEngine]): エンジン
+    """
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+    def on_event(name: str):
+        def listener(*args) -> None:
+            sync_engine.pool.stats.increment(name)
+        return listener
+
+    event.listen(sync_engine, 'connect', on_event('connects'))
+    event.listen(sync_engine, 'checkin', on_event('checkins'))
+    event.listen(sync_engine, 'invalidate', on_event('invalidations'))
+
+
+def get_pool_stats(engine: Union[Engine, AsyncEngine]) -> Dict[str, Union[int, float]]:
+    """ エンジンのプールの使用状況を返す
+
+    Args:
+        engine (Union[Engine, AsyncEngine]): エンジン
+
+    Returns:
+        Dict[str, Union[int, float]]: プールの使用状況（件数、時間はミリ秒）
+    """
+    pool = engine.sync_engine.pool if isinstance(engine, AsyncEngine) else engine.pool
+    stats: PoolStats = pool.stats
+    with stats._lock:
+        return {
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'in_use': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'checkouts': stats.checkouts,
+            'waits': stats.waits,
+            'timeouts': stats.timeouts,
+            'checkout_avg_ms': stats.checkout_time_total / stats.checkouts * 1000 if stats.checkouts else 0.0,
+            'checkout_max_ms': stats.checkout_time_max * 1000,
+            'connects': stats.connects,
+            'checkins': stats.checkins,
+            'invalidations': stats.invalidations,
+        }
@@ -0,0 +1,150 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールはリクエストごとのSQLのプロファイラを提供する
+
+リクエストの処理中に実行したSQLの回数・実行時間を記録し、同じ形のSQLが繰り返し実行されている場合はN+1の可能性として検出する
+記録先はコンテキスト変数で保持するため、スレッドプール（utilities.executor）やAsyncSessionで実行したSQLも同じリクエストに記録される
+"""
+import re
+import threading
+import time
+from contextvars import ContextVar, Token
+from typing import Dict, List, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# バインドパラメータ（psycopg2: %(name)s、asyncpg: $1）
+_PARAMETER = re.compile(r'%\(\w+\)s|\$\d+')
+# IN句などのパラメータのリスト（件数が違っても同じ形とみなす）
+_PARAMETER_LIST = re.compile(r'\(\?(?:\s*,\s*\?)+\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_current_profile: ContextVar[Optional['QueryProfile']] = ContextVar('query_profile', default=None)
+
+
+def normalize_statement(statement: str) -> str:
+    """ SQLの形（パラメータを「?」に置き換え、空白をまとめたもの）を返す
+
+    Args:
+        statement (str): SQL
+
+    Returns:
+        str: SQLの形
+    """
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    statement = _PARAMETER.sub('?', statement)
+    return _PARAMETER_LIST.sub('(?)', statement)
+
+
+class QueryProfile:
+    """ 1リクエストで実行したSQLの記録
+
+    Attributes:
+        count (int): SQLの実行回数
+        total_time (float): SQLの実行時間の合計（秒）
+        statements (Dict[str, List[float]]): SQLの形ごとの実行時間（秒）のリスト
+    """
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        """ SQLの実行を記録する
+
+        Args:
+            statement (str): SQL
+            elapsed (float): 実行時間（秒）
+        """
+        shape = normalize_statement(statement)
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.statements.setdefault(shape, []).append(elapsed)
+
+    def n_plus_one(self, threshold: int) -> Dict[str, int]:
+        """ N+1の可能性があるSQL（同じ形のSELECTをthreshold回以上実行しているもの）を返す
+
+        Args:
+            threshold (int): 実行回数のしきい値
+
+        Returns:
+            Dict[str, int]: SQLの形と実行回数
+        """
+        with self._lock:
+            return {
+                shape: len(times) for shape, times in self.statements.items()
+                if len(times) >= threshold and shape.upper().startswith('SELECT')
+            }
+
+    def summary(self, threshold: int, limit: int = 5) -> Dict[str, Union[int, float, list]]:
+        """ 記録の要約を返す
+
+        Args:
+            threshold (int): N+1とみなす実行回数のしきい値
+            limit (int): 実行時間の合計が長い順に返すSQLの件数
+
+        Returns:
+            Dict[str, Union[int, float, list]]: 実行回数・実行時間（ミリ秒）・SQLの形ごとの内訳・N+1の可能性があるSQL
+        """
+        n_plus_one = self.n_plus_one(threshold)
+        with self._lock:
+            statements = sorted(self.statements.items(), key=lambda item: sum(item[1]), reverse=True)
+            return {
+                'count': self.count,
+                'time_ms': round(self.total_time * 1000, 2),
+                'statements': [
+                    {'statement': shape, 'count': len(times), 'time_ms': round(sum(times) * 1000, 2)}
+                    for shape, times in statements[:limit]
+                ],
+                'n_plus_one': [{'statement': shape, 'count': count} for shape, count in n_plus_one.items()],
+            }
+
+
+def start_profile() -> Token:
+    """ 現在のコンテキスト（リクエスト）でSQLの記録を開始する
+
+    Returns:
+        Token: 記録を終了する際にend_profileに渡すトークン
+    """
+    return _current_profile.set(QueryProfile())
+
+
+def get_current_profile() -> Optional[QueryProfile]:
+    """ 現在のコンテキストの記録を返す（記録していない場合はNone）
+    """
+    return _current_profile.get()
+
+
+def end_profile(token: Token) -> None:
+    """ SQLの記録を終了する
+
+    Args:
+        token (Token): start_profileが返したトークン
+    """
+    _current_profile.reset(token)
+
+
+def profile_engine(engine: Union[Engine, AsyncEngine]) -> None:
+    """ エンジンで実行したSQLを、実行中のリクエストの記録に追加する
+
+    Args:
+        engine (Union[Engine, AsyncEngine]): エンジン
+    """
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if _current_profile.get() is not None:
+            context._profiler_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        profile = _current_profile.get()
+        started: Optional[float] = getattr(context, '_profiler_started', None)
+        if profile is not None and started is not None:
+            profile.record(statement, time.perf_counter() - started)
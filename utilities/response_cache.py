@@ -0,0 +1,450 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールはGETのレスポンスのキャッシュに関するユーティリティを提供する
+
+・環境変数「RESPONSE_CACHE_ENABLED」がTrueの場合のみキャッシュする（デフォルトは無効）
+・キャッシュするルートはエンドポイントにcache_responseを指定する（有効期間・依存するテーブル・認証の範囲をルートごとに指定する）
+・キャッシュのキーは、ルート・依存するテーブルのバージョン・認証の範囲・パス・クエリ文字列・Acceptヘッダから生成する
+・レスポンスはシリアライズ済みのバイト列（ステータス・ヘッダ・ボディ）で保存し、ヒットした場合はアプリケーションを実行せずに返す
+・BaseCRUDで登録・更新・削除したテーブルはDBセッションに記録し、コミット後にテーブルのバージョンを進めて無効化する
+  （キーにバージョンを含めるため、古いエントリは参照されなくなり、有効期限切れ・LRUで破棄される）
+
+キャッシュの保存先（ResponseCacheStore）は差し替え可能
+・MemoryResponseCacheStore: プロセス（ワーカー）内に保存する（デフォルト）
+  無効化も自ワーカーのみのため、他のワーカーでは有効期間内は更新前のレスポンスを返すことがある
+・MemcachedResponseCacheStore: memcachedに保存する（全ワーカーでキャッシュと無効化を共有する）
+・その他の保存先はResponseCacheStoreを継承したクラスを実装し、環境変数「RESPONSE_CACHE_STORE」に「モジュール名:クラス名」を指定する
+"""
+import asyncio
+import hashlib
+import importlib
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import orjson
+from starlette.routing import Match
+from starlette.types import Scope
+
+from core.config import get_env
+
+logger = logging.getLogger(__name__)
+
+# DBセッションのinfoに登録・更新・削除したテーブル名を記録するキー
+CHANGED_TABLES_KEY = 'response_cache_changed_tables'
+
+# キャッシュの認証の範囲
+SCOPE_PUBLIC = 'public'  # 認証しない（全てのクライアントで共有する）
+SCOPE_AUTHENTICATED = 'authenticated'  # 承認済みユーザーのみ（承認済みユーザー間で共有する）
+SCOPE_USER = 'user'  # ユーザーごと
+
+# キャッシュしたルートが依存するテーブル名（これ以外のテーブルの更新では無効化しない）
+_cached_tables: Set[str] = set()
+
+
+class ResponseCachePolicy:
+    """ ルートごとのキャッシュの設定
+
+    Attributes:
+        ttl (float): 有効期間（秒）
+        tables (Tuple[str, ...]): レスポンスが依存するテーブル名（登録・更新・削除された場合に無効化する）
+        scope (str): 認証の範囲（SCOPE_PUBLIC・SCOPE_AUTHENTICATED・SCOPE_USER）
+    """
+    def __init__(self, ttl: float, tables: Sequence[str], scope: str) -> None:
+        if scope not in (SCOPE_PUBLIC, SCOPE_AUTHENTICATED, SCOPE_USER):
+            raise ValueError(f'不正な認証の範囲です: {scope}')
+        self.ttl = ttl
+        self.tables = tuple(sorted(tables))
+        self.scope = scope
+
+
+def cache_response(ttl: float, tables: Sequence[str], scope: str = SCOPE_AUTHENTICATED) -> Callable:
+    """ エンドポイントのレスポンス（GETのステータス200のみ）をキャッシュするデコレーター
+
+    ルーターへの登録より前に適用すること（@router.getの下に指定する）
+    認証が必要な範囲の場合は、キャッシュを参照する前に認証し、承認済みユーザーでない場合はキャッシュしない
+
+    Args:
+        ttl (float): 有効期間（秒）
+        tables (Sequence[str]): レスポンスが依存するテーブル名
+        scope (str): 認証の範囲
+
+    Returns:
+        Callable: エンドポイントにキャッシュの設定を付与するデコレーター
+    """
+    policy = ResponseCachePolicy(ttl, tables, scope)
+    _cached_tables.update(policy.tables)
+
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.response_cache_policy = policy
+        return endpoint
+    return decorator
+
+
+def get_cache_policy(scope: Scope) -> Tuple[Optional[str], Optional[ResponseCachePolicy]]:
+    """ リクエストに一致したルートのパスのテンプレートとキャッシュの設定を返す
+
+    Args:
+        scope (Scope): リクエストのスコープ
+
+    Returns:
+        Tuple[Optional[str], Optional[ResponseCachePolicy]]: パスのテンプレートとキャッシュの設定（キャッシュしない場合はNone）
+    """
+    for route in getattr(scope.get('app'), 'routes', []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path, getattr(getattr(route, 'endpoint', None), 'response_cache_policy', None)
+    return None, None
+
+
+def mark_changed(db_session: Any, table: str) -> None:
+    """ DBセッションで登録・更新・削除したテーブルを記録する
+
+    Args:
+        db_session (Any): DBセッション（scoped_session・Session）
+        table (str): テーブル名
+    """
+    if table in _cached_tables:
+        db_session.info.setdefault(CHANGED_TABLES_KEY, set()).add(table)
+
+
+def pop_changed_tables(db_session: Any) -> Set[str]:
+    """ DBセッションで登録・更新・削除したテーブルの記録を取り出す
+
+    Args:
+        db_session (Any): DBセッション（scoped_session・Session・AsyncSession）
+
+    Returns:
+        Set[str]: テーブル名
+    """
+    info = getattr(db_session, 'info', None)
+    if info is None:
+        return set()
+    return info.pop(CHANGED_TABLES_KEY, set())
+
+
+def encode_entry(status_code: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> bytes:
+    """ レスポンスをキャッシュに保存するバイト列に変換する（1行目がステータス・ヘッダのJSON、以降がボディ）
+    """
+    meta = orjson.dumps({
+        'status': status_code,
+        'headers': [[name.decode('latin-1'), value.decode('latin-1')] for name, value in headers],
+    })
+    return meta + b'\n' + body
+
+
+def decode_entry(entry: bytes) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """ キャッシュに保存したバイト列をレスポンス（ステータス・ヘッダ・ボディ）に戻す
+    """
+    meta, body = entry.split(b'\n', 1)
+    data = orjson.loads(meta)
+    return data['status'], [(name.encode('latin-1'), value.encode('latin-1')) for name, value in data['headers']], body
+
+
+class ResponseCacheStore(ABC):
+    """ レスポンスのキャッシュの保存先のインターフェース
+
+    保存先で例外が発生した場合はログを出力してキャッシュミスとして扱い、リクエストをエラーにしないこと
+    """
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """ キャッシュを取得する（存在しない、または有効期限切れの場合はNone）
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """ キャッシュを保存する
+        """
+
+    @abstractmethod
+    async def get_versions(self, tables: Sequence[str]) -> Optional[List[int]]:
+        """ テーブルのバージョンを返す（取得できない場合はNone、キャッシュを使用しない）
+        """
+
+    @abstractmethod
+    async def incr_versions(self, tables: Iterable[str]) -> None:
+        """ テーブルのバージョンを進める（以前のバージョンで保存したキャッシュは参照されなくなる）
+        """
+
+    def stats(self) -> Dict[str, int]:
+        """ 保存先の使用状況を返す
+        """
+        return {}
+
+
+class MemoryResponseCacheStore(ResponseCacheStore):
+    """ プロセス内にレスポンスを保存するストア
+
+    保存したバイト数（キーとレスポンスの合計）が上限を超える場合は、最も長く参照されていないエントリから破棄する
+
+    Attributes:
+        max_bytes (int): 保存するバイト数の上限
+        hits (int): キャッシュヒット数
+        misses (int): キャッシュミス数
+        evictions (int): 上限超過により破棄したエントリ数
+    """
+    def __init__(self, max_bytes: int, timer: Callable[[], float] = time.monotonic) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._timer = timer
+        self._size = 0
+        # キー → (レスポンス, 有効期限)
+        self._data: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= self._timer():
+                self.__remove(key)
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        # 上限を超えるエントリは保存しない（他の全エントリを破棄してしまうため）
+        if len(key) + len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self.__remove(key)
+            self._data[key] = (value, self._timer() + ttl)
+            self._size += len(key) + len(value)
+            while self._size > self.max_bytes:
+                self.__remove(next(iter(self._data)))
+                self.evictions += 1
+
+    async def get_versions(self, tables: Sequence[str]) -> Optional[List[int]]:
+        with self._lock:
+            return [self._versions.get(table, 0) for table in tables]
+
+    async def incr_versions(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def __remove(self, key: str) -> None:
+        """ エントリを削除する（ロックを取得してから呼び出すこと）
+        """
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._size -= len(key) + len(entry[0])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'max_bytes': self.max_bytes,
+                'bytes': self._size,
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class MemcachedError(Exception):
+    """ memcachedがエラーを返した、または想定外の応答を返した場合の例外
+    """
+    pass
+
+
+class MemcachedResponseCacheStore(ResponseCacheStore):
+    """ memcachedにレスポンスを保存するストア
+
+    テキストプロトコル（get・set・add・incr）で通信し、1ワーカーにつき1コネクションを使い回す
+    memcachedのキーは250バイト以下・空白を含まない必要があるため、キャッシュのキーはハッシュ値に変換する
+    テーブルのバージョンが破棄された場合に以前のバージョンに戻らないよう、バージョンは現在時刻（マイクロ秒）から開始する
+
+    Attributes:
+        host (str): ホスト名
+        port (int): ポート番号
+        timeout (float): 1回の通信のタイムアウト（秒）
+        key_prefix (str): キーの接頭辞
+        hits (int): キャッシュヒット数
+        misses (int): キャッシュミス数
+        errors (int): 通信に失敗した回数
+    """
+    def __init__(self, address: Optional[str] = None, timeout: float = 1.0, key_prefix: str = 'response_cache:') -> None:
+        host, port = (address or get_env().response_cache_memcached_address).rsplit(':', 1)
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            values = await self.__call(self.__get, [self.__entry_key(key)])
+        except Exception as e:
+            self.__error('get', e)
+            return None
+
+        value = values.get(self.__entry_key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self.__call(self.__store, b'set', self.__entry_key(key), value, ttl)
+        except Exception as e:
+            self.__error('set', e)
+
+    async def get_versions(self, tables: Sequence[str]) -> Optional[List[int]]:
+        keys = [self.__version_key(table) for table in tables]
+        try:
+            values = await self.__call(self.__get, keys)
+            missing = [key for key in keys if key not in values]
+            if missing:
+                # 未作成（または破棄された）バージョンは作成してから読み直す（同時に作成された場合は先に作成された値を使う）
+                for key in missing:
+                    await self.__call(self.__store, b'add', key, self.__initial_version(), 0)
+                values.update(await self.__call(self.__get, missing))
+            return [int(values[key]) for key in keys]
+        except Exception as e:
+            self.__error('get_versions', e)
+            return None
+
+    async def incr_versions(self, tables: Iterable[str]) -> None:
+        for table in tables:
+            key = self.__version_key(table)
+            try:
+                if not await self.__call(self.__incr, key):
+                    await self.__call(self.__store, b'add', key, self.__initial_version(), 0)
+            except Exception as e:
+                self.__error('incr_versions', e)
+
+    async def close(self) -> None:
+        """ コネクションを閉じる
+        """
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+        }
+
+    async def __call(self, command: Callable, *args: Any) -> Any:
+        """ コネクションを排他してコマンドを実行する（失敗した場合は応答の途中で切れている可能性があるためコネクションを閉じる）
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    self._reader, self._writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout)
+                return await asyncio.wait_for(command(*args), self.timeout)
+            except BaseException:
+                await self.close()
+                raise
+
+    async def __get(self, keys: List[str]) -> Dict[str, bytes]:
+        """ 「get <key>*」を実行する
+        """
+        self._writer.write(b'get ' + ' '.join(keys).encode() + b'\r\n')
+        await self._writer.drain()
+
+        values = {}
+        while True:
+            line = await self._reader.readline()
+            if line == b'END\r\n':
+                return values
+            parts = line.split()
+            if len(parts) != 4 or parts[0] != b'VALUE':
+                raise MemcachedError(line)
+            data = await self._reader.readexactly(int(parts[3]) + 2)
+            values[parts[1].decode()] = data[:-2]
+
+    async def __store(self, command: bytes, key: str, value: bytes, ttl: float) -> bool:
+        """ 「set」「add」を実行する（保存しなかった場合はFalse）
+        """
+        self._writer.write(b'%s %s 0 %d %d\r\n%s\r\n' % (command, key.encode(), math.ceil(ttl), len(value), value))
+        await self._writer.drain()
+
+        line = await self._reader.readline()
+        if line == b'STORED\r\n':
+            return True
+        if line == b'NOT_STORED\r\n':
+            return False
+        raise MemcachedError(line)
+
+    async def __incr(self, key: str) -> bool:
+        """ 「incr <key> 1」を実行する（キーが存在しない場合はFalse）
+        """
+        self._writer.write(b'incr %s 1\r\n' % key.encode())
+        await self._writer.drain()
+
+        line = await self._reader.readline()
+        if line == b'NOT_FOUND\r\n':
+            return False
+        if not line.rstrip().isdigit():
+            raise MemcachedError(line)
+        return True
+
+    def __entry_key(self, key: str) -> str:
+        return f'{self.key_prefix}entry:{hashlib.sha1(key.encode()).hexdigest()}'
+
+    def __version_key(self, table: str) -> str:
+        return f'{self.key_prefix}version:{table}'
+
+    def __initial_version(self) -> bytes:
+        return str(time.time_ns() // 1000).encode()
+
+    def __error(self, operation: str, e: Exception) -> None:
+        self.errors += 1
+        logger.warning('memcachedとの通信に失敗しました: %s %s', operation, repr(e))
+
+
+def create_response_cache_store() -> ResponseCacheStore:
+    """ 環境変数「RESPONSE_CACHE_STORE」（モジュール名:クラス名）のストアを生成する（未指定の場合はMemoryResponseCacheStore）
+    """
+    if not get_env().response_cache_store:
+        return MemoryResponseCacheStore(get_env().response_cache_max_bytes)
+    module_name, class_name = get_env().response_cache_store.split(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+@lru_cache
+def get_response_cache() -> ResponseCacheStore:
+    """ レスポンスのキャッシュの保存先を返す
+    """
+    return create_response_cache_store()
+
+
+async def invalidate_changed_tables(db_session: Any) -> None:
+    """ コミットしたDBセッションで登録・更新・削除したテーブルのキャッシュを無効化する
+
+    Args:
+        db_session (Any): コミットしたDBセッション
+    """
+    tables = pop_changed_tables(db_session)
+    if tables:
+        await get_response_cache().incr_versions(sorted(tables))
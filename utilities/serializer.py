@@ -0,0 +1,32 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールはレスポンスボディのJSONシリアライズに関するユーティリティを提供する
+
+一覧取得などの読み込み処理で、ORMのインスタンス生成とpydanticの検証を省略して直接バイト列に変換するために使用する
+"""
+from typing import Any, Iterable, Sequence
+
+import orjson
+from fastapi.responses import Response
+
+
+def rows_to_json(rows: Iterable[Sequence[Any]], columns: Sequence[str]) -> bytes:
+    """ 行（タプル）のリストをJSON配列のバイト列に変換する
+
+    日時はISO 8601形式（pydanticのjson()と同じ形式）で出力される
+
+    Args:
+        rows (Iterable[Sequence[Any]]): 行のリスト
+        columns (Sequence[str]): 行の各要素に対応するキー
+
+    Returns:
+        bytes: JSON配列のバイト列
+    """
+    return orjson.dumps([dict(zip(columns, row)) for row in rows])
+
+
+class RawJSONResponse(Response):
+    """ シリアライズ済みのJSONを返すレスポンス
+    """
+    media_type = 'application/json'
@@ -0,0 +1,200 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+このモジュールはリクエストの流量制限（スロットリング）に関するユーティリティを提供する
+
+ログインはパスワードの検証（PBKDF2）でCPUを大きく消費するため、
+接続元IPアドレス・ユーザー名ごとにトークンバケットで試行回数を制限し、超過した場合はパスワードの検証前に429を返す
+
+トークンバケットの保存先（ThrottleStore）は差し替え可能
+・MemoryThrottleStore: プロセス（ワーカー）内に保存する（デフォルト、ワーカーごとに制限される）
+・複数ワーカー・複数サーバーで制限を共有する場合は、ThrottleStoreを継承して共有ストア（Redisなど）に保存するクラスを実装し、
+  環境変数「LOGIN_THROTTLE_STORE」に「モジュール名:クラス名」を指定する
+"""
+import importlib
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from fastapi import status
+
+from core.config import get_env
+from exceptions import ApiException, create_error
+from exceptions.error_messages import ErrorMessage
+
+
+class ThrottleStore(ABC):
+    """ トークンバケットの保存先のインターフェース
+    """
+    @abstractmethod
+    async def consume(self, key: str, capacity: int, rate: float) -> float:
+        """ キーのバケットからトークンを1つ消費する
+
+        バケットは最大capacity個のトークンを保持し、1秒あたりrate個ずつ補充される（初回は満杯の状態から開始する）
+        複数のワーカーから同時に呼び出される共有ストアでは、補充と消費をアトミックに行うこと
+
+        Args:
+            key (str): キー
+            capacity (int): バケットの容量（連続して許可する回数）
+            rate (float): 1秒あたりの補充数
+
+        Returns:
+            float: 許可した場合は0、トークンが無い場合は次のトークンが補充されるまでの秒数
+        """
+
+    def stats(self) -> Dict[str, int]:
+        """ 保存先の使用状況を返す
+        """
+        return {}
+
+
+class MemoryThrottleStore(ThrottleStore):
+    """ プロセス内にトークンバケットを保存するストア
+
+    バケットは最後に更新された順に保持し、満杯まで補充された（初回と同じ状態に戻った）バケットは古いものから削除する
+    それでも件数が上限を超える場合は、最も長く更新されていないバケットから削除する
+
+    Attributes:
+        maxsize (int): 保持するバケット数の上限
+        allowed (int): 許可した回数
+        rejected (int): 拒否した回数
+        evictions (int): 上限超過により満杯になる前に削除したバケット数
+    """
+    def __init__(self, maxsize: int, timer: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+        self._timer = timer
+        # キー → (トークン数, 更新時刻, 満杯になる時刻)
+        self._buckets: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def consume(self, key: str, capacity: int, rate: float) -> float:
+        now = self._timer()
+        with self._lock:
+            self.__evict(now)
+
+            entry = self._buckets.pop(key, None)
+            tokens = capacity if entry is None else min(capacity, entry[0] + (now - entry[1]) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+                self.allowed += 1
+            else:
+                retry_after = (1 - tokens) / rate
+                self.rejected += 1
+
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            return retry_after
+
+    def __evict(self, now: float) -> None:
+        """ 満杯まで補充されたバケットを古いものから削除する
+        """
+        while self._buckets:
+            key, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now:
+                break
+            del self._buckets[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'maxsize': self.maxsize,
+                'size': len(self._buckets),
+                'allowed': self.allowed,
+                'rejected': self.rejected,
+                'evictions': self.evictions,
+            }
+
+
+class LoginThrottle:
+    """ ログインの試行回数の制限
+
+    接続元IPアドレスごと・ユーザー名ごとの順にバケットからトークンを消費し、不足する場合はその時点で拒否する
+    バケットの容量または1秒あたりの補充数が0の制限は無効
+
+    Attributes:
+        store (ThrottleStore): トークンバケットの保存先
+        ip_capacity (int): 接続元IPアドレスごとの連続して許可する回数
+        ip_rate (float): 接続元IPアドレスごとの1秒あたりの補充数
+        username_capacity (int): ユーザー名ごとの連続して許可する回数
+        username_rate (float): ユーザー名ごとの1秒あたりの補充数
+    """
+    def __init__(
+        self,
+        store: ThrottleStore,
+        ip_capacity: int,
+        ip_rate: float,
+        username_capacity: int,
+        username_rate: float,
+    ) -> None:
+        self.store = store
+        self.ip_capacity = ip_capacity
+        self.ip_rate = ip_rate
+        self.username_capacity = username_capacity
+        self.username_rate = username_rate
+
+    async def check(self, ip: Optional[str], username: str) -> None:
+        """ ログインの試行を許可するかどうかを確認する
+
+        Args:
+            ip (Optional[str]): 接続元IPアドレス
+            username (str): ユーザー名（大文字・小文字は区別しない）
+
+        Raises:
+            ApiException: 試行回数が上限を超えている場合（ヘッダ「Retry-After」に再試行できるまでの秒数を設定する）
+        """
+        # IPアドレスの制限で拒否した場合はユーザー名のバケットを消費しない
+        # （1つのIPアドレスからの大量の試行で、他の接続元からそのユーザー名でログインできなくならないようにする）
+        if self.ip_capacity > 0 and self.ip_rate > 0 and ip:
+            self.__raise_if_limited(await self.store.consume(f'login:ip:{ip}', self.ip_capacity, self.ip_rate))
+        if self.username_capacity > 0 and self.username_rate > 0 and username:
+            self.__raise_if_limited(await self.store.consume(
+                f'login:username:{username.strip().lower()}', self.username_capacity, self.username_rate))
+
+    def __raise_if_limited(self, retry_after: float) -> None:
+        """ トークンが無い場合は429のエラーにする
+
+        Args:
+            retry_after (float): 次のトークンが補充されるまでの秒数（許可した場合は0）
+
+        Raises:
+            ApiException: トークンが無い場合（ヘッダ「Retry-After」に再試行できるまでの秒数を設定する）
+        """
+        if retry_after > 0:
+            raise ApiException(
+                create_error(ErrorMessage.TOO_MANY_LOGIN_ATTEMPTS),
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(math.ceil(retry_after))},
+            )
+
+
+def create_throttle_store() -> ThrottleStore:
+    """ 環境変数「LOGIN_THROTTLE_STORE」（モジュール名:クラス名）のストアを生成する（未指定の場合はMemoryThrottleStore）
+    """
+    if not get_env().login_throttle_store:
+        return MemoryThrottleStore(get_env().login_throttle_max_keys)
+    module_name, class_name = get_env().login_throttle_store.split(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+@lru_cache
+def get_login_throttle() -> LoginThrottle:
+    """ ログインの試行回数の制限を返す
+    """
+    return LoginThrottle(
+        create_throttle_store(),
+        ip_capacity=get_env().login_throttle_ip_burst,
+        ip_rate=get_env().login_throttle_ip_per_minute / 60,
+        username_capacity=get_env().login_throttle_username_burst,
+        username_rate=get_env().login_throttle_username_per_minute / 60,
+    )